@@ -5,8 +5,9 @@ Created on Wed Aug  7 15:03:07 2019
 @author: edison
 """
 import insightLaser_instr
+from insightLaser_config import FixedConfig
 
-laser = insightLaser_instr.insightLaser()
+laser = insightLaser_instr.insightLaser(trace=True) # trace: log every command and reply
 
 laser.connect() # connect the laser through the telnet
 
@@ -32,49 +33,41 @@ laser.cmd_ABOR()
 #2. Set the time delay between when wavelength is set and Wavelength Ready Trigger 
 # is generated on Data Valid Trigger output, in microseconds
 delay = 0 # time delay in microsecond
-laser.cmd_CONF_FIX_DEL(delay)
 
-laser.cmd_CONF_FIX_DEL_q()
-
-
-laser.cmd_CONF_SCL_RAT(10)
-laser.cmd_CONF_SCL_RAT_q()
+clockrate = 10 # MHz
 
 
 
 #3. Set the fixed wavelength or frequency
 
-# In frequency
-#laser.cmd_CONF_FIX_FREQ(193)
-#laser.cmd_CONF_FIX_FREQ_q()
+# In frequency (THz), use frequency=... instead of wavelength=... below
+#frequency = 193
 
 # In wavelength
-laser.cmd_CONF_FIX_WAV(1550)
-laser.cmd_CONF_FIX_WAV_q()
+wavelength = 1550
 
 #4. Set the power in milliwatts
 
-laser.cmd_CONF_FIX_POW(0)
-laser.cmd_CONF_FIX_POW_q()
+power = 0
 #5. Set the power profile
 
 #For flat profile
 
 profile = 'flat'
-laser.cmd_CONF_FIX_PROF(profile)
 
 #for gaussian profile, a second input is needed for power
 
 #profile = 'gaussian'
-#gauspower = 3
-#laser.cmd_CONF_FIX_PROF(profile,gauspower)
+#gauspower = 3 # passed as rolloff=gauspower below
 
-laser.cmd_CONF_FIX_PROF_q()
+config = FixedConfig(wavelength=wavelength, power=power, profile=profile,
+                     delay=delay, clockrate=clockrate)
 
 # 6. Calibration
 
-# Calibrate the laser in the fixed mode
-laser.cmd_CAL_FIX()
+# Send the settings that differ from what the laser already has; the fixed
+# mode is calibrated only if the power or the profile changed
+config.apply(laser)
 # Query the state of the last fixed calibration
 laser.cmd_CAL_FIX_q()
 
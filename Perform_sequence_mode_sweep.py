@@ -8,8 +8,9 @@ Created on Fri Jul 26 12:45:00 2019
 #sys.path.append("****************")
 
 import insightLaser_instr
+from insightLaser_config import SequenceConfig
 
-laser = insightLaser_instr.insightLaser()
+laser = insightLaser_instr.insightLaser(trace=True) # trace: log every command and reply
 
 laser.connect() # connect the laser through the telnet
 
@@ -20,11 +21,6 @@ laser.cmd_SYST_CONT('soft') # change the control state: software (soft) or hardw
 
 #%% Sequence mode
 
-#This command clears all the wavelengths/frequencies in the sequence sweep.       
-laser.cmd_CONF_SEQ_CLEA()        
-laser.cmd_CONF_SEQ_q()
-
-
 #Create an equally spaced, equal dwell time sequence via a single command
 # STEP: The step value to increment by to add entries to the
         #sequence sweep (in nanometers).
@@ -42,25 +38,27 @@ step = 0.01
 length = 500
 startwvl = 1531
 stopwvl = 1531.5
-position = 0
 
-laser.cmd_CONF_SEQ_ADD_WST(step,length,startwvl,stopwvl,position)
-# or more customized sequences can be created step-by-step via command
-### laser.cmd_CONF_SEQ_ADD_WAV(1549,500,-1)
+# The table is cleared and rebuilt from these entries, in order
+entries = [('WST', step, length, startwvl, stopwvl)]
+# or more customized sequences can be created step-by-step via entries like
+### ('WAV', 1549, 500)
 # or by uploading a file of wavelengths and dwell times
-### laser.cmd_CONF_sEQ_LOAD(filename.csv)
+### laser.cmd_CONF_SEQ_LOAD(filename.csv)
 
-# The user can verify the programmed sequence of wavelengths by the query
-laser.cmd_CONF_SEQ_q()
+# The power at each wavelength of the sequence
+power = 2
 
-# The power at each wavelength of the sequence is set by
-laser.cmd_CONF_SEQ_POW(2)
-laser.cmd_CONF_SEQ_POW_q()
+config = SequenceConfig(entries=entries, power=power)
 #%%
 
-#The sequence must then be calibrated to that power using the
-laser.cmd_CAL_SEQ()
+# The table and power are only sent if they differ from what the laser already
+# has, and the sequence is then calibrated to that power
+config.apply(laser)
 laser.cmd_CAL_SEQ_q()
+
+# The user can verify the programmed sequence of wavelengths by the query
+laser.cmd_CONF_SEQ_q()
 laser.cmd_SYST_ERR_ALL_q()
 #Start the sweep in the designated sequence
 laser.cmd_INIT_SEQ()
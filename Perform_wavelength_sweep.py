@@ -8,8 +8,9 @@ Created on Fri Jul 26 12:45:00 2019
 #sys.path.append("****************")
 
 import insightLaser_instr
+from insightLaser_config import SweepConfig
 
-laser = insightLaser_instr.insightLaser()
+laser = insightLaser_instr.insightLaser(trace=True) # trace: log every command and reply
 
 laser.connect() # connect the laser through the telnet
 
@@ -27,10 +28,6 @@ startwvl = 1530
 stopwvl = 1532
 delay = 0
 
-laser.cmd_CONF_INCR_SBP(points,startwvl,stopwvl,delay)
-laser.cmd_CONF_INCR_SBR_q()
-laser.cmd_CONF_SWE_RAT_q()
-
 
 
 
@@ -38,33 +35,34 @@ laser.cmd_CONF_SWE_RAT_q()
 #==========================================================
 # Set the clock rate of the laser
 clockrate = 10 # MHz
-laser.cmd_CONF_SCL_RAT (clockrate)
 #==========================================================
 # 2. Set the sweep point increment 
 
-laser.cmd_CONF_SWE_POIN_INCR(4)
+increment = 4
 #==========================================================
 # 3. Set the peak power
 #The average power level to set the laser to for sweeping (float, mW).
 power = 2.1
-
-laser.cmd_CONF_SWE_POW(power)
 #==========================================================
 # 4. Power profile
 
 profile = 'flat' # Power profile type (FLAT, GAUSsian, or CUSTom).
-laser.cmd_CONF_SWE_PROF(profile)
 #==========================================================
 # 5. Set the edge of the start sweep trigger when sweeps begin
 
 edge = 'ris' # Trigger edge setting (RIS, FALL, BOTH).
 
-laser.cmd_CONF_SWE_TRIG(edge)
+config = SweepConfig(direction='incr', points=points, minwvl=startwvl, maxwvl=stopwvl,
+                     interdelay=delay, clockrate=clockrate, increment=increment,
+                     power=power, profile=profile, edge=edge)
 #==========================================================
 #%% Starting and stopping sweeps
 
-# calibration
-laser.cmd_CAL_SWE()
+# Send the settings that differ from what the laser already has, and
+# calibrate only if the range, points, power or profile changed
+config.apply(laser)
+laser.cmd_CONF_INCR_SBR_q()
+laser.cmd_CONF_SWE_RAT_q()
 #Start a sweep
 laser.cmd_INIT_SWE()
 #==========================================================
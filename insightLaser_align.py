@@ -0,0 +1,209 @@
+# =========================================================================================================
+# Trigger delay alignment for the Insight sweep laser
+# Aligns the Sweep Start, Sample Clock and Data Valid outputs with a digitizer using the power
+# synchronization pulse (:SOURce:SYNChronize:POWer). For each delay the caller's acquire(laser, delay)
+# captures a record, the pulse edge is located in it with NumPy (sub-sample, by interpolation), and the
+# delay is bracketed and narrowed down until the edge sits at the wanted sample. Results are kept per
+# host and setup in an AlignmentCache; a later alignment starts from the stored delay and usually only
+# has to confirm it.
+#
+#   cache = AlignmentCache('alignment.json')
+#   delays = alignTriggers(laser, acquire, {'SSD': 100.0}, pulse=(1, 0, 50, 1550),
+#                          setup='scope-A', cache=cache)
+# =========================================================================================================
+
+import logging
+import time
+
+import numpy
+
+from insightLaser_store import recordStore
+
+
+# delay name: (set command, query, total query or None); delays in ns
+DELAYS = {'SSD': ('cmd_SOUR_CORR_SSD', 'cmd_SOUR_CORR_SSD_q', 'cmd_SOUR_CORR_SSD_TOT_q'),
+          'SCD': ('cmd_SOUR_CORR_SCD', 'cmd_SOUR_CORR_SCD_q', None),
+          'DVD': ('cmd_SOUR_CORR_DVD', 'cmd_SOUR_CORR_DVD_q', 'cmd_SOUR_CORR_DVD_TOT_q')}
+
+# finest delay step the laser resolves, ns
+RESOLUTION = {'SSD': 0.15, 'SCD': 0.178, 'DVD': 0.15}
+
+
+def findEdge(samples, threshold=None):
+    '''
+    Position of the first rising edge of the sync pulse in a record, in
+    samples, interpolated between the samples around the threshold.
+    samples: 1-D record, or 2-D (records x samples) averaged first
+    threshold: crossing level, halfway between the lowest and highest
+               sample by default
+    return: the position; -inf if the record starts inside the pulse (the
+            edge is before it), +inf if it never crosses (the edge is after)
+    '''
+    samples = numpy.asarray(samples, dtype=float)
+    if samples.ndim == 2:
+        samples = samples.mean(axis=0)
+    lo, hi = samples.min(), samples.max()
+    if threshold is None:
+        if hi <= lo:
+            return numpy.inf
+        threshold = (lo + hi) / 2
+    above = samples >= threshold
+    if not above.any():
+        return numpy.inf
+    i = int(above.argmax())
+    if i == 0:
+        return -numpy.inf
+    a, b = samples[i-1], samples[i]
+    return i - 1 + (threshold - a) / (b - a)
+
+
+def alignDelay(laser, delay, acquire, target, lo=0.0, hi=1000.0, tolerance=0.5, start=None,
+               window=None, maxIterations=40):
+    '''
+    Find the value of one delay ('SSD', 'SCD' or 'DVD') that puts the
+    pulse edge found in acquire(laser) within <tolerance> samples of
+    <target>. The edge moves linearly with the delay, so the bracket is
+    split where the line through its ends crosses the target (regula
+    falsi, Illinois variant) and halved instead while an end has the
+    edge outside the record.
+    lo, hi: delays (ns) that put the edge on either side of <target>
+    start: delay to try first, e.g. the last result; if it is off, the
+           search brackets [start - window, start + window] before falling
+           back to [lo, hi]
+    return: (delay, number of acquisitions)
+    Raises ValueError if [lo, hi] does not bracket the target, or if the
+    bracket narrows down to the delay resolution without the edge coming
+    within <tolerance>.
+    '''
+    setDelay = getattr(laser, DELAYS[delay][0])
+    resolution = RESOLUTION[delay]
+    count = 0
+
+    def error(value):
+        nonlocal count
+        setDelay(value)
+        count += 1
+        return findEdge(acquire(laser)) - target
+
+    bracket = None
+    if start is not None:
+        e = error(start)
+        if abs(e) <= tolerance:
+            return start, count
+        window = (hi - lo) / 16 if window is None else window
+        a, b = max(lo, start - window), min(hi, start + window)
+        ea, eb = error(a), error(b)
+        for value, e in ((a, ea), (b, eb)):
+            if abs(e) <= tolerance:
+                return value, count
+        if numpy.sign(ea) != numpy.sign(eb):
+            bracket = a, b, ea, eb
+    if bracket is None:
+        ea, eb = error(lo), error(hi)
+        for value, e in ((lo, ea), (hi, eb)):
+            if abs(e) <= tolerance:
+                return value, count
+        if numpy.sign(ea) == numpy.sign(eb):
+            raise ValueError('%s: the pulse edge stays on one side of sample %g for delays %g-%g ns'
+                             % (delay, target, lo, hi))
+        bracket = lo, hi, ea, eb
+
+    a, b, ea, eb = bracket
+    side = 0
+    for _ in range(maxIterations):
+        mid = (a + b) / 2
+        if numpy.isfinite(ea) and numpy.isfinite(eb):
+            guess = b - eb * (b - a) / (eb - ea)
+            if min(a, b) < guess < max(a, b):
+                mid = guess
+        e = error(mid)
+        if abs(e) <= tolerance:
+            return float(mid), count
+        if abs(b - a) <= resolution:
+            raise ValueError('%s: the pulse edge is still %g samples off at %g ns, the delay resolution'
+                             % (delay, e, mid))
+        if numpy.sign(e) == numpy.sign(ea):
+            a, ea = mid, e
+            if side == -1:
+                eb /= 2
+            side = -1
+        else:
+            b, eb = mid, e
+            if side == 1:
+                ea /= 2
+            side = 1
+    raise ValueError('%s: no convergence after %d acquisitions' % (delay, count))
+
+
+def alignTriggers(laser, acquire, targets, pulse=(1, 0, 50, 1550), setup='default', cache=None,
+                  limits=None, tolerance=0.5):
+    '''
+    Align several delays in turn with the power synchronization pulse on.
+    acquire: acquire(laser, delay) returns the record to look for the
+             pulse edge in when aligning <delay>
+    targets: {delay: sample the edge should land on}
+    pulse: (amplitude, start delay ns, width ns, wavelength nm) for
+           cmd_SOUR_SYNC_POW
+    setup: name of the digitizer/cabling setup the results are stored under
+    cache: AlignmentCache; stored delays are tried first
+    limits: {delay: (lo, hi)} search ranges in ns, 0-1000 by default
+    return: {delay: ns}, also read back with the totals into the cache
+    '''
+    limits = limits or {}
+    laser.cmd_SOUR_SYNC_POW(*pulse)
+    results = {}
+    try:
+        for delay, target in targets.items():
+            stored = cache.lookup(laser, setup, delay) if cache is not None else None
+            lo, hi = limits.get(delay, (0.0, 1000.0))
+            value, count = alignDelay(laser, delay, lambda l, d=delay: acquire(l, d), target,
+                                      lo, hi, tolerance, start=stored)
+            logging.getLogger().info('%s: %s aligned to %g ns in %d acquisitions'
+                                     % (laser.host, delay, value, count))
+            results[delay] = value
+    finally:
+        laser.cmd_ABOR()
+    if cache is not None:
+        totals = {d: getattr(laser, DELAYS[d][2])(refresh=True) for d in results if DELAYS[d][2]}
+        cache.record(laser, setup, results, totals)
+    return results
+
+
+class AlignmentCache(recordStore):
+    '''
+    Aligned delays per laser and setup, optionally kept in a JSON file:
+    {'host setup': {'delays': {delay: ns}, 'totals': {delay: ns}, 'time': t}}
+    '''
+
+    def _key(self, laser, setup):
+        return '%s %s' % (laser.host, setup)
+
+    def lookup(self, laser, setup, delay):
+        '''
+        Stored value of <delay> for this laser and setup, or None.
+        '''
+        with self._lock:
+            record = self._records.get(self._key(laser, setup))
+            return None if record is None else record['delays'].get(delay)
+
+    def record(self, laser, setup, delays, totals=None):
+        key = self._key(laser, setup)
+        with self._lock:
+            record = self._records.setdefault(key, {'delays': {}, 'totals': {}})
+            record['delays'].update(delays)
+            record['totals'].update(totals or {})
+            record['time'] = time.time()
+            self.save()
+
+    def apply(self, laser, setup):
+        '''
+        Set the stored delays of this setup on the laser, in one batch.
+        return: the delays, {} if nothing is stored
+        '''
+        with self._lock:
+            record = self._records.get(self._key(laser, setup))
+            delays = {} if record is None else dict(record['delays'])
+        with laser.batch():
+            for delay, value in delays.items():
+                getattr(laser, DELAYS[delay][0])(value)
+        return delays
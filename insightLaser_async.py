@@ -0,0 +1,248 @@
+# =========================================================================================================
+# asyncio driver for the Insight sweep laser
+# Raw TCP transport with a framer for the 'atlas ready>' prompt, plus async versions of every
+# command in insightLaser_instr.COMMANDS. The sync and async drivers share the command table:
+# each async method runs its table entry in capture mode and sends the captured SCPI lines,
+# so argument checks, reply parsing and the state cache are shared as well.
+# =========================================================================================================
+
+import asyncio
+import collections
+import logging
+import time
+
+import insightLaser_instr
+
+
+PROMPT = insightLaser_instr.PROMPT
+
+# telnet protocol bytes, the laser listens on the telnet port
+IAC, DONT, DO, WONT, WILL, SB, SE = 255, 254, 253, 252, 251, 250, 240
+
+
+class promptProtocol(asyncio.Protocol):
+    '''
+    Splits the byte stream into prompt-delimited replies. Every exchange
+    registers one future per command before writing, so replies resolve
+    in send order and concurrent callers are pipelined on the same socket.
+    Telnet option negotiation is refused the same way telnetlib does it.
+    '''
+
+    def __init__(self):
+        self.transport = None
+        self._buf = bytearray()
+        self._iac = bytearray()
+        self._waiters = collections.deque()
+        self._lost = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def connection_lost(self, exc):
+        self._lost = exc or ConnectionError('connection to laser closed')
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_exception(self._lost)
+
+    def data_received(self, data):
+        self._buf += self._filterTelnet(data)
+        self._deliver()
+
+    def _deliver(self):
+        while self._waiters:
+            i = self._buf.find(PROMPT)
+            if i < 0:
+                break
+            frame = bytes(self._buf[:i])
+            del self._buf[:i+len(PROMPT)]
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(frame)
+
+    def _filterTelnet(self, data):
+        '''
+        Strip telnet commands from the stream and answer DO/WILL requests
+        with WONT/DONT.
+        '''
+        if IAC not in data and not self._iac:
+            return data
+        out = bytearray()
+        seq = self._iac
+        for b in data:
+            if not seq:
+                if b == IAC:
+                    seq.append(b)
+                else:
+                    out.append(b)
+                continue
+            seq.append(b)
+            cmd = seq[1]
+            if cmd == IAC:                          # escaped 0xff data byte
+                out.append(IAC)
+                seq.clear()
+            elif cmd in (DO, DONT, WILL, WONT):
+                if len(seq) == 3:
+                    if cmd in (DO, WILL):
+                        reply = WONT if cmd == DO else DONT
+                        self.transport.write(bytes((IAC, reply, seq[2])))
+                    seq.clear()
+            elif cmd == SB:
+                if len(seq) >= 4 and seq[-2] == IAC and seq[-1] == SE:
+                    seq.clear()
+            else:
+                seq.clear()
+        return bytes(out)
+
+    def expect(self, count):
+        '''
+        Register <count> reply futures, in order.
+        '''
+        loop = asyncio.get_running_loop()
+        futs = [loop.create_future() for _ in range(count)]
+        if self._lost is not None:
+            for fut in futs:
+                fut.set_exception(self._lost)
+        self._waiters.extend(futs)
+        self._deliver()
+        return futs
+
+
+class asyncInsightLaser:
+
+    def __init__(self, host='insight-laser', port=23, trace=False):
+
+        self.port = port
+        self.host = host
+
+        self._log = logging.getLogger()
+        self._proto = None
+
+        self.trace = trace          # log every command and its reply
+        self.metrics = None         # insightLaser_metrics.commandMetrics to record latencies
+        self.timeouts = insightLaser_instr.TIMEOUTS     # (header pattern, seconds) reply timeouts
+        self.connectTimeout = insightLaser_instr.CONNECT_TIMEOUT
+
+        # capture-only sync driver: source of the SCPI strings and reply handling
+        self._shadow = insightLaser_instr.insightLaser(host)
+        self._shadow._log = logging.getLogger('insightLaser.capture')
+        self._shadow._log.disabled = True
+
+    async def connect(self):
+        loop = asyncio.get_running_loop()
+        try:
+            async with asyncio.timeout(self.connectTimeout):
+                _, self._proto = await loop.create_connection(promptProtocol, self.host, self.port)
+                banner, = self._proto.expect(1)
+                await banner
+        except TimeoutError:
+            await self.close()
+            raise insightLaser_instr.laserTimeout('connect', self.connectTimeout) from None
+        self._shadow.clearCache()
+
+    async def close(self):
+        if self._proto is not None and self._proto.transport is not None:
+            self._proto.transport.close()
+        self._proto = None
+
+    async def exchange(self, cmds, timeout=None):
+        '''
+        Write a list of SCPI commands in one send and return their replies
+        as strings, in order.
+        timeout: seconds for all replies, by default the longest timeout of
+        the commands. When it expires the connection is closed (replies of
+        other callers pipelined behind it cannot be told apart) and
+        laserTimeout is raised; connect() again to go on. Until then, and
+        before the first connect(), ConnectionError is raised.
+        '''
+        if not cmds:
+            return []
+        if self._proto is None:
+            raise ConnectionError('%s: not connected' % self.host)
+        if timeout is None:
+            timeout = max(insightLaser_instr.commandTimeout(cmd, self.timeouts) or 0 for cmd in cmds)
+        futs = self._proto.expect(len(cmds))
+        self._proto.transport.write(''.join(cmd+'\n\r' for cmd in cmds).encode('ascii'))
+        try:
+            async with asyncio.timeout(timeout or None):
+                if self.metrics is None:
+                    frames = await asyncio.gather(*futs)
+                else:
+                    frames = await self._timed(cmds, futs)
+        except TimeoutError:
+            pending = [cmd for cmd, fut in zip(cmds, futs) if not fut.done() or fut.cancelled()]
+            error = insightLaser_instr.laserTimeout(pending[0], timeout, pending)
+            self._log.warning('%s: %s' % (self.host, error))
+            self._shadow.clearCache()
+            await self.close()
+            raise error from None
+        replies = [f.decode() for f in frames]
+        if self.trace:
+            for cmd, reply in zip(cmds, replies):
+                self._log.info('%s: %s' % (cmd, reply.strip()),
+                               extra={'scpi': cmd, 'reply': reply, 'host': self.host})
+        return replies
+
+    async def _timed(self, cmds, futs):
+        '''
+        Await the reply futures in order, recording each round trip.
+        '''
+        sent = time.perf_counter()
+        frames = []
+        for cmd, fut in zip(cmds, futs):
+            frame = await fut
+            self.metrics.record(cmd.split(None, 1)[0], time.perf_counter() - sent,
+                                len(cmd)+2, len(frame)+len(PROMPT))
+            frames.append(frame)
+        return frames
+
+    async def query(self, cmd):
+        '''
+        cmd: SCPI command as string
+        return: response from instrument as string
+        '''
+        reply, = await self.exchange([cmd])
+        return reply
+
+    def clearCache(self):
+        '''
+        Drop every cached setting, the next query of each goes to the laser.
+        '''
+        self._shadow.clearCache()
+
+    def __getattr__(self, name):
+        '''
+        Build the async version of a command from insightLaser_instr.COMMANDS
+        on first use and cache it on the class.
+        '''
+        spec = insightLaser_instr.COMMANDS.get(name)
+        if spec is None:
+            raise AttributeError("'%s' object has no attribute '%s'" % (type(self).__name__, name))
+        method = _asyncCommand(name, spec)
+        setattr(asyncInsightLaser, name, method)
+        return method.__get__(self, type(self))
+
+    def __dir__(self):
+        return sorted(set(super().__dir__()) | set(insightLaser_instr.COMMANDS))
+
+
+def _asyncCommand(name, spec):
+    '''
+    Async method for one command table entry: the entry runs against the
+    capture-only sync driver, the captured command is sent over the async
+    transport and its reply is handed back to the pendingReply.
+    '''
+    async def method(self, *args, **kwargs):
+        with self._shadow._capture() as queue:
+            result = spec(self._shadow, *args, **kwargs)
+        replies = await self.exchange([p.cmd for p in queue])
+        for p, reply in zip(queue, replies):
+            p.set(reply)
+        if isinstance(result, insightLaser_instr.pendingReply):
+            return result.value
+        return result
+    method.__name__ = name
+    method.__qualname__ = 'asyncInsightLaser.' + name
+    method.__doc__ = spec.doc
+    method.__signature__ = spec.method(name).__signature__
+    return method
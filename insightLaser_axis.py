@@ -0,0 +1,130 @@
+# =========================================================================================================
+# Sample axis of a sweep of the Insight sweep laser
+# Maps the samples of a digitizer clocked by the laser to optical frequency and wavelength, and marks
+# the samples listed in the Data Invalid Vector (DIV), where the frequency has not stepped. Built with
+# NumPy in one pass over the sweep; an axisCache keeps the axes of the sweep configurations seen so far,
+# so repeated acquisitions neither read the DIV again nor rebuild the axis.
+#
+#   cache = axisCache()
+#   axis = cache.get(laser)
+#   spectrum = axis.valid(samples)
+# =========================================================================================================
+
+import collections
+
+import numpy
+
+from insightLaser_instr import sweepDirection
+from insightLaser_sequence import C_NM_THZ
+
+
+class sweepAxis:
+    '''
+    Per sample clock of one sweep:
+        mask        True where the sample is valid (not in the DIV)
+        point       measurement point index, held over invalid samples
+        frequency   optical frequency, THz
+        wavelength  nm
+    The arrays are read-only, they are shared by every user of the cache.
+    '''
+
+    def __init__(self, mask, point, frequency, wavelength):
+        self.mask = mask
+        self.point = point
+        self.frequency = frequency
+        self.wavelength = wavelength
+        for array in (mask, point, frequency, wavelength):
+            array.flags.writeable = False
+
+    def __len__(self):
+        return len(self.mask)
+
+    def valid(self, samples, axis=-1):
+        '''
+        The valid samples of <samples>, one sweep along <axis>.
+        '''
+        return numpy.compress(self.mask, samples, axis=axis)
+
+    def validFrequency(self):
+        return self.frequency[self.mask]
+
+    def validWavelength(self):
+        return self.wavelength[self.mask]
+
+
+def buildAxis(div, points, step, minwvl, maxwvl, direction=sweepDirection.INCR, samplesPerClock=1):
+    '''
+    div: sample clock indices of the invalid samples (cmd_CONF_SWE_DIV_q)
+    points: measurement points of the sweep (cmd_CONF_SWE_POIN_q)
+    step: optical frequency step between points, GHz (cmd_CONF_SWE_STEP_q)
+    minwvl, maxwvl: sweep range, nm
+    direction: sweepDirection; a bidirectional sweep is taken to cover
+               the range up over the first half of the points and back
+               down over the second
+    samplesPerClock: digitizer samples per DIV sample clock, for a
+               digitizer not clocked one to one
+    return: sweepAxis
+    '''
+    div = numpy.asarray(div, dtype=numpy.intp)
+    total = points + len(div)
+    mask = numpy.ones(total, dtype=bool)
+    mask[div] = False
+    point = numpy.cumsum(mask, dtype=numpy.int64)
+    point -= 1
+    numpy.maximum(point, 0, out=point)          # invalid samples before the first point
+    if samplesPerClock != 1:
+        clock = numpy.arange(int(total * samplesPerClock)) / samplesPerClock
+        clock = clock.astype(numpy.intp)
+        mask, point = mask[clock], point[clock]
+
+    if not isinstance(direction, sweepDirection):
+        direction = sweepDirection.fromReply(direction)
+    position = point
+    if direction == sweepDirection.BINC:
+        half = points // 2
+        position = numpy.where(point < half, point, points - 1 - point)
+    stepThz = step / 1000
+    if direction == sweepDirection.DECR:
+        # decreasing wavelength: the frequency rises from the long end of the range
+        frequency = C_NM_THZ / maxwvl + stepThz * position
+    else:
+        frequency = C_NM_THZ / minwvl - stepThz * position
+    wavelength = C_NM_THZ / frequency
+    return sweepAxis(mask, point, frequency, wavelength)
+
+
+class axisCache:
+    '''
+    sweepAxis per laser and sweep configuration, least recently used first
+    out. The configuration is read with the cached queries of the driver,
+    so a hit costs no round trip; the DIV is only read on a miss. A new
+    calibration with the same settings can move the invalid points: clear()
+    the cache after calibrating.
+    '''
+
+    def __init__(self, maxsize=8, samplesPerClock=1):
+        self.maxsize = maxsize
+        self.samplesPerClock = samplesPerClock
+        self._axes = collections.OrderedDict()
+
+    def key(self, laser):
+        return (laser.host, laser.cmd_CONF_SWE_POIN_q(), laser.cmd_CONF_SWE_STEP_q(),
+                laser.cmd_CONF_SWE_WMIN_q(), laser.cmd_CONF_SWE_WMAX_q(),
+                laser.cmd_CONF_SWE_DIR_q(), self.samplesPerClock)
+
+    def get(self, laser):
+        key = self.key(laser)
+        axis = self._axes.get(key)
+        if axis is not None:
+            self._axes.move_to_end(key)
+            return axis
+        _, points, step, minwvl, maxwvl, direction, samplesPerClock = key
+        axis = buildAxis(laser.cmd_CONF_SWE_DIV_q(), points, step, minwvl, maxwvl,
+                         direction, samplesPerClock)
+        self._axes[key] = axis
+        while len(self._axes) > self.maxsize:
+            self._axes.popitem(last=False)
+        return axis
+
+    def clear(self):
+        self._axes.clear()
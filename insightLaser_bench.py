@@ -0,0 +1,217 @@
+# =========================================================================================================
+# Benchmark of mode setup and switching for the Insight sweep laser
+# Replays the workflows of Perform_wavelength_sweep.py, Perform_fixed_mode_sweep.py and
+# Perform_sequence_mode_sweep.py against the simulator (insightLaser_sim) or a real laser and reports,
+# per phase (connect, configure, calibrate, initiate, abort), the wall time, the number of commands,
+# bytes sent and received and the round-trip times. Results can be stored as a baseline and later
+# runs compared against it.
+#
+#   python insightLaser_bench.py --rtt 0.002 --save-baseline bench.json
+#   python insightLaser_bench.py --rtt 0.002 --baseline bench.json
+# =========================================================================================================
+
+import argparse
+import contextlib
+import json
+import statistics
+import sys
+import time
+
+import insightLaser_instr
+import insightLaser_metrics
+from insightLaser_config import SweepConfig, FixedConfig, SequenceConfig
+
+
+# the setups of the Perform_*.py scripts
+SWEEP = SweepConfig(direction='incr', points=1000, minwvl=1530, maxwvl=1532, interdelay=0,
+                    clockrate=10, increment=4, power=2.1, profile='flat', edge='ris')
+FIXED = FixedConfig(wavelength=1550, power=0, profile='flat', delay=0, clockrate=10)
+SEQUENCE = SequenceConfig(entries=[('WST', 0.01, 500, 1531, 1531.5)], power=2)
+
+
+class phaseTimer:
+    '''
+    Times the phases of one run and collects the command metrics of each.
+    '''
+
+    def __init__(self, laser):
+        self.laser = laser
+        self.phases = {}
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        metrics = self.laser.metrics = insightLaser_metrics.commandMetrics()
+        recorder = self.laser.recorder     # tag a session recording with the phases too
+        start = time.perf_counter()
+        try:
+            with recorder.phase(name) if recorder is not None else contextlib.nullcontext():
+                yield
+        finally:
+            wall = time.perf_counter() - start
+            self.laser.metrics = None
+            total = metrics.total()
+            self.phases[name] = {'wall': wall,
+                                 'commands': total.latency.count,
+                                 'bytesOut': total.bytesOut,
+                                 'bytesIn': total.bytesIn,
+                                 'rttP50': total.latency.quantile(0.5),
+                                 'rttP99': total.latency.quantile(0.99)}
+
+
+def _connect(timer):
+    with timer.phase('connect'):
+        timer.laser.connect()
+        timer.laser.cmd_SYST_CONT('soft')
+
+def _finish(timer, initiate):
+    with timer.phase('initiate'):
+        initiate()
+    with timer.phase('abort'):
+        timer.laser.cmd_ABOR()
+    timer.laser.close()
+
+def sweepWorkflow(timer):
+    laser = timer.laser
+    _connect(timer)
+    with timer.phase('configure'):
+        SWEEP.apply(laser, calibrate=False)
+        laser.cmd_CONF_INCR_SBR_q()
+        laser.cmd_CONF_SWE_RAT_q()
+    with timer.phase('calibrate'):
+        laser.cmd_CAL_SWE()
+    _finish(timer, laser.cmd_INIT_SWE)
+
+def fixedWorkflow(timer):
+    laser = timer.laser
+    _connect(timer)
+    with timer.phase('configure'):
+        FIXED.apply(laser, calibrate=False)
+    with timer.phase('calibrate'):
+        laser.cmd_CAL_FIX()
+        laser.cmd_CAL_FIX_q()
+    _finish(timer, laser.cmd_INIT_FIX)
+
+def sequenceWorkflow(timer):
+    laser = timer.laser
+    _connect(timer)
+    with timer.phase('configure'):
+        SEQUENCE.apply(laser, calibrate=False)
+        laser.cmd_CONF_SEQ_q()
+    with timer.phase('calibrate'):
+        laser.cmd_CAL_SEQ()
+        laser.cmd_CAL_SEQ_q()
+    _finish(timer, laser.cmd_INIT_SEQ)
+
+def switchWorkflow(timer, switches=10):
+    '''
+    Alternate between the sweep and the fixed setup on one connection.
+    'configure' covers all switches, calibrations included: only the
+    first switch into each mode calibrates.
+    '''
+    laser = timer.laser
+    _connect(timer)
+    with timer.phase('configure'):
+        for i in range(switches):
+            (SWEEP if i % 2 == 0 else FIXED).apply(laser)
+    _finish(timer, laser.cmd_INIT_FIX)
+
+WORKFLOWS = {'sweep': sweepWorkflow, 'fixed': fixedWorkflow,
+             'sequence': sequenceWorkflow, 'switch': switchWorkflow}
+
+
+def runWorkflow(name, host, port, repeat=5):
+    '''
+    Run a workflow <repeat> times on fresh connections.
+    return: {phase: {statistic: median over the runs}}
+    '''
+    runs = []
+    for _ in range(repeat):
+        laser = insightLaser_instr.insightLaser(host)
+        laser.port = port
+        timer = phaseTimer(laser)
+        WORKFLOWS[name](timer)
+        runs.append(timer.phases)
+    result = {}
+    for phase in runs[0]:
+        result[phase] = {key: _median([run[phase][key] for run in runs]) for key in runs[0][phase]}
+    result['total'] = {'wall': sum(p['wall'] for p in result.values())}
+    return result
+
+def _median(values):
+    values = [v for v in values if v is not None]
+    return statistics.median(values) if values else None
+
+
+def compare(results, baseline, tolerance=0.2):
+    '''
+    Wall time ratios against a baseline.
+    return: list of (workflow, phase, baseline s, now s, ratio, regression)
+    '''
+    rows = []
+    for workflow, phases in results.items():
+        for phase, stats in phases.items():
+            old = baseline.get(workflow, {}).get(phase, {}).get('wall')
+            if not old:
+                continue
+            ratio = stats['wall'] / old
+            rows.append((workflow, phase, old, stats['wall'], ratio, ratio > 1 + tolerance))
+    return rows
+
+
+def report(results, out=sys.stdout):
+    out.write('%-9s %-10s %10s %6s %9s %9s %10s %10s\n'
+              % ('workflow', 'phase', 'wall ms', 'cmds', 'bytes out', 'bytes in', 'rtt p50 ms', 'rtt p99 ms'))
+    for workflow, phases in results.items():
+        for phase, s in phases.items():
+            out.write('%-9s %-10s %10.2f %6s %9s %9s %10s %10s\n'
+                      % (workflow, phase, 1e3*s['wall'], _fmt(s.get('commands')),
+                         _fmt(s.get('bytesOut')), _fmt(s.get('bytesIn')),
+                         _ms(s.get('rttP50')), _ms(s.get('rttP99'))))
+
+def _fmt(value):
+    return '' if value is None else '%d' % value
+
+def _ms(value):
+    return '' if value is None else '%.3f' % (1e3*value)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Insight laser setup/switching benchmark')
+    parser.add_argument('--host', help='real laser; the simulator is used if omitted')
+    parser.add_argument('--port', type=int, default=23)
+    parser.add_argument('--latency', type=float, default=0.0005, help='simulator: seconds per command')
+    parser.add_argument('--rtt', type=float, default=0.001, help='simulator: network round trip, seconds')
+    parser.add_argument('--calibration', type=float, default=0.05, help='simulator: seconds per calibration')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--workflows', default=','.join(WORKFLOWS))
+    parser.add_argument('--baseline', help='JSON file to compare against')
+    parser.add_argument('--save-baseline', help='JSON file to store the results in')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown before flagging')
+    opts = parser.parse_args()
+
+    sim = None
+    host, port = opts.host, opts.port
+    if host is None:
+        import insightLaser_sim
+        sim = insightLaser_sim.laserSimulator(latency=opts.latency, rtt=opts.rtt,
+                                              calibrationTime=opts.calibration)
+        host, port = sim.runInThread()
+
+    results = {name: runWorkflow(name, host, port, opts.repeat) for name in opts.workflows.split(',')}
+    if sim is not None:
+        sim.stopThread()
+    report(results)
+
+    status = 0
+    if opts.baseline:
+        with open(opts.baseline) as f:
+            baseline = json.load(f)
+        print('\n%-9s %-10s %10s %10s %7s' % ('workflow', 'phase', 'base ms', 'now ms', 'ratio'))
+        for workflow, phase, old, new, ratio, worse in compare(results, baseline, opts.tolerance):
+            print('%-9s %-10s %10.2f %10.2f %7.2f%s'
+                  % (workflow, phase, 1e3*old, 1e3*new, ratio, '  REGRESSION' if worse else ''))
+            status |= worse
+    if opts.save_baseline:
+        with open(opts.save_baseline, 'w') as f:
+            json.dump(results, f, indent=1)
+    sys.exit(status)
@@ -0,0 +1,170 @@
+# =========================================================================================================
+# Calibration helpers for the Insight sweep laser
+# startCalibration() runs a calibration on a worker thread and returns a Future; completion is polled
+# through the BUSY bit of *STB? (or *OPC?) with a growing interval.
+#
+# Records, per laser and mode, the fingerprint of the config (insightLaser_config.LaserConfig) the
+# last successful calibration was run for, and when. A config with the same fingerprint reuses the
+# calibration the laser holds, as long as the record is younger than the TTL and the laser's
+# :CALibrate:<mode>? query still reports it as good. The records can be kept in a JSON file so
+# they survive between scripts.
+# =========================================================================================================
+
+import concurrent.futures
+import logging
+import threading
+import time
+
+from insightLaser_instr import COMMANDS, statusByte, calibrationPassed, laserTimeout
+from insightLaser_store import recordStore
+
+
+def waitCalibration(laser, command, timeout=None, onProgress=None, onTimeout=None,
+                    poll='STB', interval=0.05, maxInterval=1.0, backoff=1.5, abortOnTimeout=True):
+    '''
+    Run the calibration <command> ('cmd_CAL_SWE', 'cmd_CAL_FIX',
+    'cmd_CAL_SEQ', or a LaserConfig) and poll until the laser is no longer
+    busy. The polling interval starts at <interval> and grows by <backoff>
+    up to <maxInterval>.
+    poll: 'STB' waits for the BUSY bit of *STB? to clear, 'OPC' for *OPC? = 1
+    onProgress: called as onProgress(elapsed seconds, status) after every poll
+    onTimeout: called as onTimeout(laser) when <timeout> seconds have passed,
+               before the calibration is aborted (<abortOnTimeout>) and
+               TimeoutError raised; <timeout> also bounds the wait for the
+               reply to the calibration command itself
+    return: True if the :CALibrate:<mode>? query reports the calibration
+            as good
+    '''
+    command = getattr(command, 'calibrateCommand', command)
+
+    def expired():
+        if onTimeout is not None:
+            onTimeout(laser)
+        if abortOnTimeout and laser.tn is not None:
+            laser.cmd_ABOR()
+        return TimeoutError('%s did not finish within %g s' % (command, timeout))
+
+    start = time.monotonic()
+    if timeout is None:
+        getattr(laser, command)()
+    else:
+        try:
+            with laser.deadline(timeout):
+                getattr(laser, command)()
+        except laserTimeout as exc:
+            raise expired() from exc
+    while True:
+        if poll == 'OPC':
+            status = laser.cmd_OPC_q()
+            busy = status != 1
+        else:
+            status = laser.cmd_STB_q()
+            busy = bool(status & statusByte.BUSY)
+        elapsed = time.monotonic() - start
+        if onProgress is not None:
+            onProgress(elapsed, status)
+        if not busy:
+            break
+        if timeout is not None and elapsed >= timeout:
+            raise expired()
+        time.sleep(interval if timeout is None else min(interval, max(timeout - elapsed, 0)))
+        interval = min(interval * backoff, maxInterval)
+    return calibrationPassed(getattr(laser, command + '_q')())
+
+
+def startCalibration(laser, command, **kwargs):
+    '''
+    waitCalibration() on a worker thread. Returns at once with a
+    concurrent.futures.Future of its result, so several lasers can be
+    calibrated in parallel or data processed meanwhile. <laser> must not
+    be used by anyone else until the future is done.
+    '''
+    future = concurrent.futures.Future()
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(waitCalibration(laser, command, **kwargs))
+        except BaseException as exc:
+            future.set_exception(exc)
+    threading.Thread(target=run, name='calibrate %s' % laser.host, daemon=True).start()
+    return future
+
+
+class CalibrationCache(recordStore):
+    '''
+    ttl: seconds a calibration is trusted for, older records are evicted
+    path: optional JSON file the records are loaded from and saved to
+    '''
+
+    def __init__(self, ttl=3600, path=None):
+        super().__init__(path)
+        self.ttl = ttl
+        self._log = logging.getLogger()
+
+    def _key(self, laser, config):
+        return '%s %s' % (laser.host, COMMANDS[config.calibrateCommand].header)
+
+    def evict(self, now=None):
+        '''
+        Drop the records older than the TTL.
+        '''
+        now = time.time() if now is None else now
+        with self._lock:
+            for key in [k for k, r in self._records.items() if now - r['time'] >= self.ttl]:
+                del self._records[key]
+
+    def lookup(self, laser, config):
+        '''
+        True if the last calibration of the mode was run for this config
+        and has not expired. Does not ask the laser.
+        '''
+        with self._lock:
+            self.evict()
+            record = self._records.get(self._key(laser, config))
+        return record is not None and record['fingerprint'] == config.fingerprint()
+
+    def isValid(self, laser, config):
+        '''
+        Ask the laser whether its last calibration of the mode succeeded.
+        '''
+        return calibrationPassed(getattr(laser, config.calibrateCommand + '_q')())
+
+    def calibrate(self, laser, config, force=False):
+        '''
+        Calibrate the mode of <config> unless the laser already holds a
+        valid calibration for its fingerprint. The settings of <config>
+        are expected to be on the laser already (LaserConfig.apply).
+        return: True if a calibration was run
+        '''
+        key = self._key(laser, config)
+        header = COMMANDS[config.calibrateCommand].header
+        if not force and self.lookup(laser, config) and self.isValid(laser, config):
+            self._log.info('reusing calibration %s' % key)
+            laser.setCached(header, True)
+            return False
+        getattr(laser, config.calibrateCommand)()
+        valid = self.isValid(laser, config)
+        with self._lock:
+            if valid:
+                self._records[key] = {'fingerprint': config.fingerprint(), 'time': time.time()}
+            else:
+                self._records.pop(key, None)
+            self.save()
+        if not valid:
+            self._log.warning('calibration %s failed' % key)
+            laser.setCached(header, False)
+        return True
+
+    def forget(self, laser=None):
+        '''
+        Drop the records of <laser>, or all of them.
+        '''
+        with self._lock:
+            if laser is None:
+                self._records.clear()
+            else:
+                prefix = '%s ' % laser.host
+                for key in [k for k in self._records if k.startswith(prefix)]:
+                    del self._records[key]
+            self.save()
@@ -0,0 +1,246 @@
+# =========================================================================================================
+# Mode configurations for the Insight sweep laser
+# A LaserConfig is compared with the settings the driver last sent (the state cache of
+# insightLaser_instr.insightLaser). apply() sends only what changed, in one batch, and runs the
+# calibration of the mode only when a calibration-relevant setting changed.
+# =========================================================================================================
+
+import dataclasses
+
+import insightLaser_instr
+from insightLaser_instr import COMMANDS, headerMatches
+
+
+class LaserConfig:
+    '''
+    Base class of the mode configurations. Fields left at None are not
+    touched on the laser.
+    '''
+
+    calibrateCommand = None     # name of the calibration command of the mode
+
+    def settings(self):
+        '''
+        (command name, args) for every field that is set, in sending order.
+        '''
+        raise NotImplementedError
+
+    def changes(self, laser):
+        '''
+        The settings whose value differs from the laser's last known state.
+        A setting sent earlier in the list can drop later ones from the
+        cache on the laser side (e.g. the points increment and the sweep
+        geometry), so those are sent again as well.
+        '''
+        changes = []
+        dropped = ()
+        for name, args in self.settings():
+            spec = COMMANDS[name]
+            if headerMatches(spec.header, dropped) or _changed(laser, spec, args):
+                changes.append((name, args))
+                dropped += tuple(spec.invalidates)
+        return changes
+
+    def fingerprint(self):
+        '''
+        The settings the calibration of the mode depends on (the ones that
+        drop it from the cache, plus the sample clock rate), as the SCPI
+        text they are sent with. Two configs with the same fingerprint can
+        share a calibration.
+        '''
+        return self._fingerprint(self.settings())
+
+    def _fingerprint(self, settings):
+        calibration = COMMANDS[self.calibrateCommand].header
+        parts = []
+        for name, args in settings:
+            spec = COMMANDS[name]
+            if name == 'cmd_CONF_SCL_RAT' or headerMatches(calibration, spec.invalidates):
+                arg = spec.format(spec.bind(args, {}))
+                parts.append(spec.header if arg is None else '%s %s' % (spec.header, arg))
+        return ';'.join(parts)
+
+    def needsCalibration(self, laser):
+        '''
+        True if the mode has not been calibrated since a calibration-relevant
+        setting last changed (or since connecting).
+        '''
+        return laser.getCached(COMMANDS[self.calibrateCommand].header) is not True
+
+    def apply(self, laser, calibrate=True, calibrations=None):
+        '''
+        Send the changed settings in one batch, then calibrate the mode if
+        needed. With a <calibrations> cache (insightLaser_calibration), a
+        calibration the laser still holds for this config is reused.
+        return: list of the (command name, args) that were sent
+        '''
+        changes = self.changes(laser)
+        with laser.batch():
+            for name, args in changes:
+                getattr(laser, name)(*args)
+        self._applied(laser)
+        if calibrate and self.needsCalibration(laser):
+            if calibrations is not None:
+                calibrations.calibrate(laser, self)
+            else:
+                getattr(laser, self.calibrateCommand)()
+        return changes
+
+    def _applied(self, laser):
+        pass
+
+
+def _changed(laser, spec, args):
+    '''
+    Compare the value a set command would leave in the cache with the
+    cached one. Commands that do not cache their value always count as
+    changed.
+    '''
+    if spec.store is None:
+        return True
+    expected = spec.store(spec.format(spec.bind(args, {})))
+    return laser.getCached(spec.header) != expected
+
+
+def _keyword(value):
+    if isinstance(value, insightLaser_instr.scpiChoice):
+        return value.name
+    return str(value).upper()
+
+
+@dataclasses.dataclass
+class SweepConfig(LaserConfig):
+    '''
+    Sweep mode. The geometry is set with one of the SBPoints/SBRate/SBSTep
+    commands of <direction>, chosen by which of points, rate or step is
+    given.
+    '''
+    direction: str = 'INCR'
+    points: float = None
+    rate: float = None
+    step: float = None
+    minwvl: float = 'MIN'
+    maxwvl: float = 'MAX'
+    interdelay: float = 0
+    increment: int = None       # points divisible by, 4-256
+    clockrate: float = None     # external sample clock, MHz
+    power: float = None
+    profile: str = None
+    edge: str = None
+
+    calibrateCommand = 'cmd_CAL_SWE'
+
+    def settings(self):
+        settings = []
+        if self.clockrate is not None:
+            settings.append(('cmd_CONF_SCL_RAT', (self.clockrate,)))
+        if self.increment is not None:
+            settings.append(('cmd_CONF_SWE_POIN_INCR', (self.increment,)))
+        emphasis = [(kind, value) for kind, value in
+                    (('SBP', self.points), ('SBR', self.rate), ('SBS', self.step)) if value is not None]
+        if len(emphasis) > 1:
+            raise ValueError('set only one of points, rate or step')
+        if emphasis:
+            kind, value = emphasis[0]
+            settings.append(('cmd_CONF_%s_%s' % (_keyword(self.direction), kind),
+                             (value, self.minwvl, self.maxwvl, self.interdelay)))
+        if self.power is not None:
+            settings.append(('cmd_CONF_SWE_POW', (self.power,)))
+        if self.profile is not None:
+            settings.append(('cmd_CONF_SWE_PROF', (self.profile,)))
+        if self.edge is not None:
+            settings.append(('cmd_CONF_SWE_TRIG', (self.edge,)))
+        return settings
+
+
+@dataclasses.dataclass
+class FixedConfig(LaserConfig):
+    '''
+    Fixed wavelength mode. Give either wavelength (nm) or frequency (THz).
+    Only power and profile need a new calibration.
+    '''
+    wavelength: float = None
+    frequency: float = None
+    power: float = None
+    profile: str = None
+    rolloff: float = 3          # Gaussian rolloff (dB) or CUSTom data file
+    delay: float = None         # Data Valid delay, microseconds
+    clockrate: float = None
+
+    calibrateCommand = 'cmd_CAL_FIX'
+
+    def settings(self):
+        if self.wavelength is not None and self.frequency is not None:
+            raise ValueError('set only one of wavelength or frequency')
+        settings = []
+        if self.clockrate is not None:
+            settings.append(('cmd_CONF_SCL_RAT', (self.clockrate,)))
+        if self.delay is not None:
+            settings.append(('cmd_CONF_FIX_DEL', (self.delay,)))
+        if self.wavelength is not None:
+            settings.append(('cmd_CONF_FIX_WAV', (self.wavelength,)))
+        if self.frequency is not None:
+            settings.append(('cmd_CONF_FIX_FREQ', (self.frequency,)))
+        if self.power is not None:
+            settings.append(('cmd_CONF_FIX_POW', (self.power,)))
+        if self.profile is not None:
+            settings.append(('cmd_CONF_FIX_PROF', (self.profile, self.rolloff)))
+        return settings
+
+
+@dataclasses.dataclass
+class SequenceConfig(LaserConfig):
+    '''
+    Sequence mode. <entries> is the sequence table as a list of ADD
+    commands, appended in order after clearing the table:
+        ('WST', step, length, startwvl, stopwvl)
+        ('FST', step, length, startfqc, stopfqc)
+        ('WAV', wavelength, length)
+        ('LOAD', filename)              table file on the laser
+    The table is only reprogrammed when the entries differ from the ones
+    last applied.
+    '''
+    entries: tuple = None
+    power: float = None
+    interpolation: str = None
+
+    calibrateCommand = 'cmd_CAL_SEQ'
+
+    def __post_init__(self):
+        if self.entries is not None:
+            self.entries = tuple(tuple(e) for e in self.entries)
+
+    def settings(self):
+        settings = []
+        if self.interpolation is not None:
+            settings.append(('cmd_CONF_SEQ_INT', (self.interpolation,)))
+        if self.power is not None:
+            settings.append(('cmd_CONF_SEQ_POW', (self.power,)))
+        return settings
+
+    def tableCommands(self):
+        '''
+        (command name, args) that program the sequence table.
+        '''
+        commands = [('cmd_CONF_SEQ_CLEA', ())]
+        for kind, *args in self.entries:
+            if _keyword(kind) == 'LOAD':
+                commands.append(('cmd_CONF_SEQ_LOAD', tuple(args)))
+            else:
+                commands.append(('cmd_CONF_SEQ_ADD_' + _keyword(kind), tuple(args)))
+        return commands
+
+    def fingerprint(self):
+        if self.entries is None:
+            return super().fingerprint()
+        return self._fingerprint(self.tableCommands() + self.settings())
+
+    def changes(self, laser):
+        changes = super().changes(laser)
+        if self.entries is not None and laser.getCached(insightLaser_instr.SEQUENCE_TABLE) != self.entries:
+            changes = self.tableCommands() + changes
+        return changes
+
+    def _applied(self, laser):
+        if self.entries is not None:
+            laser.setCached(insightLaser_instr.SEQUENCE_TABLE, self.entries)
@@ -0,0 +1,131 @@
+# =========================================================================================================
+# Fleet manager for several Insight sweep lasers
+# Holds one insightLaser connection per host and fans commands and configs out to all of them at
+# once, one worker thread per laser, so a rack comes up in the time of the slowest laser. A laser
+# whose connection dropped is reconnected and the call is retried once.
+# =========================================================================================================
+
+import concurrent.futures
+import logging
+
+import insightLaser_instr
+from insightLaser_instr import CONNECTION_ERRORS
+
+
+class insightFleet:
+    '''
+    hosts: host names or addresses of the lasers
+    Every fan-out call returns {host: result}. A laser that failed has the
+    exception as its result instead of stopping the others.
+    '''
+
+    def __init__(self, hosts):
+
+        self.lasers = {host: insightLaser_instr.insightLaser(host) for host in hosts}
+        self._log = logging.getLogger()
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=max(len(self.lasers), 1))
+
+    def connect(self):
+        '''
+        Connect the lasers that are not connected yet; run() does that
+        before calling the function, which has nothing left to do.
+        return: {host: None or exception}
+        '''
+        return self.run(lambda laser: None, retry=False)
+
+    def close(self):
+        for laser in self.lasers.values():
+            laser.close()
+        self._pool.shutdown()
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def run(self, func, hosts=None, retry=True):
+        '''
+        Call func(laser) for every laser (or those in <hosts>) concurrently.
+        If the connection of a laser is gone it is reconnected and, with
+        <retry>, func is called again.
+        return: {host: return value or exception}
+        '''
+        hosts = list(self.lasers) if hosts is None else list(hosts)
+        futures = {host: self._pool.submit(self._call, self.lasers[host], func, retry)
+                   for host in hosts}
+        results = {}
+        for host, future in futures.items():
+            try:
+                results[host] = future.result()
+            except Exception as exc:
+                self._log.warning('%s: %r' % (host, exc))
+                results[host] = exc
+        return results
+
+    def _call(self, laser, func, retry):
+        if laser.tn is None:
+            laser.connect()
+        try:
+            return func(laser)
+        except CONNECTION_ERRORS:
+            if not retry:
+                raise
+            self._log.warning('%s: connection lost, reconnecting' % laser.host)
+            self.reconnect(laser)
+            return func(laser)
+
+    def reconnect(self, laser):
+        '''
+        New connection that restores the settings and calibrations the
+        laser lost, see insightLaser.recover().
+        '''
+        laser.recover()
+
+    def health(self, hosts=None):
+        '''
+        Identification and status byte of every laser, as
+        {host: (idn, stb)}. Lasers that do not answer are reconnected.
+        '''
+        return self.run(lambda laser: (laser.cmd_IDN_q(refresh=True), laser.cmd_STB_q()), hosts)
+
+    def healthy(self, hosts=None):
+        '''
+        Hosts that answered the health check.
+        '''
+        return [host for host, result in self.health(hosts).items()
+                if not isinstance(result, Exception)]
+
+    def apply(self, config, calibrations=None, hosts=None):
+        '''
+        Apply a LaserConfig (insightLaser_config) to every laser, or a
+        {host: config} dict to the given hosts.
+        return: {host: changes sent, or exception}
+        '''
+        if isinstance(config, dict):
+            return self.run(lambda laser: config[laser.host].apply(laser, calibrations=calibrations),
+                            config if hosts is None else hosts)
+        return self.run(lambda laser: config.apply(laser, calibrations=calibrations), hosts)
+
+    def command(self, name, *args, **kwargs):
+        '''
+        Run the command <name> of insightLaser_instr.COMMANDS on every laser.
+        '''
+        return self.run(lambda laser: getattr(laser, name)(*args, **kwargs))
+
+    def __getattr__(self, name):
+        '''
+        fleet.cmd_XXX(...) runs cmd_XXX on every laser and returns
+        {host: reply}.
+        '''
+        if name not in insightLaser_instr.COMMANDS:
+            raise AttributeError("'%s' object has no attribute '%s'" % (type(self).__name__, name))
+        def method(*args, **kwargs):
+            return self.command(name, *args, **kwargs)
+        method.__name__ = name
+        method.__doc__ = insightLaser_instr.COMMANDS[name].doc
+        return method
+
+    def __dir__(self):
+        return sorted(set(super().__dir__()) | set(insightLaser_instr.COMMANDS))
@@ -1,1408 +1,2307 @@
-# =========================================================================================================
-# This script is used to convert the Insight sweep laser SCPI commands to python commands
-# The laser is connected through Ethernet (IP address: 137.82.251.151; address name: insight-laser; port: 23) 
-# Verison 2.0 (Modified by Jonas)
-# Enxiao 2019-07-26
-# =========================================================================================================
-
-import telnetlib
-import logging
-
-
-class insightLaser:
-    
-    def __init__(self, host='insight-laser'):
-	
-        self.port = 23
-        self.host = host
-		
-		# Logger 
-        logging.basicConfig(format='%(asctime)s: %(message)s', level=logging.INFO)
-        self._log = logging.getLogger()
-		
-        self.tn = None	# handle for telnet object -> initialize empty
-		
-
-    def connect(self):
-        self.tn = telnetlib.Telnet(self.host,self.port)
-        self.tn.read_until(b'atlas ready>')
-
-    def sendCommand(self, cmd):
-        '''
-        cmd: SCPI command as string
-        return: return if successful otherwise rasise error
-        '''
-        self.tn.write((cmd+'\n\r').encode('ascii'))
-		
-    def readResponse(self):
-        '''
-        Convert the bytes back to a proper string
-        return: response from instrument as string
-        '''
-        return self.tn.read_until(b'atlas ready>').decode().strip('atlas ready>')
-
-##############################################################################
-# commonly used commands for the laser.
-        
-    def cmd_CLS(self): 
-        '''
-        Clears status/results queue.
-        '''  
-        self.sendCommand('*CLS')
-        reply = self.readResponse()
-        self._log.info(reply) # error check?
-        return reply
-
-
-    def cmd_ESE(self,onoff): 
-        '''
-        Enables or disables Extended Status/Results.
-        ''' 
-        if(onoff.upper() == 'ON'):
-            self.sendCommand('*ESE ON')
-        elif(onoff.upper() == 'OFF'):
-            self.sendCommand('*ESE OFF')
-        else:
-            print('Please enter "ON/OFF" to enable/disable Extended Status/Results')
-            return
-        reply = self.readResponse()
-        return reply
-    
-            
-    def cmd_ESE_q(self):
-        '''
-        Extended status enable query.
-        '''
-        self.sendCommand('*ESE?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return reply
-
-
-    def command_ESR(self):
-        '''
-        Extended status report query.
-        ''' 
-        self.sendCommand('*ESR?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return reply
-
- 
-    def cmd_IDN_q(self):    
-        '''
-        Get instrument identi
-        cation information.
-        '''
-        self.sendCommand('*IDN?')
-        reply = self.readResponse()
-        self._log.info(reply) 
-        return reply
-
-
-    def cmd_OPC(self):    
-        '''
-        Query the status of the operation complete bit.
-        '''
-        self.sendCommand('*OPC?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return reply
-
-
-
-    def cmd_RST(self):    
-        '''
-        This command resets the system to the values stored in the
-        User Conguration file and the Factory Calibration file.
-        '''    
-        self.sendCommand('*RST')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return reply
-  
-    
-    def cmd_STB_q(self):    
-        '''
-        Returns laser status.
-        Bit 0: Laser is EMITTING
-        Bit 1: Status LED is ON
-        Bit 2: (control thread is) BUSY
-        Bit 3: LED2 is ON
-        Bit 4: Optical switch to USER output
-        Bit 5: Laser is ON
-        Bit 6: Reserved
-        Bit 7: Reserved
-        '''
-        self.sendCommand('*STB?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return reply
-   
-    
-    def cmd_TST_q(self):    
-        '''    
-        Test query.    
-        '''    
-        self.sendCommand('*TST?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return reply
-
-
-    def cmd_WAI(self):  
-        '''    
-        Waits for the laser to complete any pending operations.
-        When no delayed operations are being performed "Idle" is
-        output and the command returns immediately.
-        '''
-        self.sendCommand('*WAI')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return reply
-
-##############################################################################
-# Start a sweep.
-
-## 1) Synchronize the sweep of the laser with the data acquisition system
- 
-    def cmd_SOUR_SYNC_POW(self,amplitude,start_delay,pulse_width,wavelength):   
-        '''
-        This commands the laser to produce a sweep of the laser in
-        which the optical wavelength is constant, but the optical
-        power steps in a pulse of amplitude <Amplitude>, lasting
-        for a width of <Pulse Width> nanoseconds, where the pulse
-        begins at <Start Delay> nanoseconds after Start Sweep.
-        The Power Synchronization pulse repeats with an interval
-        equal to the Number of Sample points times the step period
-        of the sweep, nominally 2.5 nanoseconds per step.
-        Use this function to synchronize the electronic triggers Start
-        Sweep and Data Valid with the acquisition of optical
-        information from the sweep.
-        '''    
-        self.sendCommand(':SOURce:SYNChronize:POWer %a,%s,%s,%s'%(amplitude,start_delay,pulse_width,wavelength))
-        reply = self.readResponse()
-        self._log.info(reply)
-        return reply
-
-    def cmd_SOUR_SYNC_POW_q(self):
-        '''
-        This queries the laser for the parameters of the optical
-        power pulse at the start of the sweep of the laser. The
-        synchronization power pulse enables the user to perform a
-        synchronization of the arrival time of the pulse with the
-        arrival time of triggers: Sweep Start, Sample Clock and Data
-        Valid.
-        '''
-        self.sendCommand(':SOURce:SYNChronize:POWer?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return reply
-
-####################
-## 2) Use the sweep synchronization procedure to adjust delays on the 
-##    Sweep Start, Sample Clock and Data Valid Trigge
-    
-    def cmd_SOUR_CORR_DVD(self,delay):
-        '''
-        This command sets the delay of the data valid pulses that
-        are sent to the user, in units of ns. The resolution of the
-        delay value is 0.15 nsec.
-        '''
-        self.sendCommand(':SOURce:CORRection:DVDelay %s'%(delay))
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-
-    def cmd_SOUR_CORR_DVD_q(self):
-        '''
-        This command returns the delay of the data valid pulses
-        that are sent to the user.
-        '''
-        self.sendCommand(':SOURce:CORRection:DVDelay?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-
-    def cmd_SOUR_CORR_DVD_TOT_q(self):
-        '''
-        This command returns the total delay of the data valid signal
-        sent to the user, in units of ns. The total delay is defined as
-        the user specified part plus the factory specified part.
-        '''
-        self.sendCommand(':SOURce:CORRection:DVDelay:TOTal?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-
-    def cmd_SOUR_CORR_SCD(self,delay):
-        '''
-        This command sets the delay of the sample clock that is
-        sent to the user, in units of nanoseconds. The resolution is
-        0.178 ns.
-        '''
-        self.sendCommand(':SOURce:CORRection:SCDelay %s'%(delay))
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-
-
-    def cmd_SOUR_CORR_SCD_q(self):
-        '''
-        This command returns the delay of the sample clock that is
-        sent to the user.
-        '''
-        self.sendCommand(':SOURce:CORRection:SCDelay?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-    def cmd_SOUR_CORR_SSD(self,delay):
-        '''
-        This command sets the delay of the sweep start that is sent
-        to the user, in units of ns. The resolution is 0.15 ns.
-        For this command, because of the discretization
-        requirement, the laser returns to the user the actual delay
-        the system will execute.
-        '''
-        self.sendCommand(':SOURce:CORRection:SSDelay %s'%(delay))
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-
-    def cmd_SOUR_CORR_SSD_q(self):
-        '''
-        This command returns the delay of the sweep start that is
-        sent to the user.
-        '''
-        self.sendCommand(':SOURce:CORRection:SSDelay?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-        
-    def cmd_SOUR_CORR_SSD_TOT_q(self):
-        '''
-        This command returns the total delay of the sweep start
-        signal sent to the user, in units of ns. The total delay is
-        defined as the user specified part plus the factory specified part.
-    '''
-        self.sendCommand(':SOURce:CORRection:SSDelay:TOTal?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-#####################
-## 3) Set the Sweep Parameters
-
-    def cmd_CONF_SWE_WMIN(self,wavelength):
-        '''
-        Set the minimum wavelength of a sweep.
-        '''
-        self.sendCommand(':CONFigure:SWEep:WMINimum %s'%(wavelength))
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-    def cmd_CONF_SWE_WMIN_q(self):
-        '''
-        Returns the minimum wavelength of a sweep.
-        '''
-        self.sendCommand(':CONFigure:SWEep:WMINimum?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-    def cmd_CONF_SWE_FMIN(self,frequency):
-        '''
-        Set the minimum optical frequency of a sweep.
-        '''
-        self.sendCommand(':CONFigure:SWEep:FMINimum %s'%(frequency))
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-        
-    def cmd_CONF_SWE_FMIN_q(self):
-        '''
-        Returns the minimum optical frequency of a sweep.
-        '''
-        self.sendCommand(':CONFigure:SWEep:FMINimum?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-    def cmd_CONF_SWE_DIR(self,direct):
-        '''
-        This command sets the direction of the wavelength sweeps
-        of the laser. Options are to sweep the laser with increasing
-        wavelength, decreasing wavelength, bidirectionally with
-        increasing wavelength first or bidirectionally with decreasing
-        wavelength first.
-        '''
-        if(direct.upper() == 'INCR'):
-            self.sendCommand(':CONFigure:SWEep:DIRection INCReasing')
-        elif(direct.upper() == 'DECR'):
-            self.sendCommand(':CONFigure:SWEep:DIRection DECReasing')
-        elif(direct.upper() == 'BINC'):
-            self.sendCommand(':CONFigure:SWEep:DIRection BINCreasing')
-#        self.sendCommand(':CONFigure:SWEep:FMINimum %s'%(direction.upper()))
-        else:
-            print('Please enter "INCR/DECR/BINC" to select the increasing/decreasing/bidirectional sweep of the laser.')
-            return
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-    def cmd_CONF_SWE_DIR_q(self):
-        '''
-        This command returns the direction of the wavelength
-        sweep of the laser.
-        '''
-        self.sendCommand(':CONFigure:SWEep:DIRection?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-    def cmd_CONF_SWE_POIN(self,points):
-        '''
-        This command sets the number of measurement points in a
-        sweep.
-        The number of points to use to compose a sweep. Use the
-        keyword "MAXimum" in place of the number of <Points>
-        to perform a non-decimated sweep of the
-        laser with the largest number of sweep points. (integer,
-        1-131071).
-        '''
-        self.sendCommand(':CONFigure:SWEep:POINts %s'%(points))
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-    def cmd_CONF_SWE_POIN_q(self):
-        '''
-        Returns the number of measurement points in a sweep.
-        '''
-        self.sendCommand(':CONFigure:SWEep:POINts?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-    def cmd_CONF_SWE_WMAX(self,wavelength):
-        '''
-        Set the maximum wavelength of a sweep.
-        '''
-        self.sendCommand(':CONFigure:SWEep:WMAXimum %s'%(wavelength))
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-        
-    def cmd_CONF_SWE_WMAX_q(self):
-        '''
-        Returns the maximum wavelength of a sweep.
-        '''
-        self.sendCommand(':CONFigure:SWEep:WMAXimum?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-    def cmd_CONF_SWE_FMAX(self,frequency):
-        '''
-        Set the maximum optical frequency of a sweep.
-        '''
-        self.sendCommand(':CONFigure:SWEep:FMAXimum %s'%(frequency))
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-        
-    def cmd_CONF_SWE_FMAX_q(self):
-        '''
-        Returns the maximum optical frequency of a sweep.
-        '''
-        self.sendCommand(':CONFigure:SWEep:FMAXimum?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-    def cmd_CONF_SWE_RAT(self,rate):
-        '''
-        This command sets the sweep repetition rate.
-        Sweep repetition rate (float, 1-10000, kHz).
-        '''
-        self.sendCommand(':CONFigure:SWEep:RATe %s'%(rate))
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-    def cmd_CONF_SWE_RAT_q(self):
-        '''
-        Returns the sweep repetition rate.
-        '''
-        self.sendCommand(':CONFigure:SWEep:RATe?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-    def cmd_CONF_SWE_DEL(self,delay):
-        '''
-        This command sets the inter-sweep delay time, during this
-        time the laser output is attenuated until the next sweep
-        starts.
-        The inter-sweep delay time, during this time the laser output
-        is attenuated
-        (float, 0-655350, nanoseconds).
-        '''
-        self.sendCommand(':CONFigure:SWEep:DELay %s'%(delay))
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-    def cmd_CONF_SWE_DEL_q(self):
-        '''
-        This command queries the inter-sweep delay time, during
-        this time the laser output is attenuated until the next sweep
-        starts.
-        '''
-        self.sendCommand(':CONFigure:SWEep:DELay?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-    def cmd_CONF_SWE_POW(self,power):
-        '''
-        This command sets the average power level of the sweep.
-        For a flat power profile, the average power = the flat power
-        level. For a Gaussian profile with a full-width half-maximum
-        equal to the scan range, the peak power of the Gaussian =
-        1.235 * Average Power. Using the power calibration of
-        milliwatts of power to counts, the entered average power is
-        converted to counts, which the power-level routine uses as
-        its target value.
-        The average power level to set the laser to for sweeping
-        (float, mW).
-        '''
-        self.sendCommand(':CONFigure:SWEep:POWer %s'%(power))
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-    def cmd_CONF_SWE_POW_q(self):
-        '''
-        Returns the average power of a sweep.
-        '''
-        self.sendCommand(':CONFigure:SWEep:POWer?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-    def cmd_CONF_SWE_PROF(self,profile):
-        '''
-        This command set the power vs. table index profile.
-        The Flat profile sets the optical power at each wavelength in
-        a sweep equal to the average power level set in
-        :CONFigure:SWEep:POWer.
-        The Gaussian power profile sets the peak optical power at
-        the center of the sweep range, with the peak power value
-        determined by the average power requested with
-        :CONFigure:SWEep:POWer.
-        
-        If CUSTom is the Profile Type, this is the data file to use.
-        The data file should contain only floating point numbers in
-        one column. When reading the data file: blank lines are
-        ignored; the data is scaled to the number of points in the
-        sweep; if the values are not in the range [0, 1], they will be
-        normalized to the range [0, 1]; negative values are not
-        accepted; more than 1 million entries are not accepted. If
-        GAUSsian is the ProfileType, this is the power rollo at the
-        beginning and end of the laser wavelength range, relative to
-        the peak power at the center of the range
-        
-        (float, 1-10, dB). If not entered, the previously entered value
-        will be used, or the default if there was no previously entered
-        value.
-        '''
-        if(profile.upper() == 'FLAT'):
-           self.sendCommand(':CONFigure:SWEep:PROFile FLAT')
-        elif(profile.upper() == 'GAUSSIAN'):
-           self.sendCommand(':CONFigure:SWEep:PROFile GAUSsian')
-        elif(profile.upper() == 'CUSTOM'):
-           self.sendCommand(':CONFigure:SWEep:PROFile CUSTom')
-        else:
-            print('Please enter "FLAT/GAUSSIAN/CUSTOM" to select the power profile type: flat, gaussian or custom.')
-            return
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-    def cmd_CONF_SWE_PROF_q(self):
-        '''
-        Returns the power vs. wavelength profile.
-        '''
-        self.sendCommand(':CONFigure:SWEep:PROFile?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-    def cmd_CONF_SWE_TRIG(self,edge):
-        '''
-        This command sets the edge of the Start Sweep trigger that
-        corresponds to the start of a wavelength sweep.
-        Trigger edge setting (RISing, FALLing, BOTH).
-        '''
-        if(edge.upper() == 'RIS'):
-           self.sendCommand(':CONFigure:SWEep:TRIGger RISing')
-        elif(edge.upper() == 'FALL'):
-           self.sendCommand(':CONFigure:SWEep:TRIGger FALLing')
-        elif(edge.upper() == 'BOTH'):
-           self.sendCommand(':CONFigure:SWEep:TRIGger BOTH')
-        else:
-            print('Please enter "RIS/FALL/BOTH" to set the edge of the Start Sweep trigger: rising, falling or both.')
-            return
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-    def cmd_CONF_SWE_TRIG_q(self):
-        '''
-        This command returns the edge of the Start Sweep trigger
-        that corresponds to the start of a wavelength sweep.
-        '''
-        self.sendCommand(':CONFigure:SWEep:TRIGger?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-    
-####################
-## 3) Calibrate the laser
-
-    def cmd_CAL_SWE(self):    
-        '''   
-        This command initiates immediate calibration of a laser
-        sweep. Also referred to as sweep calibration.
-        '''
-        self.sendCommand(':CALibrate:SWEep')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return reply
-    
-    def cmd_CONF_SWE_STEP(self,step):
-        '''
-        This command sets the sweep optical frequency step 
-        between points in a sweep.
-        Sweep step size (fl􏰥oat, .05-10000, GHz).
-        '''
-        self.sendCommand(':CONFigure:SWEep:STEP %s'%(step))
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-    def cmd_CONF_SWE_STEP_q(self):
-        '''
-        This command reads the optical frequency step 
-        between points in a sweep.
-        '''
-        self.sendCommand(':CONFigure:SWEep:STEP?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-####################
-## 4) Read the Data Invalid Vector (DIV) 
-##    and the total number of points in the sweep
-    
-    def cmd_CONF_SWE_DIV_q(self):
-        '''
-        Reads the Data Invalid Vector (DIV) from the laser. 
-        The DIV indicates in Sample Clocks where the optical
-        frequency has not stepped and the data is invalid.
-        '''
-        self.sendCommand(':CONFigure:SWEep:DIVector?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-    def cmd_CONF_SWE_POIN_TOT_q(self):
-        '''
-        This command returns the total number of points in
-        the sweep, which equals the number of measurement 
-        points (at which the optical frequency has changed 
-        by a de􏰤ned interval) + the number of invalid points 
-        (at which the optical frequency of the laser is not changing).
-        '''
-        self.sendCommand(':CONFigure:SWEep:POINts:TOTal?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-####################
-## 5) Start a sweep
-        
-    def cmd_INIT_SWE(self):
-        '''
-        This command starts the laser sweep.
-        '''
-        self.sendCommand(':INITiate:SWEep')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return   
-
-###################
-## 6) To end the sweep and diable output  
-        
-    def cmd_ABOR(self):    
-        '''    
-        This command aborts the current operation and returns the
-        laser to standby mode with no light exiting the laser to the
-        user. This includes aborting calibration operations, such as:
-        :CALibrate:SWEep
-        :CALibrate:FACTory
-        :CALibrate:RELAtive:SPLitref
-        :CALibrate:DARK
-        '''
-        self.sendCommand(':ABORt')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return reply
-
-#%% Command from the Insight-laser UI
-
-    def cmd_SYST_CONT(self,mode):
-        '''
-        This sets the control mode of the device
-        '''
-        if(mode.upper() == 'HARD'):
-           self.sendCommand(':SYSTem:CONTrol HARDware')
-        elif(mode.upper() == 'SOFT'):
-           self.sendCommand(':SYSTem:CONTrol SOFTware')
-        else:
-            print('Please enter "HARD/SOFT" to set the control mode of the device: Hardware or Software')
-            return
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-    def cmd_CONF_SCL_RAT(self,rate):
-        '''
-        This command speci􏰤es the rate of the external sample clock, 
-        which is used for communicating to other instrumentation when 
-        to sample data measured with a sweep of the laser.
-        This command does not affect any other commands regarding points, 
-        per point, or indices. Those commands will use the :SYSTem:CLOCk rate.
-        See :SYSTem:CLOCk for the internal sample clock.
-        A value below 112 MHz may result in undefined behavior.
-        The rate to operate the external sample clock. 
-        A value below 112 MHz may result in
-        undefi􏰤ned behavior (float, 1-400, MHz).
-        '''
-        self.sendCommand(':CONFigure:SCLock:RATe %s'%(rate))
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-    def cmd_CONF_SCL_RAT_q(self):
-        '''
-        This command returns the rate of the external sample clock, 
-        which is used for communicating to other instrumentation 
-        when to sample data measured with a sweep of the laser. 
-        This command does not affect any other commands regarding points, 
-        per point, or indices. Those commands will use the :SYSTem:CLOCk rate.
-        See :SYSTem:CLOCk for the internal sample clock.
-        '''
-        self.sendCommand(':CONFigure:SCLock:RATe?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-    def cmd_SYST_ERR_ALL_q(self):
-        '''
-        Queries the error/event queue for all unread items and removes them 
-        from the queue.
-        '''
-        self.sendCommand(':SYSTem:ERRor:ALL?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-    
-    def cmd_SYST_ERR_q(self):
-        '''
-        Queries the error/event queue for the next item and removes it from 
-        the queue.
-        '''
-        self.sendCommand(':SYSTem:ERRor?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-    def cmd_SYST_ERR_NEXT_q(self):
-        '''
-        Queries the error/event queue for the next item and removes it from 
-        the queue.
-        '''
-        self.sendCommand(':SYSTem:ERRor:NEXT?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-    def cmd_SYST_ERR_CODE_q(self):
-        '''
-        Queries the error/event queue for the next item, returns only the error 
-        code and removes it from the queue.
-        '''
-        self.sendCommand(':SYSTem:ERRor:CODE?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-    def cmd_SYST_ERR_CODE_NEXT_q(self):
-        '''
-        Queries the error/event queue for the next item, returns only the error 
-        code and removes it from the queue.
-        '''
-        self.sendCommand(':SYSTem:ERRor:CODE:NEXT?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-    def cmd_SYST_ERR_CODE_ALL_q(self):
-        '''
-        Queries the error/event queue for all unread items, returns only the error 
-        codes and removes them from the queue.
-        '''
-        self.sendCommand(':SYSTem:ERRor:CODE:ALL?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
- 
-#######################################
-        
-### increasing
-    def cmd_CONF_INCR_SBP(self,points,minwvl,maxwvl,interdelay):
-        '''
-        This command sets up an increasing sweep configuration
-        with an emphasis on points.
-        :CAL:SWE must be performed after issuing this command
-        to get the desired effect.
-        E.G. atlas ready> :CONF:SBP MAX, 1550 nm, 1555 nm, 0 ns
-        :CONFigure:INCReasing:SBPoints 1033, 1550 nm, 1551 nm,
-        0 ns
-        =>
-        '''
-        self.sendCommand(':CONFigure:SBPoints %a,%s,%s,%s'%(points,minwvl,maxwvl,interdelay))
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-
-    def cmd_CONF_INCR_SBP_q(self):
-        '''
-        This command queries the current increasing sweep
-        configuration with an emphasis on points.
-        '''
-        self.sendCommand(':CONFigure:SBPoints?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-
-    def cmd_CONF_INCR_SBR(self,rate,minwvl,maxwvl,interdelay):
-        '''
-        This command sets up an increasing sweep configuration
-        with an emphasis on sweep rate.
-        :CAL:SWE must be performed after issuing this command
-        to get the desired effect.
-        atlas ready> :CONF:SBR MIN
-        :CONFigure:INCReasing:SBRate 8.57753 kHz, 1524.41 nm,
-        1562.07 nm, 0 ns
-        =>
-        '''
-        self.sendCommand(':CONFigure:SBRate %a,%s,%s,%s'%(rate,minwvl,maxwvl,interdelay))
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-
-    def cmd_CONF_INCR_SBR_q(self):
-        '''
-        This command queries the current increasing sweep
-        configuration with an emphasis on rate.
-        '''
-        self.sendCommand(':CONFigure:SBRate?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-
-    def cmd_CONF_INCR_SBS(self,step,minwvl,maxwvl,interdelay):
-        '''
-        This command sets up an increasing sweep configuration
-        with an emphasis on optical
-        frequency step. :CAL:SWE must be performed after issuing
-        this command to get the desired effect.
-        atlas ready> :CONF:SBST .1, MIN, MAX, MIN
-        :CONFigure:INCReasing:SBSTep .1 GHz, 1524.41 nm,
-        1562.07 nm, 0 ns
-        =>
-        '''
-        self.sendCommand(':CONFigure:SBSTep %a,%s,%s,%s'%(step,minwvl,maxwvl,interdelay))
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-
-    def cmd_CONF_INCR_SBS_q(self):
-        '''
-        This command queries the current increasing sweep
-        configuration with an emphasis on optical frequency step.
-        '''
-        self.sendCommand(':CONFigure:SBSTep?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-#### decreasing    
-    def cmd_CONF_DECR_SBP(self,points,minwvl,maxwvl,interdelay):
-        '''
-        This command sets up a decreasing sweep configuration
-        with an emphasis on points.
-        :CAL:SWE must be performed after issuing this command
-        to get the desired effect.
-        atlas ready> :CONF:DECR:SBP MAX, 1550 nm, 1555 nm,
-        0 ns
-        :CONFigure:DECReasing:SBPoints 1033, 1550 nm, 1551
-        nm, 0 ns
-        =>
-        '''
-        self.sendCommand(':CONFigure:DECReasing:SBPoints %a,%s,%s,%s'%(points,minwvl,maxwvl,interdelay))
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-
-    def cmd_CONF_DECR_SBP_q(self):
-        '''
-        This command queries the current decreasing sweep
-        con
-guration with an emphasis on points.
-        '''
-        self.sendCommand(':CONFigure:DECReasing:SBPoints?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return		
-
-    def cmd_CONF_DECR_SBR(self,rate,minwvl,maxwvl,interdelay):
-        '''
-        This command sets up an decreasing sweep configuration
-        with an emphasis on sweep rate.
-        :CAL:SWE must be performed after issuing this command
-        to get the desired effect.
-        atlas ready> :CONF:SBR MIN
-        :CONFigure:INCReasing:SBRate 8.57753 kHz, 1524.41 nm,
-        1562.07 nm, 0 ns
-        =>
-        '''
-        self.sendCommand(':CONFigure:DECReasing:SBRate %a,%s,%s,%s'%(rate,minwvl,maxwvl,interdelay))
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-
-    def cmd_CONF_DECR_SBR_q(self):
-        '''
-        This command queries the current decreasing sweep
-        configuration with an emphasis on rate.
-        '''
-        self.sendCommand(':CONFigure:DECReasing:SBRate?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return	
-		
-    def cmd_CONF_DECR_SBS(self,step,minwvl,maxwvl,interdelay):
-        '''
-        This command sets up an decreasing sweep configuration
-        with an emphasis on optical
-        frequency step. :CAL:SWE must be performed after issuing
-        this command to get the desired effect.
-        atlas ready> :CONF:SBST .1, MIN, MAX, MIN
-        :CONFigure:INCReasing:SBSTep .1 GHz, 1524.41 nm,
-        1562.07 nm, 0 ns
-        =>
-        '''
-        self.sendCommand(':CONFigure:DECReasing:SBSTep %a,%s,%s,%s'%(step,minwvl,maxwvl,interdelay))
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-
-    def cmd_CONF_DECR_SBS_q(self):
-        '''
-        This command queries the current decreasing sweep
-        configuration with an emphasis on optical frequency step.
-        '''
-        self.sendCommand(':CONFigure:DECReasing:SBSTep?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return   
-    
-#### bincreasing   
-    def cmd_CONF_BINC_SBP(self,points,minwvl,maxwvl,interdelay):
-        '''
-        This command sets up a bidirectional sweep configuration
-        with an emphasis on points.
-        :CAL:SWE must be performed after issuing this command
-        to get the desired effect.
-        atlas ready> :CONF:DECR:SBP MAX, 1550 nm, 1555 nm,
-        0 ns
-        :CONFigure:DECReasing:SBPoints 1033, 1550 nm, 1551
-        nm, 0 ns
-        =>
-        '''
-        self.sendCommand(':CONFigure:BINCreasing:SBPoints %a,%s,%s,%s'%(points,minwvl,maxwvl,interdelay))
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-
-    def cmd_CONF_BINC_SBP_q(self):
-        '''
-        This command queries the current bidirectional sweep
-        con
-guration with an emphasis on points.
-        '''
-        self.sendCommand(':CONFigure:BINCreasing:SBPoints?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return		
-
-    def cmd_CONF_BINC_SBR(self,rate,minwvl,maxwvl,interdelay):
-        '''
-        This command sets up an bidirectional sweep configuration
-        with an emphasis on sweep rate.
-        :CAL:SWE must be performed after issuing this command
-        to get the desired effect.
-        atlas ready> :CONF:SBR MIN
-        :CONFigure:INCReasing:SBRate 8.57753 kHz, 1524.41 nm,
-        1562.07 nm, 0 ns
-        =>
-        '''
-        self.sendCommand(':CONFigure:BINCreasing:SBRate %a,%s,%s,%s'%(rate,minwvl,maxwvl,interdelay))
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-
-    def cmd_CONF_BINC_SBR_q(self):
-        '''
-        This command queries the current bidirectional sweep
-        configuration with an emphasis on rate.
-        '''
-        self.sendCommand(':CONFigure:BINCreasing:SBRate?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return	
-		
-    def cmd_CONF_BINC_SBS(self,step,minwvl,maxwvl,interdelay):
-        '''
-        This command sets up an bidirectional sweep configuration
-        with an emphasis on optical
-        frequency step. :CAL:SWE must be performed after issuing
-        this command to get the desired effect.
-        atlas ready> :CONF:SBST .1, MIN, MAX, MIN
-        :CONFigure:INCReasing:SBSTep .1 GHz, 1524.41 nm,
-        1562.07 nm, 0 ns
-        =>
-        '''
-        self.sendCommand(':CONFigure:BINCreasing:SBSTep %a,%s,%s,%s'%(step,minwvl,maxwvl,interdelay))
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-
-    def cmd_CONF_BINC_SBS_q(self):
-        '''
-        This command queries the current bidirectional sweep
-        configuration with an emphasis on optical frequency step.
-        '''
-        self.sendCommand(':CONFigure:BINCreasing:SBSTep?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return     
-    
-    def cmd_CONF_SWE_POIN_INCR(self,multiple):
-        '''
-        This command sets the number of points by which the
-        sweep should be divisible. Valid options
-        are from 4-256 in increments of 4.
-        '''
-        self.sendCommand(':CONFigure:SWEep:POINts:INCRement %s'%(multiple))
-        reply = self.readResponse()
-        self._log.info(reply)
-        return 
-    
-    def cmd_CONF_SWE_POIN_INCR_q(self):
-        '''
-        Returns the number of points by which the sweep is divisible.
-        '''
-        self.sendCommand(':CONFigure:SWEep:POINts:INCRement?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return   
-    
-###############################################
-## Sequence mode 
-    def cmd_CONF_SEQ_q(self):
-        '''
-        This command queries the list of wavelength/frequency data
-        in the sequence sweep and how much time is spent on each
-        wavelength/frequency before moving on to the next point.
-        '''
-        self.sendCommand(':CONFigure:SEQuence?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return 
-    
-    def cmd_CONF_SEQ_CLEA(self):
-        '''
-        This command clears all the wavelengths/frequencies in the
-        sequence sweep.
-        '''
-        self.sendCommand(':CONFigure:SEQuence:CLEAr')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return         
-    
-    def cmd_CONF_SEQ_ADD_WST(self,step,length,startwvl,stopwvl,position=-1): 
-        '''
-        This command appends a series of wavelengths to the
-        sequence sweep and sets the amount of time to spend at
-        each desired wavelength/frequency.
-        STEP: The step value to increment by to add entries to the
-        sequence sweep (in nanometers).
-        LENGTH: The amount of time, in nanoseconds, to sit at the desired
-        wavelength.
-        STARWVL: The starting wavelength for the new entries (nanometers,
-        defaults to minimum wavelength).
-        STOPWVL: The stopping wavelength for the new entries (nanometers,
-        defaults to maximum wavelength).
-        POSITION: The position in the sequence table to add the wavelength
-        (defaults to the end: -1).
-        '''
-        self.sendCommand(':CONFigure:SEQuence:ADD:WSTep %a,%s,%s,%s,%g' %(step,length,startwvl,stopwvl,position))
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-    def cmd_CONF_SEQ_ADD_FST(self,step,length,startfqc,stopfqc,position=-1):    
-        '''
-        This command appends a series of wavelengths to the
-        sequence sweep and sets the amount of time to spend at
-        each desired wavelength/frequency.
-        STEP: The step value to increment by to add entries to the
-        sequence sweep (in nanometers).
-        LENGTH: The amount of time, in nanoseconds, to sit at the desired
-        wavelength.
-        STARFQC: The starting frequency for the new entries (nanometers,
-        defaults to minimum wavelength).
-        STOPFQC: The stopping frequency for the new entries (nanometers,
-        defaults to maximum wavelength).
-        POSITION: The position in the sequence table to add the wavelength
-        (defaults to the end: -1).
-        '''
-        self.sendCommand(':CONFigure:SEQuence:ADD:FSTep %a,%s,%s,%s,%g' %(step,length,startfqc,stopfqc,position))
-        reply = self.readResponse()
-        self._log.info(reply)
-        return    
-    
-    def cmd_CONF_SEQ_INT(self,onoff):
-        '''
-        Whether or not wavelength interpolation will be performed
-        for sequence mode (boolean). Default to o.
-        '''
-        if(onoff.upper() == 'ON'):
-           self.sendCommand(':CONFigure:SEQuence:INTerpolation ON')
-        elif(onoff.upper() == 'OFF'):
-           self.sendCommand(':CONFigure:SEQuence:INTerpolation OFF')
-        else:
-            print('Please enter "ON/OFF" to set turn on/off the wavelength interpolation for sequence mode')
-            return
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-    def cmd_CONF_SEQ_ADD_WAV(self,value,length,position=-1):
-        '''
-        This command appends a wavelength to the
-        sequence sweep and sets the amount of time to spend at
-        that desired wavelength/frequency. It can be used to created 
-        step-by-step via command
-        '''
-        self.sendCommand(':CONFigure:SEQuence:ADD:WAVelength %a,%s,%s' %(value,length,position))
-        reply = self.readResponse()
-        self._log.info(reply)
-        return   
-    
-    def cmd_CONF_SEQ_LOAD(self,filename):
-        '''
-        This command imports the sequence sweep table containing
-        the set of wavelengths/frequencies and how much time to
-        spend at each desired wavelength/frequency.
-        '''
-        self.sendCommand(':CONFigure:SEQuence:LOAD %a' %(filename))
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-    def cmd_CONF_SEQ_SAV(self,filename):
-        '''
-        This command exports the sequence sweep table containing
-        the set of wavelengths/frequencies and how much time to
-        spend at each desired wavelength/frequency.
-        '''
-        self.sendCommand(':CONFigure:SEQuence:SAVe %a' %(filename))
-        reply = self.readResponse()
-        self._log.info(reply)
-        return    
-    
-    def cmd_CONF_SEQ_POW(self,power):
-        '''
-        This command sets the output power of the laser in
-        sequence mode, using units of mW.
-        For the new power value to take effect, the user must
-        command the laser to calibrate the power for all sequence
-        wavelengths using :CALibrate:SEQuence.
-        The average power level to set the laser to for sequence
-        mode (float, mW).
-        '''
-        self.sendCommand(':CONFigure:SEQuence:POWer %s' %(power))
-        reply = self.readResponse()
-        self._log.info(reply)
-        return 
-        
-    def cmd_CONF_SEQ_POW_q(self):
-        '''
-        This command returns the output power of the laser in
-        sequence wavelength mode, using units of mW.
-        '''
-        self.sendCommand(':CONFigure:SEQuence:POWer?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return     
-    
-    def cmd_CONF_SEQ_REM(self,ID):
-        '''
-        This command removes the requested entry from the
-        sequence sweep table, the id is a zero-based row index
-        indicating which entry to remove (0 removes the 
-        rst entry).
-        The special value '-1' removes the last entry from the table.
-        '''
-        self.sendCommand(':CONFigure:SEQuence:REMove %s' %(ID))
-        reply = self.readResponse()
-        self._log.info(reply)
-        return         
-    
-    def cmd_CAL_SEQ(self):
-        '''
-        This command calibrates the laser to operate at the specified
-        average power and profile in Sequence Mode. User input
-        values for sequences of wavelengths/frequencies to sweep
-        are not applied until :CALibrate:SEQuence is executed.
-        '''
-        self.sendCommand(':CALibrate:SEQuence')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return    
-
-    def cmd_CAL_SEQ_q(self):
-        '''
-        This command queries the results of the last sequence
-        calibration.
-        '''
-        self.sendCommand(':CALibrate:SEQuence?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-    def cmd_INIT_SEQ(self):
-        '''
-        This command sets the laser into Sequence mode. In
-        Sequence mode the laser steps between a a predefined set of
-        wavelengths/frequencies.
-        '''
-        self.sendCommand(':INITiate:SEQuence')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return        
-###############################################################################
-## For fixed wavelength mode
-    def cmd_CAL_FIX(self):
-        '''
-        This command calibrates the laser to operate at the
-        specified average power and profile in Fixed Wavelength
-        Mode. User input values for average power and profile are
-        not changed until :CALibrate:FIXed is executed.
-        '''
-        self.sendCommand(':CALibrate:FIXed')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return   
-    def cmd_CAL_FIX_q(self):
-        '''
-        This command queries the state of the last 
-xed calibration.
-        '''
-        self.sendCommand(':CALibrate:FIXed?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return     
- 
-    def cmd_CONF_FIX_DEL(self,Delay):
-        '''
-        The delay time between receiving a wavelength value and
-        when the Data Valid signal will
-        be set to a logic high value (float, 0-100000, microseconds).
-        '''
-        self.sendCommand(':CONFigure:FIXed:DELay %s' %(Delay))
-        reply = self.readResponse()
-        self._log.info(reply)
-        return      
-    
-    def cmd_CONF_FIX_DEL_q(self):
-        '''
-        This command queries the delay between receiving a set
-        wavelength value and when the Data Valid trigger is raised
-        to high, indicating to external user hardware that the laser
-        has reached the desired wavelength.
-        '''
-        self.sendCommand(':CONFigure:FIXed:DELay?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return      
-
-    def cmd_CONF_FIX_FREQ(self,frequency):
-        '''
-        This commands the laser to a 
-xed optical frequency in
-        units of THz.
-        '''
-        self.sendCommand(':CONFigure:FIXed:FREQuency %s' %(frequency))
-        reply = self.readResponse()
-        self._log.info(reply)
-        return  
-    
-    def cmd_CONF_FIX_FREQ_q(self):
-        '''
-        This command returns the optical frequency of the laser in
-        Terahertz when in Fixed wavelength mode.
-        '''
-        self.sendCommand(':CONFigure:FIXed:FREQuency?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return     
-    
-    def cmd_CONF_FIX_WAV(self,wavelength):
-        '''
-        This commands the laser to a fixed optical wavelength in
-        units of nm.
-        '''
-        self.sendCommand(':CONFigure:FIXed:WAVelength %s' %(wavelength))
-        reply = self.readResponse()
-        self._log.info(reply)
-        return  
-    
-    def cmd_CONF_FIX_WAV_q(self):
-        '''
-        This command returns the optical wavelength of the laser in
-        nm when in Fixed wavelength mode.
-        '''
-        self.sendCommand(':CONFigure:FIXed:WAVelength?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return     
-    
-    def cmd_CONF_FIX_POW(self,power):
-        '''
-        This command sets the output power of the laser in 
-xed
-        wavelength mode, using units of mW.
-        For the new power value to take eect, the user must
-        command the laser to calibrate the power for all 
-xed
-        wavelengths using :CALibrate:FIXed.
-        '''
-        self.sendCommand(':CONFigure:FIXed:POWer %s' %(power))
-        reply = self.readResponse()
-        self._log.info(reply)
-        return     
-    
-    def cmd_CONF_FIX_POW_q(self):
-        '''
-        This command returns the output power of the laser in 
-xed
-        wavelength mode, using units of mW.
-        '''
-        self.sendCommand(':CONFigure:FIXed:POWer?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return  
-    
-    def cmd_CONF_FIX_PROF(self,profile,power=3):
-        '''
-        If CUSTom is the Profile Type, this is the data file to use.
-        The data file should contain only floating point numbers in
-        one column. When reading the data file: blank lines are
-        ignored; the data is scaled to the number of points in the
-        sweep; if the values are not in the range [0, 1], they will be
-        normalized to the range [0, 1]; negative values are not
-        accepted; more than 1 million entries are not accepted. If
-        GAUSsian is the Profile Type, this is the power rolloff at the
-        beginning and end of the laser wavelength range, relative to
-        the peak power at the center of the range.
-        (float, 1-10, dB). If not entered, the previously entered value
-        will be used, or the default if there was no previously entered
-        value.
-        ''' 
-        if(profile.upper() == 'FLAT'):
-           self.sendCommand(':CONFigure:FIXed:PROFile FLAT')
-        elif(profile.upper() == 'GAUSSIAN'):
-           self.sendCommand(':CONFigure:FIXed:PROFile GAUSsian,%s' %(power))
-        elif(profile.upper() == 'CUSTOM'):
-           self.sendCommand(':CONFigure:FIXed:PROFile CUSTom,%s' %(power))
-        else:
-            print('Please enter "FLAT/GAUSSIAN/CUSTOM" to set profile type for fixed wavelength mode')
-            return
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-    def cmd_CONF_FIX_PROF_q(self):
-        '''
-        This command returns the power vs. wavelength profile of
-        the laser in Fixed Wavelength mode.
-        '''
-        self.sendCommand(':CONFigure:FIXed:PROFile?')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return    
-    
-    def cmd_INIT_FIX(self):
-        '''
-        This command sets the laser into a fixed wavelength mode.
-        In Fixed mode, the laser may be output to the user or
-        switched off to the user and remain internal to the laser.
-        Fixed mode has its own Calibration that must be performed
-        when the average power, power spectral profile or coherence
-        length is changed.
-        '''
-        self.sendCommand(':INITiate:FIXed')
-        reply = self.readResponse()
-        self._log.info(reply)
-        return
-    
-    
-    
-    
-    
-    
-    
-    
-    
-    
-    
-    
-# this part needs to be at the end of the file. 
-		
-if __name__ == "__main__": 
-	laser = insightLaser()
-	
-#	a.connect()
-#	a.cmd_CLS()
-    
+# =========================================================================================================
+# This script is used to convert the Insight sweep laser SCPI commands to python commands
+# The laser is connected through Ethernet (IP address: 137.82.251.151; address name: insight-laser; port: 23) 
+# Verison 2.0 (Modified by Jonas)
+# Enxiao 2019-07-26
+# =========================================================================================================
+
+import telnetlib
+import logging
+import contextlib
+import enum
+import inspect
+import re
+import time
+import collections
+import threading
+
+import numpy
+
+
+PROMPT = b'atlas ready>'
+IAC = b'\xff'               # telnet 'interpret as command' byte
+_ERRORS_QUERY = ':SYSTem:ERRor:ALL?'
+
+# Seconds to wait for the reply of a command, by header pattern (see
+# headerMatches()), first match wins. Calibrations take minutes, a long DIV
+# takes a while to transfer, everything else answers at once.
+TIMEOUTS = ((':CALibrate*', 600.0),
+            (':CONFigure:SWEep:DIVector?', 60.0),
+            ('*', 5.0))
+CONNECT_TIMEOUT = 10.0      # TCP connect and the banner prompt
+RESYNC_TIMEOUT = 1.0        # after a timeout, wait this long for the late replies before reconnecting
+
+
+##############################################################################
+# Reply parsers and keyword choices used by the query methods.
+
+_NUMBER = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+
+def _text(reply):
+    return reply.strip()
+
+def _float(reply):
+    m = _NUMBER.search(reply)
+    if m is None:
+        raise ValueError('no number in reply %r' % reply)
+    return float(m.group())
+
+def _int(reply):
+    return int(_float(reply))
+
+def _floats(reply):
+    return tuple(float(x) for x in _NUMBER.findall(reply))
+
+def _ints(reply):
+    return tuple(int(float(x)) for x in _NUMBER.findall(reply))
+
+def _intArray(reply):
+    stream = intStream()
+    stream.feed(reply.encode('ascii'))
+    return stream.close()
+
+def _sequenceTable(reply):
+    '''
+    One row per sequence entry: (wavelength or frequency, dwell time). Only
+    the last two numbers of each line are kept so row indices are ignored.
+    '''
+    stream = tableStream()
+    stream.feed(reply.encode('ascii'))
+    return stream.close()
+
+
+##############################################################################
+# Incremental parsers for long numeric replies (DIV, sequence table). The
+# driver feeds them the reply bytes as they arrive off the socket, without
+# building the reply string first.
+
+_NUMBER_BYTES = re.compile(_NUMBER.pattern.encode('ascii'))
+_SEPARATORS = numpy.frombuffer(b' ,;\t\r\n', dtype=numpy.uint8)
+
+class intStream:
+    '''
+    Parses a reply of integers into an int64 array. Plain digit runs are
+    converted with NumPy directly on the received buffer, anything else
+    (signs, decimals, text) goes through the _NUMBER regex.
+    out: optional preallocated array to fill, otherwise one is grown
+    '''
+
+    def __init__(self, out=None):
+        self._fixed = out is not None
+        self._out = out if out is not None else numpy.empty(4096, dtype=numpy.int64)
+        self.count = 0
+        self._carry = b''       # digits of a number cut at the end of the last chunk
+
+    def _append(self, values):
+        end = self.count + values.size
+        if end > self._out.size:
+            if self._fixed:
+                raise ValueError('reply has more than %d values' % self._out.size)
+            grown = numpy.empty(max(2*self._out.size, end), dtype=self._out.dtype)
+            grown[:self.count] = self._out[:self.count]
+            self._out = grown
+        self._out[self.count:end] = values
+        self.count = end
+
+    def feed(self, data):
+        '''
+        data: bytes-like chunk of the reply, not kept after the call
+        '''
+        buf = numpy.frombuffer(data, dtype=numpy.uint8)
+        if buf.size == 0:
+            return
+        inNumber = ~numpy.isin(buf, _SEPARATORS)
+        # a number cut at the end of the last chunk continues here
+        if self._carry:
+            lead = buf.size if inNumber.all() else int(numpy.argmin(inNumber))
+            self._carry += buf[:lead].tobytes()
+            if lead == buf.size:
+                return
+            buf, inNumber = buf[lead:], inNumber[lead:]
+            self._parse(numpy.frombuffer(self._carry, dtype=numpy.uint8))
+            self._carry = b''
+        # hold back a number that may continue in the next chunk
+        if inNumber[-1]:
+            gaps = numpy.flatnonzero(~inNumber)
+            cut = gaps[-1] + 1 if gaps.size else 0
+            self._carry = buf[cut:].tobytes()
+            buf = buf[:cut]
+        self._parse(buf)
+
+    def _parse(self, buf):
+        if buf.size == 0:
+            return
+        digit = (buf >= 48) & (buf <= 57)
+        if not (digit | numpy.isin(buf, _SEPARATORS)).all():
+            self._append(numpy.array(_NUMBER_BYTES.findall(buf.tobytes()), dtype=float).astype(numpy.int64))
+            return
+        pos = numpy.flatnonzero(digit)
+        if pos.size == 0:
+            return
+        starts = numpy.flatnonzero(numpy.diff(pos, prepend=-2) != 1)
+        ends = numpy.append(starts[1:], pos.size)
+        mark = numpy.zeros(pos.size, dtype=numpy.int64)
+        mark[starts] = 1
+        token = numpy.cumsum(mark) - 1
+        power = ends[token] - 1 - numpy.arange(pos.size)
+        digits = (buf[pos] - 48).astype(numpy.int64) * numpy.power(10, power, dtype=numpy.int64)
+        self._append(numpy.add.reduceat(digits, starts))
+
+    def close(self):
+        '''
+        return: the parsed values
+        '''
+        if self._carry:
+            self._parse(numpy.frombuffer(self._carry, dtype=numpy.uint8))
+            self._carry = b''
+        return self._out[:self.count]
+
+
+class tableStream:
+    '''
+    Parses a reply with one (value, dwell time) row per line into an N x 2
+    float array. Only the last two numbers of each line are kept.
+    '''
+
+    def __init__(self):
+        self._rows = numpy.empty((1024, 2))
+        self.count = 0
+        self._carry = b''       # start of a line cut at the end of the last chunk
+
+    def feed(self, data):
+        data = self._carry + bytes(data)
+        cut = data.rfind(b'\n') + 1
+        self._carry = data[cut:]
+        for line in data[:cut].splitlines():
+            self._line(line)
+
+    def _line(self, line):
+        row = _NUMBER_BYTES.findall(line)[-2:]
+        if len(row) != 2:
+            return
+        if self.count == len(self._rows):
+            self._rows = numpy.concatenate([self._rows, numpy.empty_like(self._rows)])
+        self._rows[self.count] = float(row[0]), float(row[1])
+        self.count += 1
+
+    def close(self):
+        if self._carry:
+            self._line(self._carry)
+            self._carry = b''
+        return self._rows[:self.count]
+
+def _onOff(reply):
+    token = reply.strip().upper()
+    if token in ('ON', '1', 'TRUE'):
+        return True
+    if token in ('OFF', '0', 'FALSE'):
+        return False
+    raise ValueError('unexpected ON/OFF reply %r' % reply)
+
+
+class scpiChoice(enum.Enum):
+    '''
+    SCPI keyword choice. The value is the long form, its upper-case letters
+    are the short form that is matched against replies.
+    '''
+
+    @classmethod
+    def fromReply(cls, reply):
+        token = reply.strip().split(',')[0].strip().upper()
+        for member in cls:
+            if token.startswith(''.join(c for c in member.value if c.isupper())):
+                return member
+        raise ValueError('unexpected %s reply %r' % (cls.__name__, reply))
+
+class sweepDirection(scpiChoice):
+    INCR = 'INCReasing'
+    DECR = 'DECReasing'
+    BINC = 'BINCreasing'
+
+class powerProfile(scpiChoice):
+    FLAT = 'FLAT'
+    GAUSSIAN = 'GAUSsian'
+    CUSTOM = 'CUSTom'
+
+class triggerEdge(scpiChoice):
+    RIS = 'RISing'
+    FALL = 'FALLing'
+    BOTH = 'BOTH'
+
+class controlMode(scpiChoice):
+    HARD = 'HARDware'
+    SOFT = 'SOFTware'
+
+class scpiError(collections.namedtuple('scpiError', 'code message')):
+    '''
+    One entry of the error/event queue. Code 0 means no error.
+    '''
+
+    def __str__(self):
+        return '%d, "%s"' % (self.code, self.message)
+
+class laserError(Exception):
+    '''
+    Raised when the error queue checked after an exchange is not empty.
+    errors: list of scpiError
+    '''
+
+    def __init__(self, errors):
+        super().__init__('; '.join(str(e) for e in errors))
+        self.errors = errors
+
+class laserTimeout(TimeoutError):
+    '''
+    Raised when a reply does not arrive in time. By then the driver has
+    skipped the late replies or reconnected, so the next command starts
+    on a clean connection with an empty state cache.
+    cmd: the command whose reply was awaited
+    pending: every command that was sent and not answered, in order
+    timeout: seconds waited
+    '''
+
+    def __init__(self, cmd, timeout, pending=()):
+        pending = list(pending) or [cmd]
+        message = 'no reply to %s within %g s' % (cmd, timeout)
+        if len(pending) > 1:
+            message += ' (%d commands unanswered)' % len(pending)
+        super().__init__(message)
+        self.cmd = cmd
+        self.pending = pending
+        self.timeout = timeout
+
+def commandTimeout(cmd, timeouts=TIMEOUTS):
+    '''
+    Reply timeout of <cmd> from a (header pattern, seconds) table.
+    '''
+    header = cmd.split(None, 1)[0] if cmd else ''
+    for pattern, seconds in timeouts:
+        if headerMatches(header, (pattern,)):
+            return seconds
+    return None
+
+_ERROR = re.compile(r'([-+]?\d+)\s*,\s*"([^"]*)"')
+
+def _errors(reply):
+    '''
+    List of scpiError from one or more 'code,"message"' entries; the "No
+    error" entry is left out.
+    '''
+    errors = [scpiError(int(code), message) for code, message in _ERROR.findall(reply)]
+    if not errors and reply.strip():
+        code, _, message = reply.strip().partition(',')
+        errors = [scpiError(_int(code), message.strip().strip('"'))]
+    return [e for e in errors if e.code != 0]
+
+def _error(reply):
+    errors = _errors(reply)
+    return errors[0] if errors else scpiError(0, 'No error')
+
+class statusByte(enum.IntFlag):
+    '''
+    Bits of the *STB? status byte.
+    '''
+    EMITTING = 0x01
+    LED = 0x02
+    BUSY = 0x04             # control thread is busy
+    LED2 = 0x08
+    USER_OUTPUT = 0x10      # optical switch to USER output
+    LASER_ON = 0x20
+
+def _status(reply):
+    return statusByte(_int(reply))
+
+def _fixedProfile(reply):
+    '''
+    (powerProfile, rolloff or data file) from e.g. "GAUSsian,3".
+    '''
+    parts = reply.strip().split(',', 1)
+    extra = parts[1].strip() if len(parts) > 1 else None
+    if extra is not None and _NUMBER.fullmatch(extra):
+        extra = float(extra)
+    return powerProfile.fromReply(parts[0]), extra
+
+
+##############################################################################
+# Argument validators used by the command table. Each one turns a user value
+# into SCPI text or raises ValueError.
+
+_KEYWORDS = ('MIN', 'MAX', 'DEF')
+
+def _number(lo=None, hi=None, integer=False):
+    '''
+    Number in [lo, hi], or one of the MINimum/MAXimum/DEFault keywords.
+    Strings keep their unit suffix, e.g. '1550 nm'.
+    '''
+    def check(value):
+        if isinstance(value, str) and value.strip().upper()[:3] in _KEYWORDS:
+            return value.strip().upper()
+        x = _float(value) if isinstance(value, str) else float(value)
+        if x != x:
+            raise ValueError('NaN is not a valid value')
+        if integer and x != int(x):
+            raise ValueError('expected an integer, got %r' % (value,))
+        if (lo is not None and x < lo) or (hi is not None and x > hi):
+            raise ValueError('%r is outside the range [%s, %s]' % (value, lo, hi))
+        if isinstance(value, str):
+            return value.strip()
+        return '%d' % x if integer else '%s' % (value,)
+    return check
+
+def _pointsIncrement(value):
+    text = _number(4, 256, integer=True)(value)
+    if text.isdigit() and int(text) % 4:
+        raise ValueError('%r is not a multiple of 4' % (value,))
+    return text
+
+def _quoted(value):
+    return ascii(str(value))
+
+_ON_OFF = {'ON': 'ON', 'OFF': 'OFF', 'TRUE': 'ON', 'FALSE': 'OFF', '1': 'ON', '0': 'OFF'}
+
+def _choice(options, message):
+    '''
+    Keyword argument. <options> is a scpiChoice enum, matched by member
+    name or SCPI keyword, or a dict from user keyword to SCPI keyword.
+    '''
+    def check(value):
+        if isinstance(value, scpiChoice):
+            return value.value
+        key = str(value).strip().upper()
+        if isinstance(options, dict):
+            if key in options:
+                return options[key]
+        elif key in options.__members__:
+            return options[key].value
+        elif key:
+            try:
+                return options.fromReply(key).value
+            except ValueError:
+                pass
+        raise ValueError(message)
+    return check
+
+def _profileData(value):
+    '''
+    Rolloff of a GAUSsian profile in dB, or the data file of a CUSTom one.
+    '''
+    if value is None:
+        return None
+    if isinstance(value, str) and not _NUMBER.fullmatch(value.strip()):
+        return _quoted(value)
+    return _number(1, 10)(value)
+
+def _profileArgs(profile, data):
+    if data is None:
+        return profile
+    return '%s,%s' % (profile, data)
+
+def _fixedProfileArgs(profile, power):
+    if profile == 'FLAT':
+        return profile
+    return '%s,%s' % (profile, power)
+
+
+# Cached settings dropped by a set command, as headers; a trailing '*'
+# matches every header starting with the rest. Setting any part of the sweep
+# geometry can change the others on the laser side, and the sweep has to be
+# calibrated again.
+_SWEEP_GEOMETRY = (':CONFigure:SWEep:WMINimum', ':CONFigure:SWEep:WMAXimum',
+                   ':CONFigure:SWEep:FMINimum', ':CONFigure:SWEep:FMAXimum',
+                   ':CONFigure:SWEep:POINts', ':CONFigure:SWEep:POINts:TOTal',
+                   ':CONFigure:SWEep:RATe', ':CONFigure:SWEep:STEP',
+                   ':CONFigure:SWEep:DELay', ':CONFigure:SWEep:DIRection',
+                   ':CONFigure:SB*', ':CONFigure:INCReasing*',
+                   ':CONFigure:DECReasing*', ':CONFigure:BINCreasing*',
+                   ':CALibrate:SWEep')
+_FIXED_WAVELENGTH = (':CONFigure:FIXed:WAVelength', ':CONFigure:FIXed:FREQuency')
+_ALL_SETTINGS = ('*',)
+
+def headerMatches(header, patterns):
+    '''
+    True if <header> is one of <patterns>, or starts with a pattern ending
+    in '*'.
+    '''
+    for p in patterns:
+        if header == p or (p.endswith('*') and header.startswith(p[:-1])):
+            return True
+    return False
+
+# A calibration command leaves True in the cache under its header, the set
+# commands it depends on drop that entry again. SEQUENCE_TABLE holds the
+# entries last programmed through insightLaser_config (not a SCPI header),
+# PROFILE_DATA the (file name, hash) of the profile insightLaser_profile
+# uploaded, dropped by any new :CONFigure:SWEep:PROFile.
+SEQUENCE_TABLE = 'sequence table'
+PROFILE_DATA = ':CONFigure:SWEep:PROFile:DATA'
+_SWEEP_CALIBRATION = (':CALibrate:SWEep',)
+_FIXED_CALIBRATION = (':CALibrate:FIXed',)
+_SEQUENCE_CALIBRATION = (':CALibrate:SEQuence', SEQUENCE_TABLE)
+
+def _calibrated(arg):
+    return True
+
+# calibration header: (query of its result, command that runs it)
+CALIBRATIONS = {':CALibrate:SWEep': ('cmd_CAL_SWE_q', 'cmd_CAL_SWE'),
+                ':CALibrate:FIXed': ('cmd_CAL_FIX_q', 'cmd_CAL_FIX'),
+                ':CALibrate:SEQuence': ('cmd_CAL_SEQ_q', 'cmd_CAL_SEQ')}
+
+# words in a :CALibrate:<mode>? reply that mean the last calibration is not usable
+_FAILED = ('FAIL', 'ERR', 'INVALID', 'NOT', 'NONE', 'ABORT')
+
+def calibrationPassed(reply):
+    '''
+    Interpret the reply of a :CALibrate:<mode>? query: empty replies and
+    replies reporting a failure count as not calibrated.
+    '''
+    text = str(reply).strip().upper()
+    return bool(text) and not any(word in text for word in _FAILED)
+
+# What the settings journal (insightLaser.applied()) keeps of the set
+# commands: actions are not replayed, sequence table edits accumulate until
+# the table is cleared or loaded, any other setting keeps its last value.
+_NOT_REPLAYED = ('*CLS', '*WAI', '*RST', ':INITiate*', ':ABORt', ':CALibrate*',
+                 ':CONFigure:SEQuence:SAVe')
+_TABLE_RESETS = (':CONFigure:SEQuence:CLEAr', ':CONFigure:SEQuence:LOAD')
+_TABLE_EDITS = (':CONFigure:SEQuence:ADD*', ':CONFigure:SEQuence:REMove')
+
+# errors of a dropped telnet session: socket errors, or EOF from telnetlib
+CONNECTION_ERRORS = (OSError, EOFError)
+
+
+class pendingReply:
+    '''
+    Placeholder returned by a command issued inside insightLaser.batch().
+    The reply is filled in, in order, when the batch is flushed.
+    '''
+
+    def __init__(self, cmd):
+        self.cmd = cmd
+        self.reply = None
+        self.value = None
+        self.done = False
+        self.parser = None
+        self.onReply = None
+
+    def set(self, reply):
+        self.reply = reply
+        self.value = reply if self.parser is None else self.parser(reply)
+        self.done = True
+        if self.onReply is not None:
+            self.onReply(self.value)
+
+    def __str__(self):
+        if self.done:
+            return str(self.value)
+        return '<pending reply to %s>' % self.cmd
+
+    __repr__ = __str__
+
+
+_REQUIRED = inspect.Parameter.empty
+
+class scpiCommand:
+    '''
+    One entry of the command table.
+    name: method name on insightLaser
+    header: SCPI header, ending in '?' for a query
+    args: ((name, validator[, default]), ...), the validator turns the user
+          value into SCPI text
+    fmt: joins the validated arguments, comma separated by default
+    parser: reply parser of a query
+    cached: the query is answered from the state cache when possible
+    store: parser for the value a set command leaves in the state cache
+    stream: incremental parser class of a query with a long numeric reply,
+            fed straight from the socket (intStream, tableStream)
+    invalidates: cached headers a set command drops, see headerMatches()
+    '''
+
+    def __init__(self, name, header, args=(), fmt=None, parser=None, cached=False,
+                 store=None, invalidates=(), stream=None, doc=None):
+        self.name = name
+        self.header = header
+        self.query = header.endswith('?')
+        if cached:
+            args = (('refresh', bool, False),)
+        self.args = tuple((a[0], a[1], a[2] if len(a) > 2 else _REQUIRED) for a in args)
+        self.fmt = fmt
+        self.parser = parser
+        self.cached = cached
+        self.store = store
+        self.invalidates = invalidates
+        self.stream = stream
+        self.doc = doc
+
+    def bind(self, args, kwargs):
+        '''
+        Match the call arguments to self.args, filling in defaults.
+        '''
+        if len(args) == len(self.args) and not kwargs:
+            return args
+        if len(args) > len(self.args):
+            raise TypeError('%s() takes %d arguments (%d given)' % (self.name, len(self.args), len(args)))
+        values = list(args)
+        for name, _, default in self.args[len(args):]:
+            if name in kwargs:
+                values.append(kwargs.pop(name))
+            elif default is not _REQUIRED:
+                values.append(default)
+            else:
+                raise TypeError('%s() missing argument %r' % (self.name, name))
+        if kwargs:
+            raise TypeError('%s() got unexpected arguments %s' % (self.name, ', '.join(kwargs)))
+        return values
+
+    def format(self, values):
+        '''
+        Validate bound argument values and return the SCPI argument text.
+        '''
+        if not self.args:
+            return None
+        try:
+            text = [check(v) for (_, check, _), v in zip(self.args, values)]
+        except ValueError as exc:
+            raise ValueError('%s: %s' % (self.name, exc)) from None
+        if self.fmt is not None:
+            return self.fmt(*text)
+        return ','.join(text)
+
+    def __call__(self, laser, *args, **kwargs):
+        values = self.bind(args, kwargs)
+        if self.query:
+            if self.cached:
+                return laser._query(self.header[:-1], self.parser, values[0])
+            if self.stream is not None and laser._batch is None:
+                return laser._stream(self.header, self.stream())
+            return laser._request(self.header, self.parser)
+        return laser._set(self.header, self.format(values), self.store, self.invalidates)
+
+    def method(self, name=None):
+        '''
+        Build the insightLaser method for this command.
+        '''
+        spec = self
+        def method(laser, *args, **kwargs):
+            return spec(laser, *args, **kwargs)
+        method.__name__ = name or self.name
+        method.__qualname__ = 'insightLaser.' + method.__name__
+        method.__doc__ = self.doc
+        params = [inspect.Parameter('self', inspect.Parameter.POSITIONAL_OR_KEYWORD)]
+        params += [inspect.Parameter(a, inspect.Parameter.POSITIONAL_OR_KEYWORD, default=d)
+                   for a, _, d in self.args]
+        method.__signature__ = inspect.Signature(params)
+        return method
+
+
+class insightLaser:
+    
+    def __init__(self, host='insight-laser', trace=False):
+	
+        self.port = 23
+        self.host = host
+		
+		# Logger 
+        logging.basicConfig(format='%(asctime)s: %(message)s', level=logging.INFO)
+        self._log = logging.getLogger()
+		
+        self.tn = None	# handle for telnet object -> initialize empty
+        self._local = threading.local()
+        self._batch = None	# queued pendingReply objects while batching, per thread
+        self._state = {}	# last known settings, keyed by SCPI header
+
+        self.trace = trace	# log every command and its reply
+        self.metrics = None	# insightLaser_metrics.commandMetrics to record latencies
+        self._inflight = collections.deque()	# (header, send time, bytes) awaiting a reply
+        self.recorder = None	# insightLaser_session.sessionRecorder to record every exchange
+        self._lock = threading.RLock()	# one exchange at a time when shared between threads
+        self.statusHook = None	# f(statusByte): if set, *STB? rides along with every exchange
+        self.checkErrors = False	# drain the error queue with every exchange, raise laserError
+        self.timeouts = TIMEOUTS	# (header pattern, seconds) reply timeouts, see commandTimeout()
+        self.connectTimeout = CONNECT_TIMEOUT
+        self.resyncTimeout = RESYNC_TIMEOUT
+        self.autoReconnect = False	# on a dropped connection: recover() and retry the command once
+        self._journal = []	# (header, arg, parser, invalidates) of the settings applied, see applied()
+        self._recovering = False
+		
+
+    @property
+    def _batch(self):
+        return getattr(self._local, 'batch', None)
+
+    @_batch.setter
+    def _batch(self, queue):
+        self._local.batch = queue
+
+    def connect(self):
+        started = time.perf_counter()
+        banner = self._open()
+        if self.recorder is not None:
+            self.recorder.connected(started, banner)
+        self._state.clear()
+        self._inflight.clear()
+        if not banner.endswith(PROMPT):
+            self.close()
+            raise laserTimeout('connect', self.connectTimeout)
+
+    def _open(self):
+        '''
+        Open the connection as self.tn. Subclasses talking to something
+        other than the laser's telnet port override this.
+        return: the banner, ending in PROMPT unless it timed out
+        '''
+        self.tn = telnetlib.Telnet(self.host,self.port,self.connectTimeout)
+        return self.tn.read_until(PROMPT, self.connectTimeout)
+
+    def close(self):
+        if self.tn is not None:
+            self.tn.close()
+        self.tn = None
+        if self.recorder is not None:
+            self.recorder.lost()
+
+    def sendCommand(self, cmd):
+        '''
+        cmd: SCPI command as string
+        return: return if successful otherwise rasise error
+        Inside batch() the command is queued instead of written.
+        '''
+        if self._batch is not None:
+            self._batch.append(pendingReply(cmd))
+            return
+        data = (cmd+'\n\r').encode('ascii')
+        self.tn.write(data)
+        if self.metrics is not None:
+            self._inflight.append((cmd.split(None, 1)[0], time.perf_counter(), len(data)))
+        if self.recorder is not None:
+            self.recorder.sent((cmd,))
+		
+    def readResponse(self, cmd=None, timeout=None):
+        '''
+        Convert the bytes back to a proper string
+        cmd: the command answered, selects the timeout from self.timeouts
+        timeout: seconds, overrides the table
+        return: response from instrument as string
+        Inside batch() a pendingReply for the last queued command is returned.
+        '''
+        if self._batch is not None:
+            return self._batch[-1]
+        return self._readReply([cmd], 0, timeout)
+
+    def _readReply(self, cmds, index, timeout=None):
+        '''
+        Read the reply to cmds[index]; the commands after it are sent and
+        unanswered as well. Raises laserTimeout when the reply is late.
+        '''
+        timeout = self._timeout(cmds[index], timeout)
+        reply = self.tn.read_until(PROMPT, timeout)
+        complete = reply.endswith(PROMPT)
+        if self.metrics is not None:
+            self._received(len(reply), complete)
+        if complete and self.recorder is not None:
+            self.recorder.received(reply[:-len(PROMPT)])
+        if not complete:
+            if self.tn.eof:
+                raise EOFError('telnet connection closed')
+            self._expired(cmds[index:], timeout)
+        return reply[:-len(PROMPT)].decode()
+
+    def _timeout(self, cmd, timeout=None):
+        '''
+        Reply timeout of <cmd>, cut short by an enclosing deadline().
+        '''
+        if timeout is None:
+            timeout = commandTimeout(cmd, self.timeouts)
+        deadline = getattr(self._local, 'deadline', None)
+        if deadline is not None:
+            left = max(deadline - time.monotonic(), 0.0)
+            timeout = left if timeout is None else min(timeout, left)
+        return timeout
+
+    def _expired(self, pending, timeout):
+        '''
+        A reply is late: skip the replies still owed to <pending> if they
+        come within resyncTimeout, otherwise reconnect. The cached state
+        is dropped either way, set commands may or may not have been
+        applied. Raises laserTimeout.
+        '''
+        error = laserTimeout(pending[0], timeout, pending)
+        self._log.warning('%s: %s' % (self.host, error))
+        self._state.clear()
+        self._inflight.clear()
+        end = time.monotonic() + self.resyncTimeout
+        try:
+            for _ in pending:
+                late = self.tn.read_until(PROMPT, max(end - time.monotonic(), 0.0))
+                if not late.endswith(PROMPT):
+                    self.close()
+                    self.connect()
+                    break
+                if self.recorder is not None:
+                    self.recorder.received(late[:-len(PROMPT)])
+        except Exception as exc:
+            self.close()
+            raise error from exc
+        raise error
+
+    @contextlib.contextmanager
+    def deadline(self, seconds):
+        '''
+        Bound the replies of every command issued in this thread inside the
+        block to <seconds> from now, on top of the per-command timeouts.
+        Nested deadlines keep the earliest.
+
+        with laser.deadline(2):
+            config.apply(laser, calibrate=False)
+        '''
+        outer = getattr(self._local, 'deadline', None)
+        end = time.monotonic() + seconds
+        self._local.deadline = end if outer is None else min(outer, end)
+        try:
+            yield
+        finally:
+            self._local.deadline = outer
+
+    def _received(self, size, complete=True):
+        '''
+        Record the round trip of the oldest command awaiting a reply.
+        '''
+        if not self._inflight:
+            return
+        header, sent, size_out = self._inflight.popleft()
+        self.metrics.record(header, time.perf_counter() - sent, size_out, size, not complete)
+
+    def _trace(self, cmd, reply):
+        if self.trace:
+            self._log.info('%s: %s' % (cmd, str(reply).strip()),
+                           extra={'scpi': cmd, 'reply': reply, 'host': self.host})
+
+    @contextlib.contextmanager
+    def batch(self, timeout=None):
+        '''
+        Pipeline every command issued inside the block: the commands are
+        queued, written in one send when the block exits, and the
+        prompt-delimited replies are handed back to each call in order.
+        Reconfiguring costs one round trip instead of one per command.
+
+        with laser.batch() as replies:
+            laser.cmd_CONF_SCL_RAT(10)
+            laser.cmd_CONF_SWE_POW(2.1)
+        replies -> [pendingReply, pendingReply], filled in on exit
+
+        Nested batches join the outermost one. If the block raises, the
+        queued commands are discarded without being sent. <timeout> bounds
+        the whole exchange, as a deadline().
+        '''
+        if self._batch is not None:
+            yield self._batch
+            return
+        with self._capture() as queue:
+            yield queue
+        if timeout is None:
+            self._flushBatch(queue)
+        else:
+            with self.deadline(timeout):
+                self._flushBatch(queue)
+
+    @contextlib.contextmanager
+    def _capture(self):
+        '''
+        Queue the commands issued inside the block without sending them.
+        Used by batch() and by the async driver to reuse the cmd_* methods.
+        '''
+        outer = self._batch
+        self._batch = queue = []
+        try:
+            yield queue
+        finally:
+            self._batch = outer
+
+    def _flushBatch(self, queue):
+        '''
+        Write all queued commands at once, then read one prompt-delimited
+        reply per command.
+        '''
+        if not queue:
+            return
+        queue = queue + self._riders(queue)
+        with self._lock:
+            try:
+                self._exchange(queue)
+            except laserTimeout:
+                raise
+            except CONNECTION_ERRORS:
+                if not self.autoReconnect or self._recovering:
+                    raise
+                self._log.warning('%s: connection lost, recovering' % self.host)
+                self.recover()
+                self._exchange([p for p in queue if not p.done])
+
+    def _exchange(self, queue):
+        '''
+        Write the queued commands in one send and read their replies.
+        '''
+        self.tn.write(''.join(p.cmd+'\n\r' for p in queue).encode('ascii'))
+        if self.metrics is not None:
+            sent = time.perf_counter()
+            self._inflight.extend((p.cmd.split(None, 1)[0], sent, len(p.cmd)+2) for p in queue)
+        cmds = [p.cmd for p in queue]
+        if self.recorder is not None:
+            self.recorder.sent(cmds)
+        for i, p in enumerate(queue):
+            p.set(self._readReply(cmds, i))
+            self._trace(p.cmd, p.reply)
+
+    def _riders(self, queue=()):
+        '''
+        Queries appended to every exchange: *STB? for the statusHook, and
+        the error queue if checkErrors is set. Errors raise laserError once
+        all replies have been read, after the settings sent in <queue> are
+        dropped from the state cache and the journal.
+        '''
+        riders = []
+        if self.statusHook is not None:
+            status = pendingReply('*STB?')
+            status.parser, status.onReply = _status, self.statusHook
+            riders.append(status)
+        if self.checkErrors:
+            errors = pendingReply(_ERRORS_QUERY)
+            errors.parser, errors.onReply = _errors, lambda found: self._raiseErrors(found, queue)
+            riders.append(errors)
+        return riders
+
+    def _raiseErrors(self, errors, queue=()):
+        if not errors:
+            return
+        # the laser rejected some of the settings, which ones it does not say
+        headers = {p.cmd.split(None, 1)[0] for p in queue}
+        headers = tuple(h for h in headers if not h.endswith('?'))
+        self._forget(headers)
+        self._journal = [e for e in self._journal if e[0] not in headers]
+        raise laserError(errors)
+
+    def drainErrors(self):
+        '''
+        Read and clear the whole error queue in one round trip.
+        return: list of scpiError, empty if there was no error
+        '''
+        return self._request(_ERRORS_QUERY, _errors)
+
+    def _stream(self, cmd, stream, chunk=1 << 16):
+        '''
+        Send a query and feed its reply to <stream> (intStream, tableStream)
+        as it arrives. The socket is read directly into one reused buffer,
+        telnetlib only sees the bytes it already buffered and chunks holding
+        telnet commands.
+        return: stream.close()
+        '''
+        with self._lock:
+            sock = self.tn.get_socket()
+            previous = sock.gettimeout()
+            timeout = self._timeout(cmd)
+            try:
+                return self._readStream(cmd, stream, chunk, time.monotonic() + timeout)
+            except TimeoutError:
+                self._expired([cmd], timeout)
+            finally:
+                if self.tn is not None and self.tn.get_socket() is sock:
+                    sock.settimeout(previous)
+
+    def _readStream(self, cmd, stream, chunk, deadline):
+        self.sendCommand(cmd)
+        feed = stream.feed
+        if self.recorder is not None:
+            chunks = []
+            def feed(data, feed=stream.feed):
+                chunks.append(bytes(data))
+                feed(data)
+        keep = len(PROMPT) - 1
+        buf = bytearray(max(chunk, keep+1))
+        view = memoryview(buf)
+        pending = self.tn.read_very_eager()         # already buffered by telnetlib
+        sock = self.tn.get_socket()
+        filled = 0
+        received = len(pending)
+        while True:
+            if pending:
+                n = min(len(pending), len(buf) - filled)
+                buf[filled:filled+n] = pending[:n]
+                pending = pending[n:]
+            else:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    raise TimeoutError
+                sock.settimeout(left)
+                n = sock.recv_into(view[filled:])
+                if n == 0:
+                    raise EOFError('telnet connection closed')
+                if buf.find(IAC, filled, filled+n) >= 0:
+                    received += n
+                    pending = self._telnetCooked(bytes(view[filled:filled+n]))
+                    continue
+                received += n
+            i = buf.find(PROMPT, max(filled - keep, 0), filled + n)
+            filled += n
+            if i >= 0:
+                feed(view[:i])
+                rest = bytes(view[i+len(PROMPT):filled]) + pending
+                if rest:
+                    self.tn.cookedq = rest + self.tn.cookedq
+                break
+            if filled > len(buf) // 2:
+                # parse what we have, keeping the bytes that could be the
+                # start of the prompt
+                cut = filled - keep
+                feed(view[:cut])
+                buf[:keep] = buf[cut:filled]
+                filled = keep
+        if self.metrics is not None:
+            self._received(received)
+        if self.recorder is not None:
+            self.recorder.received(b''.join(chunks))
+        value = stream.close()
+        self._trace(cmd, '%d values' % len(value))
+        return value
+
+    def _telnetCooked(self, raw):
+        '''
+        Run raw socket bytes through telnetlib's option handling.
+        '''
+        self.tn.rawq = self.tn.rawq[self.tn.irawq:] + raw
+        self.tn.irawq = 0
+        self.tn.process_rawq()
+        return self.tn.read_very_lazy()
+
+    def _request(self, cmd, parser=None, onReply=None):
+        '''
+        Send one command and return its reply, parsed by <parser>.
+        <onReply> is called with the parsed reply once it has arrived:
+        immediately, or when the enclosing batch is flushed.
+        With a statusHook or checkErrors the command goes out as a batch of
+        one, so the status and error queries ride along.
+        '''
+        if ((self.statusHook is not None or self.checkErrors) and self._batch is None
+                and cmd not in ('*STB?', _ERRORS_QUERY)):
+            with self.batch():
+                reply = self._request(cmd, parser, onReply)
+            return reply.value
+        with self._lock:
+            try:
+                self.sendCommand(cmd)
+                reply = self.readResponse(cmd)
+            except laserTimeout:
+                raise
+            except CONNECTION_ERRORS:
+                if not self.autoReconnect or self._recovering:
+                    raise
+                self._log.warning('%s: connection lost, recovering' % self.host)
+                self.recover()
+                self.sendCommand(cmd)
+                reply = self.readResponse(cmd)
+        if isinstance(reply, pendingReply):
+            reply.parser, reply.onReply = parser, onReply
+            return reply
+        self._trace(cmd, reply)
+        value = reply if parser is None else parser(reply)
+        if onReply is not None:
+            onReply(value)
+        return value
+
+##############################################################################
+# State cache: set commands record what they sent, queries of unchanged
+# settings are answered without a round trip.
+
+    def _query(self, header, parser, refresh=False):
+        '''
+        Query a setting through the state cache. A cached value is returned
+        without touching the wire unless <refresh> is set.
+        '''
+        if not refresh and header in self._state:
+            return self._state[header]
+        return self._request(header+'?', parser, lambda value: self._state.__setitem__(header, value))
+
+    def _set(self, header, arg=None, parser=None, invalidates=()):
+        '''
+        Send a set or action command. Once the laser has answered, cached
+        settings under <header> or matching <invalidates> are dropped,
+        and if <parser> is given the new value is cached under <header>.
+        '''
+        cmd = header if arg is None else '%s %s' % (header, arg)
+        def update(reply):
+            self._forget(tuple(invalidates) + (header,))
+            self._record((header, arg, parser, invalidates))
+            if parser is not None:
+                try:
+                    self._state[header] = parser(arg)
+                except ValueError:
+                    pass
+        return self._request(cmd, None, update)
+
+    def _record(self, entry):
+        '''
+        Add a set command the laser accepted to the settings journal.
+        '''
+        header, _, _, invalidates = entry
+        if _ALL_SETTINGS[0] in invalidates:
+            self._journal.clear()
+            return
+        if headerMatches(header, _NOT_REPLAYED):
+            return
+        if headerMatches(header, _TABLE_RESETS):
+            replaced = _TABLE_RESETS + _TABLE_EDITS
+        elif headerMatches(header, _TABLE_EDITS):
+            replaced = ()
+        else:
+            replaced = (header,)
+        self._journal = [e for e in self._journal if not headerMatches(e[0], replaced)]
+        self._journal.append(entry)
+
+    def applied(self):
+        '''
+        The settings sent through the cmd_* methods since the driver was
+        created (or the last *RST), as the SCPI commands recover() replays,
+        oldest first.
+        '''
+        return [header if arg is None else '%s %s' % (header, arg) for header, arg, _, _ in self._journal]
+
+    def recover(self, calibrate=True):
+        '''
+        Reconnect and bring the laser back to the state this driver left it
+        in. One batch reads back every journaled setting that has a query,
+        and asks each mode calibrated before the drop whether the laser
+        still holds its calibration; a second batch sends only the settings
+        the laser lost. Modes whose calibration is gone, or was dropped by
+        a resent setting, are calibrated again (if <calibrate>).
+        return: names of the calibration commands that were run
+        '''
+        journal, self._journal = self._journal, []
+        calibrated = [h for h in CALIBRATIONS if self._state.get(h) is True]
+        queries = {spec.header[:-1]: spec for spec in COMMANDS.values() if spec.query}
+        # host-side records under names that are not SCPI headers (SEQUENCE_TABLE, ...)
+        records = {k: v for k, v in self._state.items() if k not in queries}
+        self._recovering = True
+        try:
+            self.close()
+            self.connect()
+            with self.batch():
+                checks = {h: getattr(self, CALIBRATIONS[h][0])() for h in calibrated}
+                for header, arg, parser, _ in journal:
+                    if parser is not None and header in queries:
+                        self._query(header, queries[header].parser, refresh=True)
+            held = [h for h, reply in checks.items() if calibrationPassed(reply.value)]
+            for header in held:
+                self._state[header] = True
+            tableKept = ':CALibrate:SEQuence' in held
+            resend = []
+            for entry in journal:
+                header, arg, parser, _ = entry
+                if headerMatches(header, _TABLE_RESETS + _TABLE_EDITS):
+                    lost = not tableKept
+                elif parser is not None and header in queries:
+                    try:
+                        lost = self._state.get(header) != parser(arg)
+                    except ValueError:
+                        lost = True
+                else:
+                    lost = True
+                if lost:
+                    resend.append(entry)
+                else:
+                    self._journal.append(entry)
+            with self.batch():
+                for header, arg, parser, invalidates in resend:
+                    self._set(header, arg, parser, invalidates)
+            # keep the journal in its original order
+            order = {id(entry): i for i, entry in enumerate(journal)}
+            self._journal.sort(key=lambda entry: order.get(id(entry), len(order)))
+            self._state.update(records)
+            recalibrated = []
+            for header in calibrated:
+                if self._state.get(header) is not True and calibrate:
+                    getattr(self, CALIBRATIONS[header][1])()
+                    recalibrated.append(CALIBRATIONS[header][1])
+        finally:
+            self._recovering = False
+        self._log.info('%s: reconnected, %d of %d settings restored%s'
+                       % (self.host, len(resend), len(journal),
+                          ', recalibrated ' + ', '.join(recalibrated) if recalibrated else ''))
+        return recalibrated
+
+    def _forget(self, patterns):
+        for key in [k for k in self._state if headerMatches(k, patterns)]:
+            del self._state[key]
+
+    def getCached(self, header, default=None):
+        '''
+        Last known value of a setting, <default> if it is not in the cache.
+        '''
+        return self._state.get(header, default)
+
+    def setCached(self, header, value):
+        self._state[header] = value
+
+    def clearCache(self):
+        '''
+        Drop every cached setting, the next query of each goes to the laser.
+        '''
+        self._state.clear()
+
+##############################################################################
+# cmd_* methods are generated from COMMANDS on first use and then cached on
+# the class, so later calls are plain attribute lookups.
+
+    def __getattr__(self, name):
+        spec = COMMANDS.get(name)
+        if spec is None:
+            raise AttributeError("'%s' object has no attribute '%s'" % (type(self).__name__, name))
+        method = spec.method(name)
+        setattr(insightLaser, name, method)
+        return method.__get__(self, type(self))
+
+    def __dir__(self):
+        return sorted(set(super().__dir__()) | set(COMMANDS))
+
+
+##############################################################################
+# Command table. One entry per SCPI command: header, argument validators,
+# reply parser and what the command does to the state cache.
+
+COMMANDS = {c.name: c for c in [
+
+##############################################################################
+# commonly used commands for the laser.
+
+    scpiCommand('cmd_CLS', '*CLS',
+                doc='''
+        Clears status/results queue.
+        '''),
+
+    scpiCommand('cmd_ESE', '*ESE',
+                args=(('onoff', _choice(_ON_OFF, 'Please enter "ON/OFF" to enable/disable Extended Status/Results')),),
+                doc='''
+        Enables or disables Extended Status/Results.
+        '''),
+
+    scpiCommand('cmd_ESE_q', '*ESE?',
+                parser=_text,
+                doc='''
+        Extended status enable query.
+        '''),
+
+    scpiCommand('cmd_ESR_q', '*ESR?',
+                parser=_int,
+                doc='''
+        Extended status report query.
+        '''),
+
+    scpiCommand('cmd_IDN_q', '*IDN?',
+                parser=_text,
+                cached=True,
+                doc='''
+        Get instrument identi
+        cation information.
+        '''),
+
+    scpiCommand('cmd_OPC_q', '*OPC?',
+                parser=_int,
+                doc='''
+        Query the status of the operation complete bit.
+        '''),
+
+    scpiCommand('cmd_RST', '*RST',
+                invalidates=_ALL_SETTINGS,
+                doc='''
+        This command resets the system to the values stored in the
+        User Conguration file and the Factory Calibration file.
+        '''),
+
+    scpiCommand('cmd_STB_q', '*STB?',
+                parser=_status,
+                doc='''
+        Returns laser status.
+        Bit 0: Laser is EMITTING
+        Bit 1: Status LED is ON
+        Bit 2: (control thread is) BUSY
+        Bit 3: LED2 is ON
+        Bit 4: Optical switch to USER output
+        Bit 5: Laser is ON
+        Bit 6: Reserved
+        Bit 7: Reserved
+        '''),
+
+    scpiCommand('cmd_TST_q', '*TST?',
+                parser=_int,
+                doc='''    
+        Test query.    
+        '''),
+
+    scpiCommand('cmd_WAI', '*WAI',
+                doc='''    
+        Waits for the laser to complete any pending operations.
+        When no delayed operations are being performed "Idle" is
+        output and the command returns immediately.
+        '''),
+
+##############################################################################
+# Start a sweep.
+
+## 1) Synchronize the sweep of the laser with the data acquisition system
+
+    scpiCommand('cmd_SOUR_SYNC_POW', ':SOURce:SYNChronize:POWer',
+                args=(('amplitude', _number(0)),
+                      ('start_delay', _number(0)),
+                      ('pulse_width', _number(0)),
+                      ('wavelength', _number(0))),
+                store=_floats,
+                doc='''
+        This commands the laser to produce a sweep of the laser in
+        which the optical wavelength is constant, but the optical
+        power steps in a pulse of amplitude <Amplitude>, lasting
+        for a width of <Pulse Width> nanoseconds, where the pulse
+        begins at <Start Delay> nanoseconds after Start Sweep.
+        The Power Synchronization pulse repeats with an interval
+        equal to the Number of Sample points times the step period
+        of the sweep, nominally 2.5 nanoseconds per step.
+        Use this function to synchronize the electronic triggers Start
+        Sweep and Data Valid with the acquisition of optical
+        information from the sweep.
+        '''),
+
+    scpiCommand('cmd_SOUR_SYNC_POW_q', ':SOURce:SYNChronize:POWer?',
+                parser=_floats,
+                cached=True,
+                doc='''
+        This queries the laser for the parameters of the optical
+        power pulse at the start of the sweep of the laser. The
+        synchronization power pulse enables the user to perform a
+        synchronization of the arrival time of the pulse with the
+        arrival time of triggers: Sweep Start, Sample Clock and Data
+        Valid.
+        '''),
+
+####################
+## 2) Use the sweep synchronization procedure to adjust delays on the
+##    Sweep Start, Sample Clock and Data Valid Trigge
+
+    scpiCommand('cmd_SOUR_CORR_DVD', ':SOURce:CORRection:DVDelay',
+                args=(('delay', _number()),),
+                invalidates=(':SOURce:CORRection:DVDelay*',),
+                doc='''
+        This command sets the delay of the data valid pulses that
+        are sent to the user, in units of ns. The resolution of the
+        delay value is 0.15 nsec.
+        '''),
+
+    scpiCommand('cmd_SOUR_CORR_DVD_q', ':SOURce:CORRection:DVDelay?',
+                parser=_float,
+                cached=True,
+                doc='''
+        This command returns the delay of the data valid pulses
+        that are sent to the user.
+        '''),
+
+    scpiCommand('cmd_SOUR_CORR_DVD_TOT_q', ':SOURce:CORRection:DVDelay:TOTal?',
+                parser=_float,
+                cached=True,
+                doc='''
+        This command returns the total delay of the data valid signal
+        sent to the user, in units of ns. The total delay is defined as
+        the user specified part plus the factory specified part.
+        '''),
+
+    scpiCommand('cmd_SOUR_CORR_SCD', ':SOURce:CORRection:SCDelay',
+                args=(('delay', _number()),),
+                invalidates=(':SOURce:CORRection:SCDelay*',),
+                doc='''
+        This command sets the delay of the sample clock that is
+        sent to the user, in units of nanoseconds. The resolution is
+        0.178 ns.
+        '''),
+
+    scpiCommand('cmd_SOUR_CORR_SCD_q', ':SOURce:CORRection:SCDelay?',
+                parser=_float,
+                cached=True,
+                doc='''
+        This command returns the delay of the sample clock that is
+        sent to the user.
+        '''),
+
+    scpiCommand('cmd_SOUR_CORR_SSD', ':SOURce:CORRection:SSDelay',
+                args=(('delay', _number()),),
+                invalidates=(':SOURce:CORRection:SSDelay*',),
+                doc='''
+        This command sets the delay of the sweep start that is sent
+        to the user, in units of ns. The resolution is 0.15 ns.
+        For this command, because of the discretization
+        requirement, the laser returns to the user the actual delay
+        the system will execute.
+        '''),
+
+    scpiCommand('cmd_SOUR_CORR_SSD_q', ':SOURce:CORRection:SSDelay?',
+                parser=_float,
+                cached=True,
+                doc='''
+        This command returns the delay of the sweep start that is
+        sent to the user.
+        '''),
+
+    scpiCommand('cmd_SOUR_CORR_SSD_TOT_q', ':SOURce:CORRection:SSDelay:TOTal?',
+                parser=_float,
+                cached=True,
+                doc='''
+        This command returns the total delay of the sweep start
+        signal sent to the user, in units of ns. The total delay is
+        defined as the user specified part plus the factory specified part.
+    '''),
+
+#####################
+## 3) Set the Sweep Parameters
+
+    scpiCommand('cmd_CONF_SWE_WMIN', ':CONFigure:SWEep:WMINimum',
+                args=(('wavelength', _number(0)),),
+                store=_float,
+                invalidates=_SWEEP_GEOMETRY,
+                doc='''
+        Set the minimum wavelength of a sweep.
+        '''),
+
+    scpiCommand('cmd_CONF_SWE_WMIN_q', ':CONFigure:SWEep:WMINimum?',
+                parser=_float,
+                cached=True,
+                doc='''
+        Returns the minimum wavelength of a sweep.
+        '''),
+
+    scpiCommand('cmd_CONF_SWE_FMIN', ':CONFigure:SWEep:FMINimum',
+                args=(('frequency', _number(0)),),
+                store=_float,
+                invalidates=_SWEEP_GEOMETRY,
+                doc='''
+        Set the minimum optical frequency of a sweep.
+        '''),
+
+    scpiCommand('cmd_CONF_SWE_FMIN_q', ':CONFigure:SWEep:FMINimum?',
+                parser=_float,
+                cached=True,
+                doc='''
+        Returns the minimum optical frequency of a sweep.
+        '''),
+
+    scpiCommand('cmd_CONF_SWE_DIR', ':CONFigure:SWEep:DIRection',
+                args=(('direct', _choice(sweepDirection, 'Please enter "INCR/DECR/BINC" to select the increasing/decreasing/bidirectional sweep of the laser.')),),
+                store=sweepDirection.fromReply,
+                invalidates=_SWEEP_GEOMETRY,
+                doc='''
+        This command sets the direction of the wavelength sweeps
+        of the laser. Options are to sweep the laser with increasing
+        wavelength, decreasing wavelength, bidirectionally with
+        increasing wavelength first or bidirectionally with decreasing
+        wavelength first.
+        '''),
+
+    scpiCommand('cmd_CONF_SWE_DIR_q', ':CONFigure:SWEep:DIRection?',
+                parser=sweepDirection.fromReply,
+                cached=True,
+                doc='''
+        This command returns the direction of the wavelength
+        sweep of the laser.
+        '''),
+
+    scpiCommand('cmd_CONF_SWE_POIN', ':CONFigure:SWEep:POINts',
+                args=(('points', _number(1, 131071, integer=True)),),
+                store=_int,
+                invalidates=_SWEEP_GEOMETRY,
+                doc='''
+        This command sets the number of measurement points in a
+        sweep.
+        The number of points to use to compose a sweep. Use the
+        keyword "MAXimum" in place of the number of <Points>
+        to perform a non-decimated sweep of the
+        laser with the largest number of sweep points. (integer,
+        1-131071).
+        '''),
+
+    scpiCommand('cmd_CONF_SWE_POIN_q', ':CONFigure:SWEep:POINts?',
+                parser=_int,
+                cached=True,
+                doc='''
+        Returns the number of measurement points in a sweep.
+        '''),
+
+    scpiCommand('cmd_CONF_SWE_WMAX', ':CONFigure:SWEep:WMAXimum',
+                args=(('wavelength', _number(0)),),
+                store=_float,
+                invalidates=_SWEEP_GEOMETRY,
+                doc='''
+        Set the maximum wavelength of a sweep.
+        '''),
+
+    scpiCommand('cmd_CONF_SWE_WMAX_q', ':CONFigure:SWEep:WMAXimum?',
+                parser=_float,
+                cached=True,
+                doc='''
+        Returns the maximum wavelength of a sweep.
+        '''),
+
+    scpiCommand('cmd_CONF_SWE_FMAX', ':CONFigure:SWEep:FMAXimum',
+                args=(('frequency', _number(0)),),
+                store=_float,
+                invalidates=_SWEEP_GEOMETRY,
+                doc='''
+        Set the maximum optical frequency of a sweep.
+        '''),
+
+    scpiCommand('cmd_CONF_SWE_FMAX_q', ':CONFigure:SWEep:FMAXimum?',
+                parser=_float,
+                cached=True,
+                doc='''
+        Returns the maximum optical frequency of a sweep.
+        '''),
+
+    scpiCommand('cmd_CONF_SWE_RAT', ':CONFigure:SWEep:RATe',
+                args=(('rate', _number(1, 10000)),),
+                store=_float,
+                invalidates=_SWEEP_GEOMETRY,
+                doc='''
+        This command sets the sweep repetition rate.
+        Sweep repetition rate (float, 1-10000, kHz).
+        '''),
+
+    scpiCommand('cmd_CONF_SWE_RAT_q', ':CONFigure:SWEep:RATe?',
+                parser=_float,
+                cached=True,
+                doc='''
+        Returns the sweep repetition rate.
+        '''),
+
+    scpiCommand('cmd_CONF_SWE_DEL', ':CONFigure:SWEep:DELay',
+                args=(('delay', _number(0, 655350)),),
+                store=_float,
+                invalidates=_SWEEP_GEOMETRY,
+                doc='''
+        This command sets the inter-sweep delay time, during this
+        time the laser output is attenuated until the next sweep
+        starts.
+        The inter-sweep delay time, during this time the laser output
+        is attenuated
+        (float, 0-655350, nanoseconds).
+        '''),
+
+    scpiCommand('cmd_CONF_SWE_DEL_q', ':CONFigure:SWEep:DELay?',
+                parser=_float,
+                cached=True,
+                doc='''
+        This command queries the inter-sweep delay time, during
+        this time the laser output is attenuated until the next sweep
+        starts.
+        '''),
+
+    scpiCommand('cmd_CONF_SWE_POW', ':CONFigure:SWEep:POWer',
+                args=(('power', _number(0)),),
+                store=_float,
+                invalidates=_SWEEP_CALIBRATION,
+                doc='''
+        This command sets the average power level of the sweep.
+        For a flat power profile, the average power = the flat power
+        level. For a Gaussian profile with a full-width half-maximum
+        equal to the scan range, the peak power of the Gaussian =
+        1.235 * Average Power. Using the power calibration of
+        milliwatts of power to counts, the entered average power is
+        converted to counts, which the power-level routine uses as
+        its target value.
+        The average power level to set the laser to for sweeping
+        (float, mW).
+        '''),
+
+    scpiCommand('cmd_CONF_SWE_POW_q', ':CONFigure:SWEep:POWer?',
+                parser=_float,
+                cached=True,
+                doc='''
+        Returns the average power of a sweep.
+        '''),
+
+    scpiCommand('cmd_CONF_SWE_PROF', ':CONFigure:SWEep:PROFile',
+                args=(('profile', _choice(powerProfile, 'Please enter "FLAT/GAUSSIAN/CUSTOM" to select the power profile type: flat, gaussian or custom.')),
+                      ('data', _profileData, None)),
+                fmt=_profileArgs,
+                store=powerProfile.fromReply,
+                invalidates=_SWEEP_CALIBRATION + (PROFILE_DATA,),
+                doc='''
+        This command set the power vs. table index profile.
+        The Flat profile sets the optical power at each wavelength in
+        a sweep equal to the average power level set in
+        :CONFigure:SWEep:POWer.
+        The Gaussian power profile sets the peak optical power at
+        the center of the sweep range, with the peak power value
+        determined by the average power requested with
+        :CONFigure:SWEep:POWer.
+        
+        If CUSTom is the Profile Type, this is the data file to use.
+        The data file should contain only floating point numbers in
+        one column. When reading the data file: blank lines are
+        ignored; the data is scaled to the number of points in the
+        sweep; if the values are not in the range [0, 1], they will be
+        normalized to the range [0, 1]; negative values are not
+        accepted; more than 1 million entries are not accepted. If
+        GAUSsian is the ProfileType, this is the power rollo at the
+        beginning and end of the laser wavelength range, relative to
+        the peak power at the center of the range
+        
+        (float, 1-10, dB). If not entered, the previously entered value
+        will be used, or the default if there was no previously entered
+        value.
+        '''),
+
+    scpiCommand('cmd_CONF_SWE_PROF_q', ':CONFigure:SWEep:PROFile?',
+                parser=powerProfile.fromReply,
+                cached=True,
+                doc='''
+        Returns the power vs. wavelength profile.
+        '''),
+
+    scpiCommand('cmd_CONF_SWE_TRIG', ':CONFigure:SWEep:TRIGger',
+                args=(('edge', _choice(triggerEdge, 'Please enter "RIS/FALL/BOTH" to set the edge of the Start Sweep trigger: rising, falling or both.')),),
+                store=triggerEdge.fromReply,
+                doc='''
+        This command sets the edge of the Start Sweep trigger that
+        corresponds to the start of a wavelength sweep.
+        Trigger edge setting (RISing, FALLing, BOTH).
+        '''),
+
+    scpiCommand('cmd_CONF_SWE_TRIG_q', ':CONFigure:SWEep:TRIGger?',
+                parser=triggerEdge.fromReply,
+                cached=True,
+                doc='''
+        This command returns the edge of the Start Sweep trigger
+        that corresponds to the start of a wavelength sweep.
+        '''),
+
+####################
+## 3) Calibrate the laser
+
+    scpiCommand('cmd_CAL_SWE', ':CALibrate:SWEep',
+                store=_calibrated,
+                doc='''   
+        This command initiates immediate calibration of a laser
+        sweep. Also referred to as sweep calibration.
+        '''),
+
+    scpiCommand('cmd_CAL_SWE_q', ':CALibrate:SWEep?',
+                parser=_text,
+                doc='''
+        This command queries the results of the last sweep
+        calibration.
+        '''),
+
+    scpiCommand('cmd_CONF_SWE_STEP', ':CONFigure:SWEep:STEP',
+                args=(('step', _number(0.05, 10000)),),
+                store=_float,
+                invalidates=_SWEEP_GEOMETRY,
+                doc='''
+        This command sets the sweep optical frequency step 
+        between points in a sweep.
+        Sweep step size (fl􏰥oat, .05-10000, GHz).
+        '''),
+
+    scpiCommand('cmd_CONF_SWE_STEP_q', ':CONFigure:SWEep:STEP?',
+                parser=_float,
+                cached=True,
+                doc='''
+        This command reads the optical frequency step 
+        between points in a sweep.
+        '''),
+
+####################
+## 4) Read the Data Invalid Vector (DIV)
+##    and the total number of points in the sweep
+
+    scpiCommand('cmd_CONF_SWE_DIV_q', ':CONFigure:SWEep:DIVector?',
+                parser=_intArray,
+                stream=intStream,
+                doc='''
+        Reads the Data Invalid Vector (DIV) from the laser. 
+        The DIV indicates in Sample Clocks where the optical
+        frequency has not stepped and the data is invalid.
+        '''),
+
+    scpiCommand('cmd_CONF_SWE_POIN_TOT_q', ':CONFigure:SWEep:POINts:TOTal?',
+                parser=_int,
+                doc='''
+        This command returns the total number of points in
+        the sweep, which equals the number of measurement 
+        points (at which the optical frequency has changed 
+        by a de􏰤ned interval) + the number of invalid points 
+        (at which the optical frequency of the laser is not changing).
+        '''),
+
+####################
+## 5) Start a sweep
+
+    scpiCommand('cmd_INIT_SWE', ':INITiate:SWEep',
+                doc='''
+        This command starts the laser sweep.
+        '''),
+
+###################
+## 6) To end the sweep and diable output
+
+    scpiCommand('cmd_ABOR', ':ABORt',
+                doc='''    
+        This command aborts the current operation and returns the
+        laser to standby mode with no light exiting the laser to the
+        user. This includes aborting calibration operations, such as:
+        :CALibrate:SWEep
+        :CALibrate:FACTory
+        :CALibrate:RELAtive:SPLitref
+        :CALibrate:DARK
+        '''),
+
+#%% Command from the Insight-laser UI
+
+    scpiCommand('cmd_SYST_CONT', ':SYSTem:CONTrol',
+                args=(('mode', _choice(controlMode, 'Please enter "HARD/SOFT" to set the control mode of the device: Hardware or Software')),),
+                store=controlMode.fromReply,
+                doc='''
+        This sets the control mode of the device
+        '''),
+
+    scpiCommand('cmd_CONF_SCL_RAT', ':CONFigure:SCLock:RATe',
+                args=(('rate', _number(1, 400)),),
+                store=_float,
+                doc='''
+        This command speci􏰤es the rate of the external sample clock, 
+        which is used for communicating to other instrumentation when 
+        to sample data measured with a sweep of the laser.
+        This command does not affect any other commands regarding points, 
+        per point, or indices. Those commands will use the :SYSTem:CLOCk rate.
+        See :SYSTem:CLOCk for the internal sample clock.
+        A value below 112 MHz may result in undefined behavior.
+        The rate to operate the external sample clock. 
+        A value below 112 MHz may result in
+        undefi􏰤ned behavior (float, 1-400, MHz).
+        '''),
+
+    scpiCommand('cmd_CONF_SCL_RAT_q', ':CONFigure:SCLock:RATe?',
+                parser=_float,
+                cached=True,
+                doc='''
+        This command returns the rate of the external sample clock, 
+        which is used for communicating to other instrumentation 
+        when to sample data measured with a sweep of the laser. 
+        This command does not affect any other commands regarding points, 
+        per point, or indices. Those commands will use the :SYSTem:CLOCk rate.
+        See :SYSTem:CLOCk for the internal sample clock.
+        '''),
+
+    scpiCommand('cmd_SYST_ERR_ALL_q', ':SYSTem:ERRor:ALL?',
+                parser=_errors,
+                doc='''
+        Queries the error/event queue for all unread items and removes them 
+        from the queue.
+        Returns a list of scpiError, empty if there was no error.
+        '''),
+
+    scpiCommand('cmd_SYST_ERR_q', ':SYSTem:ERRor?',
+                parser=_error,
+                doc='''
+        Queries the error/event queue for the next item and removes it from 
+        the queue.
+        '''),
+
+    scpiCommand('cmd_SYST_ERR_NEXT_q', ':SYSTem:ERRor:NEXT?',
+                parser=_error,
+                doc='''
+        Queries the error/event queue for the next item and removes it from 
+        the queue.
+        '''),
+
+    scpiCommand('cmd_SYST_ERR_CODE_q', ':SYSTem:ERRor:CODE?',
+                parser=_int,
+                doc='''
+        Queries the error/event queue for the next item, returns only the error 
+        code and removes it from the queue.
+        '''),
+
+    scpiCommand('cmd_SYST_ERR_CODE_NEXT_q', ':SYSTem:ERRor:CODE:NEXT?',
+                parser=_int,
+                doc='''
+        Queries the error/event queue for the next item, returns only the error 
+        code and removes it from the queue.
+        '''),
+
+    scpiCommand('cmd_SYST_ERR_CODE_ALL_q', ':SYSTem:ERRor:CODE:ALL?',
+                parser=_ints,
+                doc='''
+        Queries the error/event queue for all unread items, returns only the error 
+        codes and removes them from the queue.
+        '''),
+
+#######################################
+
+### increasing
+    scpiCommand('cmd_CONF_INCR_SBP', ':CONFigure:SBPoints',
+                args=(('points', _number(1, 131071, integer=True)),
+                      ('minwvl', _number(0)),
+                      ('maxwvl', _number(0)),
+                      ('interdelay', _number(0, 655350))),
+                store=_floats,
+                invalidates=_SWEEP_GEOMETRY,
+                doc='''
+        This command sets up an increasing sweep configuration
+        with an emphasis on points.
+        :CAL:SWE must be performed after issuing this command
+        to get the desired effect.
+        E.G. atlas ready> :CONF:SBP MAX, 1550 nm, 1555 nm, 0 ns
+        :CONFigure:INCReasing:SBPoints 1033, 1550 nm, 1551 nm,
+        0 ns
+        =>
+        '''),
+
+    scpiCommand('cmd_CONF_INCR_SBP_q', ':CONFigure:SBPoints?',
+                parser=_floats,
+                cached=True,
+                doc='''
+        This command queries the current increasing sweep
+        configuration with an emphasis on points.
+        '''),
+
+    scpiCommand('cmd_CONF_INCR_SBR', ':CONFigure:SBRate',
+                args=(('rate', _number(1, 10000)),
+                      ('minwvl', _number(0)),
+                      ('maxwvl', _number(0)),
+                      ('interdelay', _number(0, 655350))),
+                store=_floats,
+                invalidates=_SWEEP_GEOMETRY,
+                doc='''
+        This command sets up an increasing sweep configuration
+        with an emphasis on sweep rate.
+        :CAL:SWE must be performed after issuing this command
+        to get the desired effect.
+        atlas ready> :CONF:SBR MIN
+        :CONFigure:INCReasing:SBRate 8.57753 kHz, 1524.41 nm,
+        1562.07 nm, 0 ns
+        =>
+        '''),
+
+    scpiCommand('cmd_CONF_INCR_SBR_q', ':CONFigure:SBRate?',
+                parser=_floats,
+                cached=True,
+                doc='''
+        This command queries the current increasing sweep
+        configuration with an emphasis on rate.
+        '''),
+
+    scpiCommand('cmd_CONF_INCR_SBS', ':CONFigure:SBSTep',
+                args=(('step', _number(0.05, 10000)),
+                      ('minwvl', _number(0)),
+                      ('maxwvl', _number(0)),
+                      ('interdelay', _number(0, 655350))),
+                store=_floats,
+                invalidates=_SWEEP_GEOMETRY,
+                doc='''
+        This command sets up an increasing sweep configuration
+        with an emphasis on optical
+        frequency step. :CAL:SWE must be performed after issuing
+        this command to get the desired effect.
+        atlas ready> :CONF:SBST .1, MIN, MAX, MIN
+        :CONFigure:INCReasing:SBSTep .1 GHz, 1524.41 nm,
+        1562.07 nm, 0 ns
+        =>
+        '''),
+
+    scpiCommand('cmd_CONF_INCR_SBS_q', ':CONFigure:SBSTep?',
+                parser=_floats,
+                cached=True,
+                doc='''
+        This command queries the current increasing sweep
+        configuration with an emphasis on optical frequency step.
+        '''),
+
+#### decreasing
+    scpiCommand('cmd_CONF_DECR_SBP', ':CONFigure:DECReasing:SBPoints',
+                args=(('points', _number(1, 131071, integer=True)),
+                      ('minwvl', _number(0)),
+                      ('maxwvl', _number(0)),
+                      ('interdelay', _number(0, 655350))),
+                store=_floats,
+                invalidates=_SWEEP_GEOMETRY,
+                doc='''
+        This command sets up a decreasing sweep configuration
+        with an emphasis on points.
+        :CAL:SWE must be performed after issuing this command
+        to get the desired effect.
+        atlas ready> :CONF:DECR:SBP MAX, 1550 nm, 1555 nm,
+        0 ns
+        :CONFigure:DECReasing:SBPoints 1033, 1550 nm, 1551
+        nm, 0 ns
+        =>
+        '''),
+
+    scpiCommand('cmd_CONF_DECR_SBP_q', ':CONFigure:DECReasing:SBPoints?',
+                parser=_floats,
+                cached=True,
+                doc='''
+        This command queries the current decreasing sweep
+        con
+guration with an emphasis on points.
+        '''),
+
+    scpiCommand('cmd_CONF_DECR_SBR', ':CONFigure:DECReasing:SBRate',
+                args=(('rate', _number(1, 10000)),
+                      ('minwvl', _number(0)),
+                      ('maxwvl', _number(0)),
+                      ('interdelay', _number(0, 655350))),
+                store=_floats,
+                invalidates=_SWEEP_GEOMETRY,
+                doc='''
+        This command sets up an decreasing sweep configuration
+        with an emphasis on sweep rate.
+        :CAL:SWE must be performed after issuing this command
+        to get the desired effect.
+        atlas ready> :CONF:SBR MIN
+        :CONFigure:INCReasing:SBRate 8.57753 kHz, 1524.41 nm,
+        1562.07 nm, 0 ns
+        =>
+        '''),
+
+    scpiCommand('cmd_CONF_DECR_SBR_q', ':CONFigure:DECReasing:SBRate?',
+                parser=_floats,
+                cached=True,
+                doc='''
+        This command queries the current decreasing sweep
+        configuration with an emphasis on rate.
+        '''),
+
+    scpiCommand('cmd_CONF_DECR_SBS', ':CONFigure:DECReasing:SBSTep',
+                args=(('step', _number(0.05, 10000)),
+                      ('minwvl', _number(0)),
+                      ('maxwvl', _number(0)),
+                      ('interdelay', _number(0, 655350))),
+                store=_floats,
+                invalidates=_SWEEP_GEOMETRY,
+                doc='''
+        This command sets up an decreasing sweep configuration
+        with an emphasis on optical
+        frequency step. :CAL:SWE must be performed after issuing
+        this command to get the desired effect.
+        atlas ready> :CONF:SBST .1, MIN, MAX, MIN
+        :CONFigure:INCReasing:SBSTep .1 GHz, 1524.41 nm,
+        1562.07 nm, 0 ns
+        =>
+        '''),
+
+    scpiCommand('cmd_CONF_DECR_SBS_q', ':CONFigure:DECReasing:SBSTep?',
+                parser=_floats,
+                cached=True,
+                doc='''
+        This command queries the current decreasing sweep
+        configuration with an emphasis on optical frequency step.
+        '''),
+
+#### bincreasing
+    scpiCommand('cmd_CONF_BINC_SBP', ':CONFigure:BINCreasing:SBPoints',
+                args=(('points', _number(1, 131071, integer=True)),
+                      ('minwvl', _number(0)),
+                      ('maxwvl', _number(0)),
+                      ('interdelay', _number(0, 655350))),
+                store=_floats,
+                invalidates=_SWEEP_GEOMETRY,
+                doc='''
+        This command sets up a bidirectional sweep configuration
+        with an emphasis on points.
+        :CAL:SWE must be performed after issuing this command
+        to get the desired effect.
+        atlas ready> :CONF:DECR:SBP MAX, 1550 nm, 1555 nm,
+        0 ns
+        :CONFigure:DECReasing:SBPoints 1033, 1550 nm, 1551
+        nm, 0 ns
+        =>
+        '''),
+
+    scpiCommand('cmd_CONF_BINC_SBP_q', ':CONFigure:BINCreasing:SBPoints?',
+                parser=_floats,
+                cached=True,
+                doc='''
+        This command queries the current bidirectional sweep
+        con
+guration with an emphasis on points.
+        '''),
+
+    scpiCommand('cmd_CONF_BINC_SBR', ':CONFigure:BINCreasing:SBRate',
+                args=(('rate', _number(1, 10000)),
+                      ('minwvl', _number(0)),
+                      ('maxwvl', _number(0)),
+                      ('interdelay', _number(0, 655350))),
+                store=_floats,
+                invalidates=_SWEEP_GEOMETRY,
+                doc='''
+        This command sets up an bidirectional sweep configuration
+        with an emphasis on sweep rate.
+        :CAL:SWE must be performed after issuing this command
+        to get the desired effect.
+        atlas ready> :CONF:SBR MIN
+        :CONFigure:INCReasing:SBRate 8.57753 kHz, 1524.41 nm,
+        1562.07 nm, 0 ns
+        =>
+        '''),
+
+    scpiCommand('cmd_CONF_BINC_SBR_q', ':CONFigure:BINCreasing:SBRate?',
+                parser=_floats,
+                cached=True,
+                doc='''
+        This command queries the current bidirectional sweep
+        configuration with an emphasis on rate.
+        '''),
+
+    scpiCommand('cmd_CONF_BINC_SBS', ':CONFigure:BINCreasing:SBSTep',
+                args=(('step', _number(0.05, 10000)),
+                      ('minwvl', _number(0)),
+                      ('maxwvl', _number(0)),
+                      ('interdelay', _number(0, 655350))),
+                store=_floats,
+                invalidates=_SWEEP_GEOMETRY,
+                doc='''
+        This command sets up an bidirectional sweep configuration
+        with an emphasis on optical
+        frequency step. :CAL:SWE must be performed after issuing
+        this command to get the desired effect.
+        atlas ready> :CONF:SBST .1, MIN, MAX, MIN
+        :CONFigure:INCReasing:SBSTep .1 GHz, 1524.41 nm,
+        1562.07 nm, 0 ns
+        =>
+        '''),
+
+    scpiCommand('cmd_CONF_BINC_SBS_q', ':CONFigure:BINCreasing:SBSTep?',
+                parser=_floats,
+                cached=True,
+                doc='''
+        This command queries the current bidirectional sweep
+        configuration with an emphasis on optical frequency step.
+        '''),
+
+    scpiCommand('cmd_CONF_SWE_POIN_INCR', ':CONFigure:SWEep:POINts:INCRement',
+                args=(('multiple', _pointsIncrement),),
+                store=_int,
+                invalidates=_SWEEP_GEOMETRY,
+                doc='''
+        This command sets the number of points by which the
+        sweep should be divisible. Valid options
+        are from 4-256 in increments of 4.
+        '''),
+
+    scpiCommand('cmd_CONF_SWE_POIN_INCR_q', ':CONFigure:SWEep:POINts:INCRement?',
+                parser=_int,
+                cached=True,
+                doc='''
+        Returns the number of points by which the sweep is divisible.
+        '''),
+
+###############################################
+## Sequence mode
+    scpiCommand('cmd_CONF_SEQ_q', ':CONFigure:SEQuence?',
+                parser=_sequenceTable,
+                stream=tableStream,
+                doc='''
+        This command queries the list of wavelength/frequency data
+        in the sequence sweep and how much time is spent on each
+        wavelength/frequency before moving on to the next point.
+        '''),
+
+    scpiCommand('cmd_CONF_SEQ_CLEA', ':CONFigure:SEQuence:CLEAr',
+                invalidates=_SEQUENCE_CALIBRATION,
+                doc='''
+        This command clears all the wavelengths/frequencies in the
+        sequence sweep.
+        '''),
+
+    scpiCommand('cmd_CONF_SEQ_ADD_WST', ':CONFigure:SEQuence:ADD:WSTep',
+                args=(('step', _number(0)),
+                      ('length', _number(0)),
+                      ('startwvl', _number(0)),
+                      ('stopwvl', _number(0)),
+                      ('position', _number(-1, integer=True), -1)),
+                invalidates=_SEQUENCE_CALIBRATION,
+                doc='''
+        This command appends a series of wavelengths to the
+        sequence sweep and sets the amount of time to spend at
+        each desired wavelength/frequency.
+        STEP: The step value to increment by to add entries to the
+        sequence sweep (in nanometers).
+        LENGTH: The amount of time, in nanoseconds, to sit at the desired
+        wavelength.
+        STARWVL: The starting wavelength for the new entries (nanometers,
+        defaults to minimum wavelength).
+        STOPWVL: The stopping wavelength for the new entries (nanometers,
+        defaults to maximum wavelength).
+        POSITION: The position in the sequence table to add the wavelength
+        (defaults to the end: -1).
+        '''),
+
+    scpiCommand('cmd_CONF_SEQ_ADD_FST', ':CONFigure:SEQuence:ADD:FSTep',
+                args=(('step', _number(0)),
+                      ('length', _number(0)),
+                      ('startfqc', _number(0)),
+                      ('stopfqc', _number(0)),
+                      ('position', _number(-1, integer=True), -1)),
+                invalidates=_SEQUENCE_CALIBRATION,
+                doc='''
+        This command appends a series of wavelengths to the
+        sequence sweep and sets the amount of time to spend at
+        each desired wavelength/frequency.
+        STEP: The step value to increment by to add entries to the
+        sequence sweep (in nanometers).
+        LENGTH: The amount of time, in nanoseconds, to sit at the desired
+        wavelength.
+        STARFQC: The starting frequency for the new entries (nanometers,
+        defaults to minimum wavelength).
+        STOPFQC: The stopping frequency for the new entries (nanometers,
+        defaults to maximum wavelength).
+        POSITION: The position in the sequence table to add the wavelength
+        (defaults to the end: -1).
+        '''),
+
+    scpiCommand('cmd_CONF_SEQ_INT', ':CONFigure:SEQuence:INTerpolation',
+                args=(('onoff', _choice(_ON_OFF, 'Please enter "ON/OFF" to set turn on/off the wavelength interpolation for sequence mode')),),
+                store=_onOff,
+                invalidates=_SEQUENCE_CALIBRATION,
+                doc='''
+        Whether or not wavelength interpolation will be performed
+        for sequence mode (boolean). Default to o.
+        '''),
+
+    scpiCommand('cmd_CONF_SEQ_ADD_WAV', ':CONFigure:SEQuence:ADD:WAVelength',
+                args=(('value', _number(0)),
+                      ('length', _number(0)),
+                      ('position', _number(-1, integer=True), -1)),
+                invalidates=_SEQUENCE_CALIBRATION,
+                doc='''
+        This command appends a wavelength to the
+        sequence sweep and sets the amount of time to spend at
+        that desired wavelength/frequency. It can be used to created 
+        step-by-step via command
+        '''),
+
+    scpiCommand('cmd_CONF_SEQ_LOAD', ':CONFigure:SEQuence:LOAD',
+                args=(('filename', _quoted),),
+                invalidates=_SEQUENCE_CALIBRATION,
+                doc='''
+        This command imports the sequence sweep table containing
+        the set of wavelengths/frequencies and how much time to
+        spend at each desired wavelength/frequency.
+        '''),
+
+    scpiCommand('cmd_CONF_SEQ_SAV', ':CONFigure:SEQuence:SAVe',
+                args=(('filename', _quoted),),
+                doc='''
+        This command exports the sequence sweep table containing
+        the set of wavelengths/frequencies and how much time to
+        spend at each desired wavelength/frequency.
+        '''),
+
+    scpiCommand('cmd_CONF_SEQ_POW', ':CONFigure:SEQuence:POWer',
+                args=(('power', _number(0)),),
+                store=_float,
+                invalidates=_SEQUENCE_CALIBRATION,
+                doc='''
+        This command sets the output power of the laser in
+        sequence mode, using units of mW.
+        For the new power value to take effect, the user must
+        command the laser to calibrate the power for all sequence
+        wavelengths using :CALibrate:SEQuence.
+        The average power level to set the laser to for sequence
+        mode (float, mW).
+        '''),
+
+    scpiCommand('cmd_CONF_SEQ_POW_q', ':CONFigure:SEQuence:POWer?',
+                parser=_float,
+                cached=True,
+                doc='''
+        This command returns the output power of the laser in
+        sequence wavelength mode, using units of mW.
+        '''),
+
+    scpiCommand('cmd_CONF_SEQ_REM', ':CONFigure:SEQuence:REMove',
+                args=(('ID', _number(-1, integer=True)),),
+                invalidates=_SEQUENCE_CALIBRATION,
+                doc='''
+        This command removes the requested entry from the
+        sequence sweep table, the id is a zero-based row index
+        indicating which entry to remove (0 removes the 
+        rst entry).
+        The special value '-1' removes the last entry from the table.
+        '''),
+
+    scpiCommand('cmd_CAL_SEQ', ':CALibrate:SEQuence',
+                store=_calibrated,
+                doc='''
+        This command calibrates the laser to operate at the specified
+        average power and profile in Sequence Mode. User input
+        values for sequences of wavelengths/frequencies to sweep
+        are not applied until :CALibrate:SEQuence is executed.
+        '''),
+
+    scpiCommand('cmd_CAL_SEQ_q', ':CALibrate:SEQuence?',
+                parser=_text,
+                doc='''
+        This command queries the results of the last sequence
+        calibration.
+        '''),
+
+    scpiCommand('cmd_INIT_SEQ', ':INITiate:SEQuence',
+                doc='''
+        This command sets the laser into Sequence mode. In
+        Sequence mode the laser steps between a a predefined set of
+        wavelengths/frequencies.
+        '''),
+###############################################################################
+## For fixed wavelength mode
+    scpiCommand('cmd_CAL_FIX', ':CALibrate:FIXed',
+                store=_calibrated,
+                doc='''
+        This command calibrates the laser to operate at the
+        specified average power and profile in Fixed Wavelength
+        Mode. User input values for average power and profile are
+        not changed until :CALibrate:FIXed is executed.
+        '''),
+    scpiCommand('cmd_CAL_FIX_q', ':CALibrate:FIXed?',
+                parser=_text,
+                doc='''
+        This command queries the state of the last 
+xed calibration.
+        '''),
+
+    scpiCommand('cmd_CONF_FIX_DEL', ':CONFigure:FIXed:DELay',
+                args=(('Delay', _number(0, 100000)),),
+                store=_float,
+                doc='''
+        The delay time between receiving a wavelength value and
+        when the Data Valid signal will
+        be set to a logic high value (float, 0-100000, microseconds).
+        '''),
+
+    scpiCommand('cmd_CONF_FIX_DEL_q', ':CONFigure:FIXed:DELay?',
+                parser=_float,
+                cached=True,
+                doc='''
+        This command queries the delay between receiving a set
+        wavelength value and when the Data Valid trigger is raised
+        to high, indicating to external user hardware that the laser
+        has reached the desired wavelength.
+        '''),
+
+    scpiCommand('cmd_CONF_FIX_FREQ', ':CONFigure:FIXed:FREQuency',
+                args=(('frequency', _number(0)),),
+                store=_float,
+                invalidates=_FIXED_WAVELENGTH,
+                doc='''
+        This commands the laser to a 
+xed optical frequency in
+        units of THz.
+        '''),
+
+    scpiCommand('cmd_CONF_FIX_FREQ_q', ':CONFigure:FIXed:FREQuency?',
+                parser=_float,
+                cached=True,
+                doc='''
+        This command returns the optical frequency of the laser in
+        Terahertz when in Fixed wavelength mode.
+        '''),
+
+    scpiCommand('cmd_CONF_FIX_WAV', ':CONFigure:FIXed:WAVelength',
+                args=(('wavelength', _number(0)),),
+                store=_float,
+                invalidates=_FIXED_WAVELENGTH,
+                doc='''
+        This commands the laser to a fixed optical wavelength in
+        units of nm.
+        '''),
+
+    scpiCommand('cmd_CONF_FIX_WAV_q', ':CONFigure:FIXed:WAVelength?',
+                parser=_float,
+                cached=True,
+                doc='''
+        This command returns the optical wavelength of the laser in
+        nm when in Fixed wavelength mode.
+        '''),
+
+    scpiCommand('cmd_CONF_FIX_POW', ':CONFigure:FIXed:POWer',
+                args=(('power', _number(0)),),
+                store=_float,
+                invalidates=_FIXED_CALIBRATION,
+                doc='''
+        This command sets the output power of the laser in 
+xed
+        wavelength mode, using units of mW.
+        For the new power value to take eect, the user must
+        command the laser to calibrate the power for all 
+xed
+        wavelengths using :CALibrate:FIXed.
+        '''),
+
+    scpiCommand('cmd_CONF_FIX_POW_q', ':CONFigure:FIXed:POWer?',
+                parser=_float,
+                cached=True,
+                doc='''
+        This command returns the output power of the laser in 
+xed
+        wavelength mode, using units of mW.
+        '''),
+
+    scpiCommand('cmd_CONF_FIX_PROF', ':CONFigure:FIXed:PROFile',
+                args=(('profile', _choice(powerProfile, 'Please enter "FLAT/GAUSSIAN/CUSTOM" to set profile type for fixed wavelength mode')),
+                      ('power', str, 3)),
+                fmt=_fixedProfileArgs,
+                store=_fixedProfile,
+                invalidates=_FIXED_CALIBRATION,
+                doc='''
+        If CUSTom is the Profile Type, this is the data file to use.
+        The data file should contain only floating point numbers in
+        one column. When reading the data file: blank lines are
+        ignored; the data is scaled to the number of points in the
+        sweep; if the values are not in the range [0, 1], they will be
+        normalized to the range [0, 1]; negative values are not
+        accepted; more than 1 million entries are not accepted. If
+        GAUSsian is the Profile Type, this is the power rolloff at the
+        beginning and end of the laser wavelength range, relative to
+        the peak power at the center of the range.
+        (float, 1-10, dB). If not entered, the previously entered value
+        will be used, or the default if there was no previously entered
+        value.
+        '''),
+
+    scpiCommand('cmd_CONF_FIX_PROF_q', ':CONFigure:FIXed:PROFile?',
+                parser=_fixedProfile,
+                cached=True,
+                doc='''
+        This command returns the power vs. wavelength profile of
+        the laser in Fixed Wavelength mode.
+        '''),
+
+    scpiCommand('cmd_INIT_FIX', ':INITiate:FIXed',
+                doc='''
+        This command sets the laser into a fixed wavelength mode.
+        In Fixed mode, the laser may be output to the user or
+        switched off to the user and remain internal to the laser.
+        Fixed mode has its own Calibration that must be performed
+        when the average power, power spectral profile or coherence
+        length is changed.
+        '''),
+]}
+
+# earlier method names, kept for existing scripts
+_ALIASES = {'command_ESR': 'cmd_ESR_q',
+            'cmd_OPC': 'cmd_OPC_q'}
+
+for _alias, _name in _ALIASES.items():
+    COMMANDS[_alias] = COMMANDS[_name]
+
+
+
+
+# this part needs to be at the end of the file. 
+		
+if __name__ == "__main__": 
+	laser = insightLaser()
+	
+#	a.connect()
+#	a.cmd_CLS()
+    
@@ -0,0 +1,155 @@
+# =========================================================================================================
+# Latency metrics for the Insight sweep laser drivers
+# Per SCPI header: round-trip latency histogram, bytes sent and received, and replies that did not
+# end in the prompt (timeouts). Enabled by setting insightLaser.metrics (or asyncInsightLaser.metrics)
+# to a commandMetrics; with metrics left at None the drivers skip all of this.
+# =========================================================================================================
+
+import bisect
+import json
+import math
+
+
+def _bounds(lo=1e-6, hi=100.0, perDecade=10):
+    decades = int(round(math.log10(hi / lo)))
+    return [lo * 10 ** (i / perDecade) for i in range(decades * perDecade + 1)]
+
+# upper bucket bounds in seconds, 1 us to 100 s, 10 per decade
+BOUNDS = _bounds()
+
+
+class latencyHistogram:
+    '''
+    Fixed log-spaced buckets, so recording is one bisect and one list
+    increment: no lock is taken, a driver records from one thread.
+    '''
+
+    def __init__(self, bounds=BOUNDS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)       # last bucket: above bounds[-1]
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def merge(self, other):
+        for i, n in enumerate(other.counts):
+            self.counts[i] += n
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q):
+        '''
+        Upper bound of the bucket holding the <q> quantile, 0-1. The top
+        bucket reports the largest value recorded.
+        '''
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(self.bounds[i], self.max) if i < len(self.bounds) else self.max
+        return self.max
+
+
+class commandStats:
+
+    def __init__(self):
+        self.latency = latencyHistogram()
+        self.bytesOut = 0
+        self.bytesIn = 0
+        self.timeouts = 0
+
+
+class commandMetrics:
+    '''
+    Statistics per SCPI header (the command without its arguments).
+    '''
+
+    def __init__(self):
+        self.commands = {}
+
+    def record(self, header, seconds, bytesOut, bytesIn, timeout=False):
+        stats = self.commands.get(header)
+        if stats is None:
+            stats = self.commands[header] = commandStats()
+        stats.latency.record(seconds)
+        stats.bytesOut += bytesOut
+        stats.bytesIn += bytesIn
+        if timeout:
+            stats.timeouts += 1
+
+    def reset(self):
+        self.commands.clear()
+
+    def total(self):
+        '''
+        commandStats of all commands together.
+        '''
+        total = commandStats()
+        for stats in self.commands.values():
+            total.latency.merge(stats.latency)
+            total.bytesOut += stats.bytesOut
+            total.bytesIn += stats.bytesIn
+            total.timeouts += stats.timeouts
+        return total
+
+    def summary(self):
+        '''
+        {header: {count, mean, p50, p99, max, bytesOut, bytesIn, timeouts}},
+        latencies in seconds.
+        '''
+        out = {}
+        for header, stats in sorted(self.commands.items()):
+            h = stats.latency
+            out[header] = {'count': h.count,
+                           'mean': h.sum / h.count if h.count else None,
+                           'p50': h.quantile(0.5),
+                           'p99': h.quantile(0.99),
+                           'max': h.max,
+                           'bytesOut': stats.bytesOut,
+                           'bytesIn': stats.bytesIn,
+                           'timeouts': stats.timeouts}
+        return out
+
+    def toJSON(self, **kwargs):
+        return json.dumps(self.summary(), **kwargs)
+
+    def toPrometheus(self, prefix='insight_laser', labels=None):
+        '''
+        Prometheus text exposition: a latency histogram and byte/timeout
+        counters per command. <labels> are added to every sample, e.g.
+        {'host': 'insight-laser'}.
+        '''
+        extra = ''.join(',%s="%s"' % (k, _escape(v)) for k, v in sorted((labels or {}).items()))
+        lines = ['# TYPE %s_command_seconds histogram' % prefix]
+        for header, stats in sorted(self.commands.items()):
+            h = stats.latency
+            tag = 'command="%s"%s' % (_escape(header), extra)
+            seen = 0
+            for bound, n in zip(h.bounds, h.counts):
+                seen += n
+                lines.append('%s_command_seconds_bucket{%s,le="%.3g"} %d' % (prefix, tag, bound, seen))
+            lines.append('%s_command_seconds_bucket{%s,le="+Inf"} %d' % (prefix, tag, h.count))
+            lines.append('%s_command_seconds_sum{%s} %r' % (prefix, tag, h.sum))
+            lines.append('%s_command_seconds_count{%s} %d' % (prefix, tag, h.count))
+        for name, attr in (('sent_bytes', 'bytesOut'), ('received_bytes', 'bytesIn'),
+                           ('timeouts', 'timeouts')):
+            lines.append('# TYPE %s_%s_total counter' % (prefix, name))
+            for header, stats in sorted(self.commands.items()):
+                lines.append('%s_%s_total{command="%s"%s} %d'
+                             % (prefix, name, _escape(header), extra, getattr(stats, attr)))
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -0,0 +1,179 @@
+# =========================================================================================================
+# Sweep pipeline for the Insight sweep laser
+# Runs acquisition and processing side by side: one control thread drives the laser (INITiate, read the
+# digitizer, ABORt) while the samples of earlier sweeps are processed in a pool of worker processes.
+# Samples go into a ring of shared-memory slots the digitizer fills in place, and the sample axis of the
+# sweep configuration (valid mask, point index, frequency, wavelength, see insightLaser_axis) is put in
+# shared memory once per configuration. Workers map both by name, so no array is pickled; only a small
+# dict of sweep metadata travels with each task.
+#
+#   def process(samples, axis, meta):          # module level, runs in a worker process
+#       return numpy.abs(numpy.fft.rfft(axis.valid(samples)))
+#
+#   with sweepPipeline(laser, digitizer.readInto, process, samples=(2**20,), dtype='int16') as pipe:
+#       for spectrum in pipe.run(1000):
+#           ...
+# =========================================================================================================
+
+import concurrent.futures
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy
+
+from insightLaser_axis import axisCache, sweepAxis
+
+
+_AXIS_ARRAYS = ('mask', 'point', 'frequency', 'wavelength')
+
+
+def _share(array):
+    '''
+    Copy <array> into a new shared-memory block.
+    return: (SharedMemory, reference to pass to a worker)
+    '''
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    numpy.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+    return block, (block.name, array.shape, array.dtype.str)
+
+
+# blocks mapped by this worker process, by name; they stay mapped for the life of the worker
+_mapped = {}
+
+def _view(ref):
+    name, shape, dtype = ref
+    block = _mapped.get(name)
+    if block is None:
+        block = _mapped[name] = shared_memory.SharedMemory(name=name)
+    return numpy.ndarray(shape, dtype, buffer=block.buf)
+
+def _processSweep(process, samplesRef, axisRefs, meta):
+    axis = sweepAxis(*(_view(ref) for ref in axisRefs))
+    samples = _view(samplesRef)
+    samples.flags.writeable = False
+    return process(samples, axis, meta)
+
+
+class sweepPipeline:
+    '''
+    laser: connected insightLaser, configured for sweeping
+    acquire: acquire(laser, out) fills the array <out> with the samples of
+             the running sweep
+    process: process(samples, axis, meta) run in a worker process; it must
+             be importable (module level) and its return value is what
+             run() yields. samples and the sweepAxis arrays are read-only
+             views of shared memory, valid only during the call.
+    samples: shape of one sweep's samples; dtype: their type
+    workers: processes in the pool, os.cpu_count() by default
+    slots: sweeps acquired ahead of processing, 2 per worker by default
+    cycle: send :INITiate:SWEep before and :ABORt after every acquisition
+    '''
+
+    def __init__(self, laser, acquire, process, samples, dtype=numpy.float64, workers=None,
+                 slots=None, cycle=True):
+        self.laser = laser
+        self.acquire = acquire
+        self.process = process
+        self.cycle = cycle
+        self.workers = workers or os.cpu_count() or 1
+        self._log = logging.getLogger()
+        self._axes = axisCache()
+        self._sharedAxes = {}       # axis cache key: (blocks, refs)
+        self._slots = []            # (SharedMemory, array, ref)
+        dtype = numpy.dtype(dtype)
+        for _ in range(slots or 2 * self.workers):
+            block, ref = _share(numpy.zeros(samples, dtype))
+            self._slots.append((block, numpy.ndarray(samples, dtype, buffer=block.buf), ref))
+        self._pool = concurrent.futures.ProcessPoolExecutor(
+            self.workers, mp_context=multiprocessing.get_context('spawn'))
+
+    def close(self):
+        self._pool.shutdown()
+        for block, array, ref in self._slots:
+            del array
+            block.close()
+            block.unlink()
+        self._slots = []
+        for blocks, refs in self._sharedAxes.values():
+            for block in blocks:
+                block.close()
+                block.unlink()
+        self._sharedAxes.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _axis(self):
+        '''
+        Shared-memory references of the axis of the current configuration.
+        '''
+        key = self._axes.key(self.laser)
+        shared = self._sharedAxes.get(key)
+        if shared is None:
+            axis = self._axes.get(self.laser)
+            blocks, refs = zip(*(_share(getattr(axis, name)) for name in _AXIS_ARRAYS))
+            shared = self._sharedAxes[key] = (blocks, refs)
+        return key, shared[1]
+
+    def _control(self, sweeps, free, results, stop):
+        laser = self.laser
+        try:
+            for index in range(sweeps):
+                slot = free.get()
+                if stop.is_set():
+                    break
+                _, array, ref = self._slots[slot]
+                key, axisRefs = self._axis()
+                if self.cycle:
+                    laser.cmd_INIT_SWE()
+                started = time.time()
+                self.acquire(laser, array)
+                if self.cycle:
+                    laser.cmd_ABOR()
+                meta = {'index': index, 'time': started, 'host': key[0],
+                        'config': dict(zip(('points', 'step', 'minwvl', 'maxwvl', 'direction'), key[1:6]))}
+                future = self._pool.submit(_processSweep, self.process, ref, axisRefs, meta)
+                future.add_done_callback(lambda f, slot=slot: free.put(slot))
+                results.put(future)
+        except BaseException as exc:
+            results.put(exc)
+        results.put(None)
+
+    def run(self, sweeps):
+        '''
+        Acquire <sweeps> sweeps and yield the processing results in sweep
+        order. Acquisition runs ahead of the consumer by at most the number
+        of slots.
+        '''
+        free = queue.Queue()
+        for slot in range(len(self._slots)):
+            free.put(slot)
+        results = queue.Queue()
+        stop = threading.Event()
+        thread = threading.Thread(target=self._control, args=(sweeps, free, results, stop),
+                                  name='sweepPipeline %s' % self.laser.host, daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = results.get()
+                if item is None:
+                    break
+                if isinstance(item, BaseException):
+                    raise item
+                yield item.result()
+        finally:
+            stop.set()
+            free.put(None)          # wake the control thread if it waits for a slot
+            thread.join()
+            while not results.empty():
+                item = results.get()
+                if isinstance(item, concurrent.futures.Future):
+                    item.cancel()
@@ -0,0 +1,187 @@
+# =========================================================================================================
+# Sweep planner for the Insight sweep laser
+# Works out on the host what a sweep configuration will do before it is sent: the point count
+# (rounded to the :SWEep:POINts:INCRement multiple), the optical frequency step, the repetition rate,
+# the total points including the invalid ones reported in the DIV, the sweep duration and the number
+# of external sample clocks. Configurations outside the laser's ranges are rejected with ValueError
+# instead of a round trip and a device error.
+#
+# Timing model: every point, valid or not, takes one period of the internal clock (:SYSTem:CLOCk,
+# nominally 2.5 ns per step, planSweep(internalClock=)); a sweep repeats after its duration plus the
+# inter-sweep delay, and a bidirectional sweep covers the range twice. The share of invalid points
+# depends on the laser, it can be measured with SweepPlan.learn() from a real :POINts:TOTal? reply.
+# =========================================================================================================
+
+import dataclasses
+import math
+
+from insightLaser_config import SweepConfig
+from insightLaser_sequence import C_NM_THZ
+
+
+# ranges of the sweep commands (see insightLaser_instr.COMMANDS)
+POINTS = (1, 131071)
+STEP_GHZ = (0.05, 10000)
+RATE_KHZ = (1, 10000)
+DELAY_NS = (0, 655350)
+INCREMENT = (4, 256)
+
+WAVELENGTH_NM = (1524.41, 1562.07)     # MINimum/MAXimum of the sweep range
+INTERNAL_CLOCK_MHZ = 400                # 2.5 ns per step
+INVALID_FRACTION = 1 / 16               # invalid points per valid point, see SweepPlan.learn()
+
+_DIRECTIONS = ('INCR', 'DECR', 'BINC')
+
+
+def _check(name, value, limits):
+    lo, hi = limits
+    if not lo <= value <= hi:
+        raise ValueError('%s %g is outside the range [%g, %g]' % (name, value, lo, hi))
+
+
+def _wavelength(value, default):
+    '''nm from a number or MINimum/MAXimum/DEFault.'''
+    if isinstance(value, str):
+        keyword = value.strip().upper()[:3]
+        if keyword in ('MIN', 'MAX'):
+            return WAVELENGTH_NM[keyword == 'MAX']
+        if keyword == 'DEF':
+            return default
+    return float(value)
+
+
+@dataclasses.dataclass
+class SweepPlan:
+    '''
+    A sweep as the laser will run it. Times in seconds, step in GHz, rate
+    in kHz, delay in ns.
+    '''
+    direction: str
+    emphasis: str               # 'SBP', 'SBR' or 'SBS': the command that sets it up
+    minwvl: float
+    maxwvl: float
+    points: int
+    step: float
+    rate: float
+    interdelay: float
+    increment: int
+    invalidPoints: int
+    totalPoints: int
+    duration: float             # one sweep, without the inter-sweep delay
+    sampleClocks: int           # external sample clocks during one sweep
+    clockrate: float = None     # external sample clock, MHz
+
+    @property
+    def span(self):
+        '''Optical frequency span of the sweep, GHz.'''
+        return 1000 * (C_NM_THZ / self.minwvl - C_NM_THZ / self.maxwvl)
+
+    def command(self):
+        '''
+        (command name, args) that sets this sweep up.
+        '''
+        value = {'SBP': self.points, 'SBR': self.rate, 'SBS': self.step}[self.emphasis]
+        return ('cmd_CONF_%s_%s' % (self.direction, self.emphasis),
+                (value, self.minwvl, self.maxwvl, self.interdelay))
+
+    def config(self, **kwargs):
+        '''
+        SweepConfig for this plan; other settings (power, profile, edge)
+        as keyword arguments.
+        '''
+        value = {'SBP': 'points', 'SBR': 'rate', 'SBS': 'step'}[self.emphasis]
+        kwargs[value] = getattr(self, value)
+        return SweepConfig(direction=self.direction, minwvl=self.minwvl, maxwvl=self.maxwvl,
+                           interdelay=self.interdelay, increment=self.increment,
+                           clockrate=self.clockrate, **kwargs)
+
+    def learn(self, totalPoints):
+        '''
+        Invalid points per valid point measured from the laser's
+        :SWEep:POINts:TOTal? reply, to pass to planSweep(invalidFraction=).
+        '''
+        return (totalPoints - self.points) / self.points
+
+
+def planSweep(minwvl='MIN', maxwvl='MAX', points=None, step=None, resolution=None, rate=None,
+              duration=None, interdelay=0, direction='INCR', increment=4, clockrate=None,
+              internalClock=INTERNAL_CLOCK_MHZ, invalidFraction=INVALID_FRACTION):
+    '''
+    Plan a sweep over [minwvl, maxwvl] (nm, or 'MIN'/'MAX') from exactly
+    one of:
+        points      number of measurement points
+        step        optical frequency step, GHz
+        resolution  wavelength step at the centre of the range, nm
+        rate        sweep repetition rate, kHz
+        duration    sweep period including the delay, s
+    The point count is rounded up to a multiple of <increment>, so the
+    step is never coarser than asked for.
+    return: SweepPlan
+    '''
+    given = [n for n, v in (('points', points), ('step', step), ('resolution', resolution),
+                            ('rate', rate), ('duration', duration)) if v is not None]
+    if len(given) != 1:
+        raise ValueError('give exactly one of points, step, resolution, rate or duration, got %s'
+                         % (', '.join(given) or 'none'))
+    direction = str(direction).upper()[:4]
+    if direction not in _DIRECTIONS:
+        raise ValueError('direction must be one of %s' % ', '.join(_DIRECTIONS))
+    _check('points increment', increment, INCREMENT)
+    if increment % 4:
+        raise ValueError('points increment %d is not a multiple of 4' % increment)
+    _check('inter-sweep delay', interdelay, DELAY_NS)
+    lo = _wavelength(minwvl, WAVELENGTH_NM[0])
+    hi = _wavelength(maxwvl, WAVELENGTH_NM[1])
+    _check('minimum wavelength', lo, WAVELENGTH_NM)
+    _check('maximum wavelength', hi, WAVELENGTH_NM)
+    if lo >= hi:
+        raise ValueError('minimum wavelength %g must be below the maximum %g' % (lo, hi))
+    span = 1000 * (C_NM_THZ / lo - C_NM_THZ / hi)       # GHz
+    passes = 2 if direction == 'BINC' else 1
+
+    def roundUp(n):
+        return max(increment, int(math.ceil(n / increment)) * increment)
+
+    if points is not None:
+        emphasis = 'SBP'
+        count = roundUp(points)
+    elif step is not None or resolution is not None:
+        emphasis = 'SBS'
+        if resolution is not None:
+            centre = (lo + hi) / 2
+            step = 1000 * C_NM_THZ * resolution / centre**2
+        _check('step', step, STEP_GHZ)
+        count = roundUp(span / step + 1)
+    else:
+        emphasis = 'SBR'
+        if rate is not None:
+            _check('sweep rate', rate, RATE_KHZ)
+        period = duration if duration is not None else 1e-3 / rate
+        sweep = period - interdelay * 1e-9
+        if sweep <= 0:
+            raise ValueError('the inter-sweep delay leaves no time for the sweep')
+        total = sweep * internalClock * 1e6 / passes
+        count = int(total / (1 + invalidFraction)) // increment * increment
+        if count < increment:
+            raise ValueError('a %g s sweep period is too short for %d points' % (period, increment))
+    _check('points', count, POINTS)
+
+    invalid = int(math.ceil(count * invalidFraction))
+    totalPoints = count + invalid
+    sweepTime = passes * totalPoints / (internalClock * 1e6)
+    rateKhz = 1e-3 / (sweepTime + interdelay * 1e-9)
+    stepGhz = span / (count - 1) if count > 1 else span
+    _check('sweep rate', rateKhz, RATE_KHZ)
+    if emphasis != 'SBS':
+        # with SBS the requested step is sent, checked above; rounding the
+        # point count up may leave the derived one just under the minimum
+        _check('step', stepGhz, STEP_GHZ)
+    if emphasis == 'SBR':
+        # send the rate rounded the way it will be reported
+        rateKhz = float('%.6g' % rateKhz)
+    return SweepPlan(direction=direction, emphasis=emphasis, minwvl=lo, maxwvl=hi, points=count,
+                     step=step if emphasis == 'SBS' else stepGhz, rate=rateKhz, interdelay=interdelay,
+                     increment=increment, invalidPoints=invalid, totalPoints=totalPoints,
+                     duration=sweepTime,
+                     sampleClocks=int(round(sweepTime * clockrate * 1e6)) if clockrate else 0,
+                     clockrate=clockrate)
@@ -0,0 +1,115 @@
+# =========================================================================================================
+# Custom power profiles for the Insight sweep laser
+# A CUSTom sweep profile (:CONFigure:SWEep:PROFile CUSTom,<file>) is a data file of one float per line,
+# relative power per sweep point. This builds the profile from an array or a function of wavelength,
+# resamples it to the point count of the sweep, checks and normalizes it to [0, 1] and writes the file
+# in fixed-width chunks straight from NumPy. The profile is hashed: uploading the same profile again
+# sends nothing and so does not force another sweep calibration.
+#
+#   uploadProfile(laser, lambda wvl: 1 + (wvl - 1545)**2 / 100, loadFile=(r'\\share\prof.txt', 'prof.txt'))
+# =========================================================================================================
+
+import hashlib
+
+import numpy
+
+from insightLaser_instr import PROFILE_DATA, powerProfile
+
+
+MAX_ENTRIES = 1000000           # the laser refuses longer data files
+DIGITS = 6                      # decimals written per value
+
+
+def makeProfile(profile, points, minwvl=0.0, maxwvl=1.0):
+    '''
+    Profile of <points> values in [0, 1].
+    profile: array of relative power, linearly resampled to <points>, or
+             f(wavelength) called once with the array of the <points>
+             wavelengths from minwvl to maxwvl (0 to 1 if not given)
+    '''
+    if callable(profile):
+        values = numpy.asarray(profile(numpy.linspace(minwvl, maxwvl, points)), dtype=float)
+        values = numpy.broadcast_to(values, (points,))
+    else:
+        values = numpy.asarray(profile, dtype=float)
+        if values.ndim != 1 or not len(values):
+            raise ValueError('a profile is a non-empty 1-D array, got shape %s' % (values.shape,))
+        if len(values) != points:
+            values = numpy.interp(numpy.linspace(0, 1, points), numpy.linspace(0, 1, len(values)), values)
+    return checkProfile(values)
+
+
+def checkProfile(values):
+    '''
+    Validate a profile and scale it so its peak is 1.
+    '''
+    values = numpy.asarray(values, dtype=float)
+    if values.ndim != 1 or not 0 < len(values) <= MAX_ENTRIES:
+        raise ValueError('a profile has 1 to %d entries, got shape %s' % (MAX_ENTRIES, values.shape))
+    if not numpy.isfinite(values).all():
+        raise ValueError('profile entry %d is not finite' % numpy.flatnonzero(~numpy.isfinite(values))[0])
+    if (values < 0).any():
+        raise ValueError('profile entry %d is negative' % numpy.flatnonzero(values < 0)[0])
+    peak = values.max()
+    if peak <= 0:
+        raise ValueError('the profile is zero everywhere')
+    return values / peak
+
+
+def _quantize(values):
+    return numpy.rint(values * 10**DIGITS).astype(numpy.int64)
+
+
+def profileHash(values):
+    '''
+    Hash of the profile as it is written to the data file.
+    '''
+    return hashlib.sha1(_quantize(values).tobytes()).hexdigest()
+
+
+def writeProfileFile(path, values, chunk=65536):
+    '''
+    Write a profile in [0, 1] as '0.dddddd' lines, <chunk> lines at a time.
+    The text is assembled as a byte array, no per-value formatting.
+    '''
+    scaled = _quantize(values)
+    width = DIGITS + 3                                  # digit, '.', decimals, '\n'
+    powers = 10 ** numpy.arange(DIGITS - 1, -1, -1, dtype=numpy.int64)
+    with open(path, 'wb') as f:
+        for start in range(0, len(scaled), chunk):
+            n = scaled[start:start+chunk]
+            text = numpy.empty((len(n), width), dtype=numpy.uint8)
+            text[:, 0] = n // 10**DIGITS + ord('0')
+            text[:, 1] = ord('.')
+            text[:, 2:-1] = (n[:, None] // powers) % 10 + ord('0')
+            text[:, -1] = ord('\n')
+            f.write(text.tobytes())
+
+
+def uploadProfile(laser, profile, loadFile, points=None, calibrate=True):
+    '''
+    Make <laser> sweep with a CUSTom power profile.
+    profile: array or f(wavelength), see makeProfile()
+    loadFile: (local path, name on the laser): the file is written to the
+              local path, a share the laser can read, and selected by name
+    points: profile length, the sweep's point count by default
+    calibrate: run :CALibrate:SWEep after a new profile
+    return: True if the profile was uploaded, False if the laser already
+            had it
+    '''
+    localPath, name = loadFile
+    if points is None:
+        points = laser.cmd_CONF_SWE_POIN_q()
+    minwvl, maxwvl = (0.0, 1.0)
+    if callable(profile):
+        minwvl, maxwvl = laser.cmd_CONF_SWE_WMIN_q(), laser.cmd_CONF_SWE_WMAX_q()
+    values = makeProfile(profile, points, minwvl, maxwvl)
+    uploaded = (name, profileHash(values))
+    if laser.getCached(PROFILE_DATA) == uploaded and laser.cmd_CONF_SWE_PROF_q() == powerProfile.CUSTOM:
+        return False
+    writeProfileFile(localPath, values)
+    laser.cmd_CONF_SWE_PROF('custom', name)
+    laser.setCached(PROFILE_DATA, uploaded)
+    if calibrate:
+        laser.cmd_CAL_SWE()
+    return True
@@ -0,0 +1,314 @@
+# =========================================================================================================
+# Multiplexing proxy for the Insight sweep laser
+# The laser serves one telnet session at a time. laserProxy owns that session and serves any number of
+# local clients on a Unix socket, speaking the laser's own protocol (command lines in, replies ending in
+# the 'atlas ready>' prompt out). Commands of all clients are queued, and whatever is queued when the
+# laser becomes free goes out in one pipelined send. Cached settings queries (the ones the drivers keep
+# in their state cache) are answered from the proxy's reply cache without touching the laser, and such
+# a query sent by several clients in the same send goes to the laser once. Set commands drop the cached
+# replies they invalidate, as in the driver. Clients connect with proxyLaser, a drop-in insightLaser
+# that opens the socket instead of a telnet session to the laser. Since other clients change the
+# settings behind its back, proxyLaser keeps no state cache of its own: the proxy's reply cache is the
+# one authority, and calibration states are asked from the laser.
+#
+#   python insightLaser_proxy.py --host insight-laser --path /tmp/insight-laser.sock
+#
+#   laser = proxyLaser('/tmp/insight-laser.sock')
+#   laser.connect()
+# =========================================================================================================
+
+import argparse
+import asyncio
+import collections
+import logging
+import os
+import socket
+import telnetlib
+import time
+
+from insightLaser_async import asyncInsightLaser
+from insightLaser_instr import CALIBRATIONS, COMMANDS, PROMPT, calibrationPassed, headerMatches, \
+    insightLaser, laserTimeout
+from insightLaser_server import lineServer, readLines
+
+
+DEFAULT_PATH = '/tmp/insight-laser.sock'
+
+# set command or cached query header -> command table entry, as the drivers send them
+_SPECS = {spec.header: spec for spec in COMMANDS.values()}
+
+_BANNER = 'Insight laser proxy for '
+
+
+class laserProxy(lineServer):
+    '''
+    host, port: the laser
+    path: Unix socket the clients connect to
+    window: most commands written to the laser in one send
+    maxAge: seconds a cached reply is served for, None for as long as no
+            set command drops it
+    The clients share one laser: its error queue and status byte, and a
+    calibration holds up every client until it is done.
+    runInThread() serves from a background thread and returns the path.
+    '''
+
+    threadName = 'laserProxy'
+
+    def __init__(self, host='insight-laser', port=23, path=DEFAULT_PATH, window=64, maxAge=None,
+                 trace=False):
+        self.path = path
+        self.window = window
+        self.maxAge = maxAge
+        self.laser = asyncInsightLaser(host, port, trace)
+        self.counts = collections.Counter()     # 'commands', 'sent', 'cached', 'coalesced', 'exchanges'
+
+        self._log = logging.getLogger()
+        self._replies = {}          # cached query header without '?': (reply bytes, time)
+        self._queue = None          # (command line, reply future) from every client
+        self._server = None
+        self._dispatcher = None
+        self._clients = set()       # connection handler tasks
+
+    def clearCache(self):
+        '''
+        Drop every cached reply, the next query of each goes to the laser.
+        '''
+        self._replies.clear()
+
+##############################################################################
+# Server
+
+    async def start(self):
+        await self.laser.connect()
+        if os.path.exists(self.path):
+            os.remove(self.path)            # left over from a proxy that did not stop cleanly
+        self._queue = asyncio.Queue()
+        self._server = await asyncio.start_unix_server(self._serve, self.path)
+        self._dispatcher = asyncio.create_task(self._dispatch())
+        self._log.info('%s: serving on %s' % (self.laser.host, self.path))
+        return self.path
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            for task in list(self._clients) + [self._dispatcher]:
+                task.cancel()
+            await asyncio.gather(self._dispatcher, *self._clients, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+            if os.path.exists(self.path):
+                os.remove(self.path)
+        await self.laser.close()
+
+    async def _serve(self, reader, writer):
+        '''
+        One client: queue its command lines as they arrive, and write the
+        replies back in the order of the commands.
+        '''
+        task = asyncio.current_task()
+        self._clients.add(task)
+        loop = asyncio.get_running_loop()
+        writer.write((_BANNER + self.laser.host + '\r\n').encode('ascii') + PROMPT)
+        replies = asyncio.Queue()
+        sender = asyncio.create_task(self._reply(replies, writer))
+        try:
+            async for lines in readLines(reader):
+                for line in lines:
+                    reply = loop.create_future()
+                    replies.put_nowait(reply)
+                    self._queue.put_nowait((line, reply))
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            sender.cancel()
+            self._clients.discard(task)
+            writer.close()
+
+    async def _reply(self, replies, writer):
+        while True:
+            reply = await replies.get()
+            try:
+                # shielded: a client that hangs up does not take back what it sent
+                data = await asyncio.shield(reply)
+            except Exception:
+                # the laser timed out or dropped: so does the client, its
+                # driver reconnects (or recovers) like with the laser itself
+                writer.close()
+                return
+            try:
+                writer.write(data + PROMPT)
+                if replies.empty():
+                    await writer.drain()
+            except ConnectionError:
+                return
+
+##############################################################################
+# Dispatch: one exchange with the laser at a time, each holding whatever the
+# clients queued while the previous one ran.
+
+    async def _dispatch(self):
+        while True:
+            group = [await self._queue.get()]
+            while len(group) < self.window and not self._queue.empty():
+                group.append(self._queue.get_nowait())
+            await self._exchange(self._plan(group))
+
+    def _plan(self, group):
+        '''
+        Answer what the reply cache can, merge repeated settings queries
+        and return the commands to send as [(command line, [reply futures])].
+        Only the cached queries of the command table are merged, and only
+        until the next command that is not a query: the error queue, the
+        status byte, calibration results or the DIV can change with any
+        command. Set commands drop the cached replies they invalidate as
+        they are planned, so a query behind a set goes to the laser.
+        '''
+        wire = []
+        queries = {}                # settings query -> its entry in <wire>, since the last set
+        now = time.monotonic()
+        for line, reply in group:
+            self.counts['commands'] += 1
+            header = line.split(None, 1)[0]
+            if not header.endswith('?'):
+                self._forget(_invalidated(header))
+                queries.clear()
+                wire.append((line, [reply]))
+                continue
+            if not _cacheable(line):
+                wire.append((line, [reply]))
+                continue
+            cached = self._replies.get(header[:-1])
+            if cached is not None and (self.maxAge is None or now - cached[1] <= self.maxAge):
+                reply.set_result(cached[0])
+                self.counts['cached'] += 1
+            elif line in queries:
+                queries[line][1].append(reply)
+                self.counts['coalesced'] += 1
+            else:
+                queries[line] = (line, [reply])
+                wire.append(queries[line])
+        return wire
+
+    async def _exchange(self, wire):
+        if not wire:
+            return
+        cmds = [line for line, _ in wire]
+        try:
+            proto = self.laser._proto
+            if proto is None or proto._lost is not None:
+                self._log.warning('%s: connection lost, reconnecting' % self.laser.host)
+                self._replies.clear()
+                await self.laser.connect()
+            replies = await self.laser.exchange(cmds)
+        except (laserTimeout, OSError) as exc:
+            self._replies.clear()
+            for _, futures in wire:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(exc)
+            return
+        self.counts['exchanges'] += 1
+        self.counts['sent'] += len(cmds)
+        now = time.monotonic()
+        for (line, futures), reply in zip(wire, replies):
+            data = reply.encode()
+            header = line.split(None, 1)[0]
+            if not header.endswith('?'):
+                self._forget(_invalidated(header))
+            elif _cacheable(line):
+                self._replies[header[:-1]] = (data, now)
+            for future in futures:
+                if not future.done():
+                    future.set_result(data)
+
+    def _forget(self, patterns):
+        for key in [k for k in self._replies if headerMatches(k, patterns)]:
+            del self._replies[key]
+
+
+def _cacheable(line):
+    '''
+    True for a settings query the drivers keep in their state cache, sent
+    as they send it.
+    '''
+    spec = _SPECS.get(line)
+    return spec is not None and spec.query and spec.cached
+
+
+def _invalidated(header):
+    '''
+    Cached headers a set command drops: its own and its table entry's
+    <invalidates>; everything for a command not in the table.
+    '''
+    spec = _SPECS.get(header)
+    if spec is None:
+        return ('*',)
+    return tuple(spec.invalidates) + (header,)
+
+
+class proxyLaser(insightLaser):
+    '''
+    insightLaser connected to a laserProxy instead of the laser. host is
+    taken from the proxy's banner, so per-laser caches (axisCache,
+    AlignmentCache, ...) key on the laser behind the proxy.
+    Other clients change the laser's settings without this driver seeing
+    it, so nothing is answered from its own state cache: queries go to the
+    proxy, which answers cached settings from its reply cache, the
+    calibration states (LaserConfig.needsCalibration) are asked from the
+    laser, and host-side records (the uploaded sequence table or profile)
+    are never known, so they are uploaded again.
+    '''
+
+    def __init__(self, path=DEFAULT_PATH, trace=False):
+        super().__init__(path, trace)
+        self.path = path
+
+    def _query(self, header, parser, refresh=False):
+        return super()._query(header, parser, refresh=True)
+
+    def getCached(self, header, default=None):
+        if self._batch is not None:
+            return default          # nothing can be read before the batch is sent
+        spec = _SPECS.get(header + '?')
+        if spec is not None and spec.cached:
+            return self._query(header, spec.parser)
+        if header in CALIBRATIONS:
+            return calibrationPassed(getattr(self, CALIBRATIONS[header][0])())
+        return default
+
+    def _open(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.connectTimeout)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            raise
+        self.tn = telnetlib.Telnet()
+        self.tn.sock = sock
+        banner = self.tn.read_until(PROMPT, self.connectTimeout)
+        text = banner[:-len(PROMPT)].decode('ascii', 'replace').strip()
+        if banner.endswith(PROMPT) and text.startswith(_BANNER):
+            self.host = text[len(_BANNER):]
+        return banner
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Insight laser proxy')
+    parser.add_argument('--host', default='insight-laser', help='the laser')
+    parser.add_argument('--port', type=int, default=23)
+    parser.add_argument('--path', default=DEFAULT_PATH, help='Unix socket the clients connect to')
+    parser.add_argument('--window', type=int, default=64, help='most commands per send to the laser')
+    parser.add_argument('--max-age', type=float, default=None, help='seconds a cached reply is served for')
+    opts = parser.parse_args()
+    logging.basicConfig(format='%(asctime)s: %(message)s', level=logging.INFO)
+
+    async def main():
+        proxy = laserProxy(opts.host, opts.port, opts.path, opts.window, opts.max_age)
+        await proxy.start()
+        try:
+            await proxy._server.serve_forever()
+        finally:
+            await proxy.stop()
+
+    asyncio.run(main())
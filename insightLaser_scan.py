@@ -0,0 +1,201 @@
+# =========================================================================================================
+# Parameter scans for the Insight sweep laser
+# Runs a grid of settings (e.g. fixed wavelength x power x delay) point by point. The points are
+# reordered so the settings that force a calibration change as rarely as possible: with power outermost
+# :CALibrate:FIXed runs once per power level, and the other axes are walked back and forth so each
+# step is a small one. Every point is one batch (changed settings and :INITiate) unless it needs a
+# calibration. Finished points are written to a checkpoint file so an interrupted scan resumes where it
+# stopped; a dropped connection is recovered (insightLaser.recover()) and the point retried once.
+#
+#   scan = scanExecutor(laser, FixedConfig(clockrate=10), measure=readPowerMeter, checkpoint='scan.json')
+#   for point, result in scan.run(scanGrid(wavelength=numpy.arange(1530, 1565, 0.5),
+#                                          power=[0, 1, 2], delay=[0, 10])):
+#       ...
+# =========================================================================================================
+
+import dataclasses
+import itertools
+import json
+import logging
+import os
+
+from insightLaser_config import FixedConfig
+from insightLaser_instr import COMMANDS, CONNECTION_ERRORS, headerMatches
+from insightLaser_store import recordStore
+
+
+# the :INITiate command of each mode
+_INITIATE = {'cmd_CAL_FIX': 'cmd_INIT_FIX', 'cmd_CAL_SWE': 'cmd_INIT_SWE', 'cmd_CAL_SEQ': 'cmd_INIT_SEQ'}
+
+
+def scanGrid(**axes):
+    '''
+    Every combination of the given config fields, as dicts, e.g.
+    scanGrid(wavelength=[1540, 1550], power=[0, 1]).
+    '''
+    names = list(axes)
+    values = [[_plain(v) for v in axes[name]] for name in names]
+    return [dict(zip(names, combination)) for combination in itertools.product(*values)]
+
+
+def _plain(value):
+    # numpy scalars to Python numbers, so points compare, sort and go to JSON
+    return value.item() if hasattr(value, 'item') else value
+
+
+def calibrationFields(base, point):
+    '''
+    The fields of <point> whose setting drops the calibration of the mode
+    of <base> (a LaserConfig).
+    '''
+    calibration = COMMANDS[base.calibrateCommand].header
+    blank = type(base)()
+    relevant = []
+    for field, value in point.items():
+        settings = dataclasses.replace(blank, **{field: value}).settings()
+        if any(headerMatches(calibration, COMMANDS[name].invalidates) for name, _ in settings):
+            relevant.append(field)
+    return relevant
+
+
+def orderScan(points, base=FixedConfig(), fields=None):
+    '''
+    Reorder scan points: fields that force a calibration outermost, then
+    the others in the order given (<fields>, or the order of the point
+    dicts). Each inner field is walked up and down alternately
+    (boustrophedon), so consecutive points differ by one step.
+    '''
+    if not points:
+        return []
+    fields = list(fields or points[0])
+    costly = [f for f in calibrationFields(base, points[0]) if f in fields]
+    fields = costly + [f for f in fields if f not in costly]
+
+    def walk(group, level, reverse):
+        if level == len(fields):
+            return group
+        field = fields[level]
+        values = sorted({p[field] for p in group}, reverse=reverse)
+        ordered = []
+        for i, value in enumerate(values):
+            ordered += walk([p for p in group if p[field] == value], level + 1, i % 2 == 1)
+        return ordered
+
+    return walk(list(points), 0, False)
+
+
+def pointKey(point):
+    return json.dumps(point, sort_keys=True)
+
+
+class scanCheckpoint(recordStore):
+    '''
+    Keys (pointKey()) of the finished points of a scan, optionally kept in
+    a JSON file: {'done': [key]}. Saved after every point.
+    '''
+
+    def __init__(self, path=None):
+        super().__init__(path)
+        self._done = set(self._records.get('done', ()))
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._done
+
+    def add(self, key):
+        with self._lock:
+            self._done.add(key)
+            self._records['done'] = sorted(self._done)
+            self.save()
+
+    def clear(self):
+        with self._lock:
+            self._done.clear()
+            self._records.clear()
+            if self.path is not None and os.path.exists(self.path):
+                os.remove(self.path)
+
+
+class scanExecutor:
+    '''
+    laser: connected insightLaser
+    base: LaserConfig holding the settings shared by all points; each
+          point's fields replace those of <base>
+    measure: measure(laser, point) called once the laser runs at the point,
+             its return value is yielded with the point
+    checkpoint: JSON file of the finished points; a scan started again with
+             the same file skips them
+    calibrations: insightLaser_calibration.CalibrationCache, optional
+    initiate: send the mode's :INITiate at every point
+    '''
+
+    def __init__(self, laser, base=FixedConfig(), measure=None, checkpoint=None, calibrations=None,
+                 initiate=True):
+        self.laser = laser
+        self.base = base
+        self.measure = measure
+        self.checkpoint = checkpoint
+        self.calibrations = calibrations
+        self.initiate = initiate
+        self.calibrationCount = 0
+        self._log = logging.getLogger()
+        self._done = scanCheckpoint(checkpoint)
+
+    def remaining(self, points):
+        return [p for p in points if pointKey(p) not in self._done]
+
+    def run(self, points, order=True):
+        '''
+        Run the scan, reordered with orderScan() unless <order> is False.
+        Points finished in an earlier run with the same checkpoint are
+        skipped. The laser is aborted (no light) when the scan ends.
+        yield: (point, measure result) per point
+        '''
+        points = self.remaining(points)
+        if order:
+            points = orderScan(points, self.base)
+        try:
+            for point in points:
+                try:
+                    result = self._point(point)
+                except CONNECTION_ERRORS:
+                    self._log.warning('%s: connection lost, reconnecting' % self.laser.host)
+                    self.laser.recover()
+                    result = self._point(point)
+                self._done.add(pointKey(point))
+                yield point, result
+        finally:
+            if self.laser.tn is not None:
+                self.laser.cmd_ABOR()
+
+    def _point(self, point):
+        laser = self.laser
+        config = dataclasses.replace(self.base, **point)
+        changes = config.changes(laser)
+        calibration = COMMANDS[config.calibrateCommand].header
+        calibrate = config.needsCalibration(laser) or \
+            any(headerMatches(calibration, COMMANDS[name].invalidates) for name, _ in changes)
+        initiate = getattr(laser, _INITIATE[config.calibrateCommand])
+        with laser.batch():
+            for name, args in changes:
+                getattr(laser, name)(*args)
+            if self.initiate and not calibrate:
+                initiate()
+        config._applied(laser)
+        if calibrate:
+            # the laser stops emitting to calibrate
+            laser.cmd_ABOR()
+            if self.calibrations is not None:
+                self.calibrations.calibrate(laser, config)
+            else:
+                getattr(laser, config.calibrateCommand)()
+            self.calibrationCount += 1
+            if self.initiate:
+                initiate()
+        return self.measure(laser, point) if self.measure is not None else None
+
+    def reset(self):
+        '''
+        Forget the finished points, the next run() starts from scratch.
+        '''
+        self._done.clear()
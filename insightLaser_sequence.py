@@ -0,0 +1,124 @@
+# =========================================================================================================
+# Sequence table builder for the Insight sweep laser
+# Turns arrays of wavelengths (or frequencies) and dwell times into the fewest table commands:
+# runs with a constant step and dwell time become one ADD:WSTep/ADD:FSTep, the remaining entries
+# are ADD:WAVelength commands, and a table that barely compresses can be written to a file and
+# imported with :CONFigure:SEQuence:LOAD. The result is an insightLaser_config.SequenceConfig, so
+# it is sent in one batch and only when it differs from the table already on the laser.
+# =========================================================================================================
+
+import numpy
+
+from insightLaser_config import SequenceConfig
+
+
+C_NM_THZ = 299792.458       # speed of light, nm*THz
+
+_DECIMALS = 9               # values are rounded to this many decimals before sending
+
+
+def checkSequence(values, lengths, limits=None):
+    '''
+    Validate a sequence table given as arrays.
+    values: wavelengths (nm) or frequencies (THz), 1-D
+    lengths: dwell time per entry (ns), same length as values or a scalar
+    limits: optional (lo, hi) range for values
+    return: (values, lengths) as float arrays
+    '''
+    values = numpy.asarray(values, dtype=float)
+    if values.ndim != 1 or values.size == 0:
+        raise ValueError('values must be a non-empty 1-D array')
+    lengths = numpy.broadcast_to(numpy.asarray(lengths, dtype=float), values.shape)
+    bad = ~numpy.isfinite(values) | (values <= 0)
+    if limits is not None:
+        bad |= (values < limits[0]) | (values > limits[1])
+    if bad.any():
+        i = numpy.flatnonzero(bad)[0]
+        raise ValueError('entry %d: %r is not a valid wavelength/frequency' % (i, float(values[i])))
+    bad = ~numpy.isfinite(lengths) | (lengths <= 0)
+    if bad.any():
+        i = numpy.flatnonzero(bad)[0]
+        raise ValueError('entry %d: %r is not a valid dwell time' % (i, float(lengths[i])))
+    return values, lengths
+
+
+def _value(x):
+    return float(numpy.round(x, _DECIMALS))
+
+
+def compressSequence(values, lengths, frequency=False, minRun=3, rtol=1e-6, limits=None):
+    '''
+    Sequence entries (see SequenceConfig) for a table given as arrays.
+    Increasing runs of at least <minRun> entries with a constant step
+    (within <rtol>) and dwell time become one WST/FST entry, the others
+    become WAV entries. There is no ADD command for a single frequency, so
+    with <frequency> those are converted to wavelengths.
+    return: list of entries, in table order
+    '''
+    values, lengths = checkSequence(values, lengths, limits)
+    n = values.size
+    steps = numpy.diff(values)
+    # step k (values[k] -> values[k+1]) can be part of a run
+    ok = (steps > 0) & (lengths[1:] == lengths[:-1])
+    # step k continues the run of step k-1
+    same = numpy.zeros(steps.size, dtype=bool)
+    same[1:] = ok[1:] & ok[:-1] & numpy.isclose(steps[1:], steps[:-1], rtol=rtol, atol=0)
+    breaks = numpy.flatnonzero(~same)
+    kind = 'FST' if frequency else 'WST'
+
+    entries = []
+    i = 0
+    while i < n:
+        if i < steps.size and ok[i]:
+            # first step after i that does not continue the run
+            b = numpy.searchsorted(breaks, i, side='right')
+            end = breaks[b] if b < breaks.size else steps.size
+            count = end - i + 1
+            if count >= minRun:
+                last = i + count - 1
+                step = (values[last] - values[i]) / (count - 1)
+                entries.append((kind, _value(step), _value(lengths[i]),
+                                _value(values[i]), _value(values[last])))
+                i = last + 1
+                continue
+        value = C_NM_THZ / values[i] if frequency else values[i]
+        entries.append(('WAV', _value(value), _value(lengths[i])))
+        i += 1
+    return entries
+
+
+def writeSequenceFile(path, values, lengths):
+    '''
+    Write a sequence table as 'value,length' lines for
+    :CONFigure:SEQuence:LOAD.
+    '''
+    values, lengths = checkSequence(values, lengths)
+    numpy.savetxt(path, numpy.column_stack([values, lengths]), delimiter=',', fmt='%.9g')
+
+
+def sequenceConfig(values, lengths, frequency=False, power=None, interpolation=None,
+                   loadFile=None, maxCommands=256, **kwargs):
+    '''
+    SequenceConfig for a table given as arrays.
+    If the compressed table still needs more than <maxCommands> ADD commands
+    and <loadFile> = (local path, name on the laser) is given, the table is
+    written to the local path (a share the laser can read) and imported with
+    one :CONFigure:SEQuence:LOAD instead.
+    Other keyword arguments go to compressSequence().
+    '''
+    entries = compressSequence(values, lengths, frequency, **kwargs)
+    if loadFile is not None and len(entries) > maxCommands:
+        localPath, name = loadFile
+        writeSequenceFile(localPath, values, lengths)
+        entries = [('LOAD', name)]
+    return SequenceConfig(entries=entries, power=power, interpolation=interpolation)
+
+
+def uploadSequence(laser, values, lengths, frequency=False, **kwargs):
+    '''
+    Program the sequence table of <laser> from arrays, in one batch.
+    Nothing is sent if the laser already holds this table.
+    return: list of the (command name, args) that were sent
+    '''
+    config = sequenceConfig(values, lengths, frequency, **kwargs)
+    return config.apply(laser, calibrate=False)
@@ -0,0 +1,81 @@
+# =========================================================================================================
+# Common parts of the asyncio servers speaking the laser's protocol (insightLaser_sim, insightLaser_proxy)
+# lineServer runs a server's start()/stop() coroutines on a background thread with its own event loop,
+# so the sync driver can talk to it from the same process; readLines() splits what a client sends into
+# command lines.
+# =========================================================================================================
+
+import asyncio
+import threading
+
+
+async def readLines(reader):
+    '''
+    Command lines of one client, as the laser takes them: '\\n' ends a
+    line, '\\r' and spaces around it are dropped, empty lines skipped.
+    yield: the lines of each chunk read from the socket, as a list
+    '''
+    buf = bytearray()
+    while True:
+        data = await reader.read(1 << 16)
+        if not data:
+            return
+        buf += data
+        lines = []
+        while True:
+            i = buf.find(b'\n')
+            if i < 0:
+                break
+            line = bytes(buf[:i]).strip(b'\r ').decode('ascii', 'replace')
+            del buf[:i+1]
+            if line:
+                lines.append(line)
+        yield lines
+
+
+class lineServer:
+    '''
+    Base of a server with async start(*args) and stop(). Subclasses set
+    threadName.
+    '''
+
+    threadName = 'lineServer'
+    _loop = None
+    _thread = None
+
+    def runInThread(self, *args):
+        '''
+        Serve from a background thread with its own event loop, for the
+        sync driver.
+        return: what start(*args) returns
+        '''
+        self._loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        result = []
+        failed = []
+        def run():
+            asyncio.set_event_loop(self._loop)
+            try:
+                result.append(self._loop.run_until_complete(self.start(*args)))
+            except Exception as exc:
+                failed.append(exc)
+                return
+            finally:
+                ready.set()
+            self._loop.run_forever()
+        self._thread = threading.Thread(target=run, name=self.threadName, daemon=True)
+        self._thread.start()
+        ready.wait()
+        if failed:
+            self._thread.join()
+            self._thread = None
+            raise failed[0]
+        return result[0]
+
+    def stopThread(self):
+        if self._thread is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.stop(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._thread = None
@@ -0,0 +1,375 @@
+# =========================================================================================================
+# Session recording and replay for the Insight sweep laser
+# A sessionRecorder set as insightLaser.recorder writes every exchange to a compact binary trace: the
+# command, the raw reply, when the command was sent and the reply came, and the phase of the workflow
+# it belongs to. replayLaser is an insightLaser whose transport serves the recorded replies back, with
+# the original timing or compressed by a factor, so a workflow built on insightLaser_instr can be
+# profiled, optimized and its incidents reproduced without the laser.
+#
+#   with recordSession(laser, 'run.trace') as session:
+#       with session.phase('configure'):
+#           config.apply(laser)
+#
+#   laser = replayLaser('run.trace', speed=10)
+#   laser.connect()
+#   config.apply(laser)                 # same replies, a tenth of the time
+#
+#   python insightLaser_session.py run.trace        # latencies per phase
+# =========================================================================================================
+
+import argparse
+import bisect
+import collections
+import contextlib
+import struct
+import time
+
+import insightLaser_metrics
+from insightLaser_instr import PROMPT, insightLaser
+
+
+_MAGIC = b'ILS1'
+_HEADER = struct.Struct('<4sdH')        # magic, start (epoch seconds), host length; then the host
+_RECORD = struct.Struct('<BHddII')      # flags, phase, sent, replied, command length, reply length;
+                                        # then the command and the reply
+
+# record flags
+PHASE = 1           # names phase number <phase>: the command field holds the name, nothing was sent
+CONNECT = 2         # the connection was opened: sent to replied is the wait for the banner
+NO_REPLY = 4        # the connection was closed before the reply came
+
+
+class replayMismatch(Exception):
+    '''
+    The replayed workflow sent a command the recording cannot answer.
+    '''
+
+
+class sessionEntry(collections.namedtuple('sessionEntry', 'phase command reply sent replied flags')):
+    '''
+    One recorded exchange. Times are seconds from the start of the
+    recording; reply is the raw reply without the prompt, None if it never
+    came.
+    '''
+
+    @property
+    def latency(self):
+        return self.replied - self.sent
+
+    @property
+    def connect(self):
+        return bool(self.flags & CONNECT)
+
+
+class sessionRecorder:
+    '''
+    Writes the exchanges of one driver to <path>. The driver reports what
+    it sends and receives (insightLaser.recorder); replies are matched to
+    the commands in order, as on the wire.
+    '''
+
+    def __init__(self, path, host=''):
+        self.path = path
+        self._origin = time.perf_counter()
+        self._pending = collections.deque()     # (command, send time, phase) awaiting a reply
+        self._phases = {'': 0}
+        self._phase = 0
+        host = host.encode('utf-8')
+        self._file = open(path, 'wb')
+        self._file.write(_HEADER.pack(_MAGIC, time.time(), len(host)) + host)
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        '''
+        Tag the exchanges inside the block with the phase <name>.
+        '''
+        number = self._phases.get(name)
+        if number is None:
+            number = self._phases[name] = len(self._phases)
+            self._write(PHASE, number, 0.0, 0.0, name.encode('utf-8'), b'')
+        outer, self._phase = self._phase, number
+        try:
+            yield
+        finally:
+            self._phase = outer
+
+    def sent(self, cmds):
+        now = time.perf_counter() - self._origin
+        self._pending.extend((cmd, now, self._phase) for cmd in cmds)
+
+    def received(self, reply):
+        '''
+        The reply to the oldest command sent, raw bytes without the prompt.
+        '''
+        if not self._pending:
+            return
+        cmd, sent, phase = self._pending.popleft()
+        self._write(0, phase, sent, time.perf_counter() - self._origin, cmd.encode('ascii'), reply)
+
+    def lost(self):
+        '''
+        The connection closed: the commands still awaiting a reply get none.
+        '''
+        now = time.perf_counter() - self._origin
+        while self._pending:
+            cmd, sent, phase = self._pending.popleft()
+            self._write(NO_REPLY, phase, sent, now, cmd.encode('ascii'), b'')
+
+    def connected(self, started, banner):
+        '''
+        started: time.perf_counter() when the connection was opened
+        '''
+        if banner.endswith(PROMPT):
+            banner = banner[:-len(PROMPT)]
+        self._write(CONNECT, self._phase, started - self._origin, time.perf_counter() - self._origin,
+                    b'', banner)
+
+    def _write(self, flags, phase, sent, replied, cmd, reply):
+        self._file.write(_RECORD.pack(flags, phase, sent, replied, len(cmd), len(reply)))
+        self._file.write(cmd)
+        self._file.write(reply)
+
+    def close(self):
+        self.lost()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+@contextlib.contextmanager
+def recordSession(laser, path):
+    '''
+    Record the exchanges of <laser> inside the block to <path>.
+    yield: the sessionRecorder, for phase()
+    '''
+    recorder = sessionRecorder(path, laser.host)
+    laser.recorder = recorder
+    try:
+        yield recorder
+    finally:
+        laser.recorder = None
+        recorder.close()
+
+
+def readSession(path):
+    '''
+    return: (host, start in epoch seconds, [sessionEntry]), phase records
+            resolved to the phase names
+    '''
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, start, size = _HEADER.unpack_from(data)
+    if magic != _MAGIC:
+        raise ValueError('%s is not a session recording' % path)
+    offset = _HEADER.size
+    host = data[offset:offset+size].decode('utf-8')
+    offset += size
+    phases = {0: ''}
+    entries = []
+    view = memoryview(data)
+    while offset < len(data):
+        flags, phase, sent, replied, cmdSize, replySize = _RECORD.unpack_from(data, offset)
+        offset += _RECORD.size
+        cmd = bytes(view[offset:offset+cmdSize]).decode('ascii', 'replace')
+        offset += cmdSize
+        reply = bytes(view[offset:offset+replySize])
+        offset += replySize
+        if flags & PHASE:
+            phases[phase] = cmd
+            continue
+        entries.append(sessionEntry(phases.get(phase, str(phase)), cmd,
+                                    None if flags & NO_REPLY else reply, sent, replied, flags))
+    return host, start, entries
+
+
+def sessionMetrics(entries):
+    '''
+    Latency metrics of a recording.
+    return: {phase: insightLaser_metrics.commandMetrics}
+    '''
+    metrics = {}
+    for entry in entries:
+        if entry.connect:
+            continue
+        phase = metrics.get(entry.phase)
+        if phase is None:
+            phase = metrics[entry.phase] = insightLaser_metrics.commandMetrics()
+        phase.record(entry.command.split(None, 1)[0], entry.latency, len(entry.command) + 2,
+                     len(entry.reply or b'') + len(PROMPT), entry.reply is None)
+    return metrics
+
+
+class replayTransport:
+    '''
+    Stands in for the telnet connection of an insightLaser and answers the
+    commands written to it from a recording. The laser is modelled as
+    working through the commands one at a time: each reply comes after the
+    later of its command's arrival and the previous reply, plus the time
+    the laser took for it when recorded. Times are divided by <speed>
+    (None: no waiting at all), except against the driver's timeouts, which
+    see the recorded times, so a replay times out where the recording did.
+    entries: [sessionEntry] from readSession()
+    strict: every command must be the next one recorded; otherwise each is
+            answered by the next recorded exchange of the same command,
+            wrapping around, e.g. to replay a reworked workflow
+    '''
+
+    def __init__(self, entries, speed=1.0, strict=True):
+        self.entries = [e for e in entries if not e.connect]
+        self.connects = [e for e in entries if e.connect]
+        self.speed = speed
+        self.strict = strict
+        self.eof = False
+        self._service = _serviceTimes(self.entries)
+        self._byCommand = collections.defaultdict(list)
+        for i, entry in enumerate(self.entries):
+            self._byCommand[entry.command].append(i)
+        self._position = 0
+        self._connects = 0
+        self._due = collections.deque()     # (due, reply or None)
+        self._last = 0.0
+        self._origin = time.perf_counter()
+        self._virtual = 0.0
+
+    def _now(self):
+        # recorded-time clock
+        if self.speed is None:
+            return self._virtual
+        return (time.perf_counter() - self._origin) * self.speed
+
+    def _sleep(self, seconds):
+        if seconds <= 0:
+            return
+        if self.speed is None:
+            self._virtual += seconds
+        else:
+            time.sleep(seconds / self.speed)
+
+    def open(self):
+        '''
+        A new connection: replies still owed on the old one are gone, and
+        the recorded wait for the banner is replayed.
+        return: the recorded banner
+        '''
+        self._due.clear()
+        self.eof = False
+        banner = b''
+        if self._connects < len(self.connects):
+            entry = self.connects[self._connects]
+            self._sleep(entry.latency)
+            self._connects += 1
+            banner = entry.reply or b''
+        self._last = self._now()
+        return banner + PROMPT
+
+    def _match(self, cmd):
+        if self.strict:
+            if self._position >= len(self.entries):
+                raise replayMismatch('%r sent after the end of the recording' % cmd)
+            entry = self.entries[self._position]
+            if entry.command != cmd:
+                raise replayMismatch('exchange %d: %r sent, %r recorded' % (self._position, cmd, entry.command))
+            index = self._position
+        else:
+            indices = self._byCommand.get(cmd)
+            if not indices:
+                raise replayMismatch('%r is not in the recording' % cmd)
+            i = bisect.bisect_left(indices, self._position)
+            index = indices[i] if i < len(indices) else indices[0]
+        self._position = index + 1
+        return index
+
+    def write(self, data):
+        arrival = self._now()
+        for line in data.decode('ascii').split('\n'):
+            cmd = line.strip('\r ')
+            if not cmd:
+                continue
+            index = self._match(cmd)
+            entry = self.entries[index]
+            if entry.reply is None:
+                self._due.append((float('inf'), None))
+                continue
+            self._last = max(arrival, self._last) + self._service[index]
+            self._due.append((self._last, entry.reply))
+
+    def read_until(self, match, timeout=None):
+        if not self._due:
+            self._sleep(timeout or 0.0)
+            return b''
+        due, reply = self._due[0]
+        wait = due - self._now()
+        if timeout is not None and wait > timeout:
+            self._sleep(timeout)
+            return b''
+        self._sleep(wait)
+        self._due.popleft()
+        return reply + PROMPT
+
+    def close(self):
+        self._due.clear()
+
+
+def _serviceTimes(entries):
+    '''
+    Time the laser spent on each recorded command: from the later of its
+    arrival and the previous reply to its own reply.
+    '''
+    service = []
+    previous = float('-inf')
+    for entry in entries:
+        if entry.reply is None:
+            service.append(0.0)
+            continue
+        service.append(max(entry.replied - max(entry.sent, previous), 0.0))
+        previous = entry.replied
+    return service
+
+
+class replayLaser(insightLaser):
+    '''
+    insightLaser answered from a recording (readSession() path or
+    entries) instead of a laser; see replayTransport for <speed> and
+    <strict>. host is the recorded one.
+    '''
+
+    def __init__(self, recording, speed=1.0, strict=True, trace=False):
+        if isinstance(recording, str):
+            host, _, entries = readSession(recording)
+        else:
+            host, entries = '', list(recording)
+        super().__init__(host, trace)
+        self.transport = replayTransport(entries, speed, strict)
+
+    def _open(self):
+        self.tn = self.transport
+        return self.transport.open()
+
+    def _stream(self, cmd, stream, chunk=1 << 16):
+        # no socket to read from: the recorded reply is fed in one piece
+        with self._lock:
+            self.sendCommand(cmd)
+            reply = self._readReply([cmd], 0)
+        stream.feed(reply.encode())
+        value = stream.close()
+        self._trace(cmd, '%d values' % len(value))
+        return value
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Latencies of a recorded laser session, per phase')
+    parser.add_argument('path')
+    opts = parser.parse_args()
+
+    host, start, entries = readSession(opts.path)
+    print('%s, %s, %d exchanges' % (host, time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(start)),
+                                    len(entries)))
+    for phase, metrics in sessionMetrics(entries).items():
+        total = metrics.total().latency
+        print('%-12s %6d commands  p50 %8.3f ms  p99 %8.3f ms  max %8.3f ms'
+              % (phase or '-', total.count, total.quantile(0.5) * 1e3, total.quantile(0.99) * 1e3,
+                 total.max * 1e3))
@@ -0,0 +1,426 @@
+# =========================================================================================================
+# Simulator of the Insight sweep laser
+# A TCP server that speaks the laser's telnet protocol: every command line gets one reply followed by
+# the 'atlas ready>' prompt. It knows the command set of insightLaser_instr.COMMANDS (long and short
+# SCPI forms), keeps the settings, the sequence table, the error queue and the calibration state,
+# and can be given per-command latencies, calibration durations and injected faults, so the drivers
+# can be benchmarked and tested without a laser.
+#
+#   sim = laserSimulator(latency=0.001)
+#   host, port = sim.runInThread()
+#   laser = insightLaser_instr.insightLaser(host)
+#   laser.port = port
+#   laser.connect()
+# =========================================================================================================
+
+import argparse
+import asyncio
+import collections
+
+import numpy
+
+import insightLaser_instr
+from insightLaser_instr import COMMANDS, PROMPT, headerMatches
+from insightLaser_instr import statusByte
+from insightLaser_server import lineServer, readLines
+
+
+def _short(node):
+    '''
+    Short form of a SCPI node: its upper-case letters, digits, '*' and '?'.
+    '''
+    return ''.join(c for c in node if c.isupper() or c.isdigit() or c in '*?') or node.upper()
+
+# every long and short node name of the command table -> short form
+_NODES = {}
+for _spec in COMMANDS.values():
+    for _node in _spec.header.rstrip('?').split(':'):
+        _NODES[_node.upper()] = _NODES[_short(_node).upper()] = _short(_node)
+
+def canonical(header):
+    '''
+    Short upper-case form of a SCPI header, e.g.
+    ':CONF:SWE:POW' and ':CONFigure:SWEep:POWer' -> ':CONF:SWE:POW'.
+    '''
+    query = header.endswith('?')
+    nodes = header.rstrip('?').split(':')
+    text = ':'.join(_NODES.get(n.upper(), n.upper()) for n in nodes)
+    return text + '?' if query else text
+
+_SPECS = {canonical(spec.header): spec for spec in COMMANDS.values()}
+
+# settings the laser reports before they are set, by canonical header
+DEFAULTS = {
+    ':CONF:SCL:RAT': '10',
+    ':CONF:SWE:WMIN': '1530',
+    ':CONF:SWE:WMAX': '1565',
+    ':CONF:SWE:FMIN': '191.56',
+    ':CONF:SWE:FMAX': '195.94',
+    ':CONF:SWE:POIN': '1000',
+    ':CONF:SWE:POIN:INCR': '4',
+    ':CONF:SWE:RAT': '100',
+    ':CONF:SWE:STEP': '4.38',
+    ':CONF:SWE:DEL': '0',
+    ':CONF:SWE:DIR': 'INCR',
+    ':CONF:SWE:POW': '1',
+    ':CONF:SWE:PROF': 'FLAT',
+    ':CONF:SWE:TRIG': 'RIS',
+    ':CONF:SEQ:POW': '1',
+    ':CONF:SEQ:INT': 'OFF',
+    ':CONF:FIX:WAV': '1550',
+    ':CONF:FIX:FREQ': '193.41',
+    ':CONF:FIX:POW': '1',
+    ':CONF:FIX:PROF': 'FLAT',
+    ':CONF:FIX:DEL': '0',
+    ':SOUR:CORR:DVD': '0',
+    ':SOUR:CORR:SCD': '0',
+    ':SOUR:CORR:SSD': '0',
+    ':SOUR:SYNC:POW': '0,0,0,1550',
+    ':SYST:CONT': 'SOFT',
+    '*ESE': 'OFF',
+}
+
+# canonical header of each calibration, and the command table entries that drop it
+_CALIBRATIONS = {canonical(h): h for h in (':CALibrate:SWEep', ':CALibrate:FIXed', ':CALibrate:SEQuence')}
+
+ERRORS = {
+    -109: 'Missing parameter',
+    -113: 'Undefined header',
+    -222: 'Data out of range',
+    -256: 'File name not found',
+    -350: 'Queue overflow',
+}
+
+
+def defaultDiv(points, rng):
+    '''
+    Data Invalid Vector for a sweep of <points>: sorted sample clock indices
+    where the wavelength does not step, about one per 16 points.
+    '''
+    total = points + points // 16
+    return numpy.sort(rng.choice(total, total - points, replace=False))
+
+
+class laserSimulator(lineServer):
+    '''
+    latency: seconds spent on every command before replying
+    rtt: network round trip in seconds, added to every reply without
+         holding up the commands behind it (what pipelining saves)
+    latencies: {SCPI header: seconds} overriding <latency>, any form of the header
+    calibrationTime: seconds a :CALibrate:<mode> command takes
+    calibrationBlocks: the reply to :CALibrate:<mode> comes when the
+         calibration is done; otherwise it comes at once and *STB? reports
+         BUSY until then
+    divGenerator: f(points, rng) -> DIV indices, see defaultDiv()
+    maxErrors: size of the error queue
+    seed: seed of the random generator passed to <divGenerator>
+    runInThread(host, port) serves from a background thread and returns
+    (host, port), port 0 picking a free one.
+    '''
+
+    threadName = 'laserSimulator'
+
+    def __init__(self, latency=0.0, latencies=None, rtt=0.0, calibrationTime=0.5, calibrationBlocks=True,
+                 divGenerator=defaultDiv, maxErrors=32, idn='Insight Photonic Solutions,SIMULATOR,0,1.0',
+                 seed=0):
+        self.latency = latency
+        self.rtt = rtt
+        self.latencies = {canonical(h): t for h, t in (latencies or {}).items()}
+        self.calibrationTime = calibrationTime
+        self.calibrationBlocks = calibrationBlocks
+        self.divGenerator = divGenerator
+        self.maxErrors = maxErrors
+        self.idn = idn
+        self.seed = seed
+
+        self.host = None
+        self.port = None
+        self._server = None
+        self._clients = set()       # connection handler tasks
+        self.reset()
+
+    def reset(self):
+        '''
+        Power-on state: default settings, empty sequence table and error
+        queue, nothing calibrated.
+        '''
+        self.settings = dict(DEFAULTS)
+        self.table = []             # [value, dwell time] rows
+        self.files = {}             # sequence tables by file name, for SAVe/LOAD
+        self.errors = collections.deque()
+        self.calibrated = set()
+        self.emitting = False
+        self.busy = False
+        self.faults = []
+        self.commandCount = 0
+
+    def injectFault(self, action, header=None, count=1, seconds=0.0, code=-113):
+        '''
+        Misbehave on the next <count> commands matching <header> (any form,
+        None for every command):
+            'delay'     reply <seconds> late
+            'stall'     never reply
+            'drop'      close the connection instead of replying
+            'garble'    reply with garbage before the prompt
+            'error'     push <code> to the error queue
+        '''
+        self.faults.append({'action': action, 'header': None if header is None else canonical(header),
+                            'count': count, 'seconds': seconds, 'code': code})
+
+    def _fault(self, header):
+        for fault in self.faults:
+            if fault['header'] is None or fault['header'] == header:
+                fault['count'] -= 1
+                if fault['count'] <= 0:
+                    self.faults.remove(fault)
+                return fault
+        return None
+
+    def pushError(self, code):
+        if len(self.errors) >= self.maxErrors:
+            self.errors[-1] = (-350, ERRORS[-350])
+            return
+        self.errors.append((code, ERRORS.get(code, 'Simulated error')))
+
+##############################################################################
+# Server
+
+    async def start(self, host='127.0.0.1', port=0):
+        self._server = await asyncio.start_server(self._serve, host, port)
+        self.host, self.port = self._server.sockets[0].getsockname()[:2]
+        return self.host, self.port
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            for task in list(self._clients):
+                task.cancel()
+            await asyncio.gather(*self._clients, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _serve(self, reader, writer):
+        task = asyncio.current_task()
+        self._clients.add(task)
+        writer.write(b'Insight laser simulator\r\n' + PROMPT)
+        try:
+            async for lines in readLines(reader):
+                for line in lines:
+                    reply = await self._handle(line)
+                    if reply is None:
+                        return
+                    if self.rtt > 0:
+                        asyncio.get_running_loop().call_later(self.rtt, writer.write, reply)
+                    else:
+                        writer.write(reply)
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._clients.discard(task)
+            writer.close()
+
+    async def _handle(self, line):
+        '''
+        Reply bytes for one command line, None to drop the connection.
+        '''
+        header = canonical(line.split(None, 1)[0])
+        self.commandCount += 1
+        delay = self.latencies.get(header, self.latency)
+        fault = self._fault(header)
+        if fault is not None:
+            if fault['action'] == 'delay':
+                delay += fault['seconds']
+            elif fault['action'] == 'stall':
+                await asyncio.Event().wait()
+            elif fault['action'] == 'drop':
+                return None
+            elif fault['action'] == 'error':
+                self.pushError(fault['code'])
+        if delay > 0:
+            await asyncio.sleep(delay)
+        text = await self.execute(line)
+        if fault is not None and fault['action'] == 'garble':
+            text = '#\x07garbled ' + text
+        return (text + '\r\n').encode('ascii') + PROMPT
+
+##############################################################################
+# Command execution
+
+    async def execute(self, line):
+        '''
+        Run one command line against the simulated state.
+        return: reply text, without the prompt
+        '''
+        parts = line.split(None, 1)
+        header = canonical(parts[0])
+        args = [a.strip() for a in parts[1].split(',')] if len(parts) > 1 else []
+        spec = _SPECS.get(header)
+        if spec is None:
+            self.pushError(-113)
+            return ''
+        if spec.query:
+            return self._query(header)
+        try:
+            values = spec.bind(tuple(args), {})
+            spec.format(values)
+        except TypeError:
+            self.pushError(-109)
+            return ''
+        except ValueError:
+            self.pushError(-222)
+            return ''
+        return await self._set(header, spec, args)
+
+    def _query(self, header):
+        key = header[:-1]
+        if key == '*IDN':
+            return self.idn
+        if key == '*STB':
+            status = statusByte.LASER_ON
+            if self.emitting:
+                status |= statusByte.EMITTING
+            if self.busy:
+                status |= statusByte.BUSY
+            return '%d' % status
+        if key in ('*OPC', '*TST'):
+            return '0' if key == '*TST' else ('0' if self.busy else '1')
+        if key == '*ESR':
+            return '%d' % (0x20 if self.errors else 0)
+        if key.startswith(':SYST:ERR'):
+            return self._errorQuery(key)
+        if key in _CALIBRATIONS:
+            return 'PASS' if key in self.calibrated else 'NOT CALIBRATED'
+        if key == ':CONF:SWE:DIV':
+            return ','.join('%d' % i for i in self._div())
+        if key == ':CONF:SWE:POIN:TOT':
+            return '%d' % (self._points() + len(self._div()))
+        if key == ':CONF:SEQ':
+            return '\r\n'.join('%d, %.6f, %g' % (i, v, t) for i, (v, t) in enumerate(self.table))
+        if key.endswith(':TOT'):
+            return self.settings.get(key[:-4], '0')
+        return self.settings.get(key, '0')
+
+    def _errorQuery(self, key):
+        if key.endswith(':ALL'):
+            errors, self.errors = list(self.errors), collections.deque()
+            if not errors:
+                errors = [(0, 'No error')]
+            if ':CODE' in key:
+                return ','.join('%d' % c for c, _ in errors)
+            return ','.join('%d,"%s"' % e for e in errors)
+        code, message = self.errors.popleft() if self.errors else (0, 'No error')
+        if ':CODE' in key:
+            return '%d' % code
+        return '%d,"%s"' % (code, message)
+
+    async def _set(self, header, spec, args):
+        # drop the calibrations this command invalidates, as the driver does
+        for cal, long in _CALIBRATIONS.items():
+            if headerMatches(long, spec.invalidates):
+                self.calibrated.discard(cal)
+        if header == '*CLS':
+            self.errors.clear()
+        elif header == '*RST':
+            self.settings = dict(DEFAULTS)
+            self.calibrated.clear()
+            self.emitting = False
+        elif header in _CALIBRATIONS:
+            self.busy = True
+            if self.calibrationBlocks:
+                await self._calibrate(header)
+            else:
+                asyncio.get_running_loop().create_task(self._calibrate(header))
+        elif header.startswith(':INIT'):
+            self.emitting = True
+        elif header == ':ABOR':
+            self.emitting = False
+        elif header.startswith(':CONF:SEQ'):
+            return self._sequence(header, args)
+        elif header.endswith(('SBP', 'SBR', 'SBST')):
+            self._sweepGeometry(header, args)
+        else:
+            self.settings[header] = ','.join(args)
+        return ''
+
+    async def _calibrate(self, header):
+        try:
+            await asyncio.sleep(self.calibrationTime)
+        finally:
+            self.busy = False
+        self.calibrated.add(header)
+
+    def _sweepGeometry(self, header, args):
+        kind = {'SBP': ':CONF:SWE:POIN', 'SBR': ':CONF:SWE:RAT', 'SBST': ':CONF:SWE:STEP'}
+        node = header.rsplit(':', 1)[1]
+        for key, value in zip((kind[node], ':CONF:SWE:WMIN', ':CONF:SWE:WMAX', ':CONF:SWE:DEL'), args):
+            if value.upper()[:3] not in insightLaser_instr._KEYWORDS:
+                self.settings[key] = value
+        self.settings[header] = ','.join(args)
+        direction = header.split(':')[2] if header.count(':') == 3 else 'INCR'
+        self.settings[':CONF:SWE:DIR'] = direction
+
+    def _sequence(self, header, args):
+        nums = []
+        for a in args:
+            try:
+                nums.append(float(a))
+            except ValueError:
+                nums.append(None)
+        if header == ':CONF:SEQ:CLEA':
+            self.table = []
+        elif header in (':CONF:SEQ:ADD:WST', ':CONF:SEQ:ADD:FST'):
+            step, length, start, stop = nums[:4]
+            values = numpy.arange(start, stop + step/2, step)
+            self._insert([[v, length] for v in values], nums[4] if len(nums) > 4 else -1)
+        elif header == ':CONF:SEQ:ADD:WAV':
+            self._insert([[nums[0], nums[1]]], nums[2] if len(nums) > 2 else -1)
+        elif header == ':CONF:SEQ:REM':
+            if self.table:
+                del self.table[int(nums[0])]
+        elif header == ':CONF:SEQ:SAV':
+            self.files[args[0].strip('\'"')] = list(self.table)
+        elif header == ':CONF:SEQ:LOAD':
+            name = args[0].strip('\'"')
+            if name not in self.files:
+                self.pushError(-256)
+            else:
+                self.table = list(self.files[name])
+        else:
+            self.settings[header] = ','.join(args)
+        return ''
+
+    def _insert(self, rows, position):
+        position = int(position)
+        if position < 0:
+            self.table.extend(rows)
+        else:
+            self.table[position:position] = rows
+
+    def _points(self):
+        try:
+            return int(float(self.settings[':CONF:SWE:POIN']))
+        except ValueError:
+            return int(DEFAULTS[':CONF:SWE:POIN'])
+
+    def _div(self):
+        points = self._points()
+        return self.divGenerator(points, numpy.random.default_rng([self.seed, points]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Insight laser simulator')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=2323)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds per command')
+    parser.add_argument('--rtt', type=float, default=0.0, help='network round trip, seconds')
+    parser.add_argument('--calibration', type=float, default=0.5, help='seconds per calibration')
+    opts = parser.parse_args()
+
+    async def main():
+        sim = laserSimulator(latency=opts.latency, rtt=opts.rtt, calibrationTime=opts.calibration)
+        host, port = await sim.start(opts.host, opts.port)
+        print('simulating an Insight laser on %s:%d' % (host, port))
+        await sim._server.serve_forever()
+
+    asyncio.run(main())
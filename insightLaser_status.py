@@ -0,0 +1,157 @@
+# =========================================================================================================
+# Status watcher for the Insight sweep laser
+# Keeps the last *STB? status byte of a laser as an insightLaser_instr.statusByte, from a polling
+# thread and/or from a *STB? that rides along with the driver's own traffic (insightLaser.statusHook).
+# Subscribers are told about every change, and callers can wait for a condition such as "not BUSY"
+# instead of sleeping and polling themselves.
+#
+#   watcher = statusWatcher(laser, interval=0.5, piggyback=True).start()
+#   watcher.waitClear(statusByte.BUSY, timeout=60)
+#   await watcher.waitAsync(lambda s: s & statusByte.EMITTING)
+# =========================================================================================================
+
+import asyncio
+import logging
+import threading
+import time
+
+from insightLaser_instr import statusByte
+
+
+class statusWatcher:
+    '''
+    interval: seconds between polls of *STB? by the watcher thread, None to
+              rely on piggybacked replies only
+    fastInterval: poll interval while someone is waiting for a condition
+    piggyback: read the status from a *STB? appended to every exchange of
+               the driver
+    '''
+
+    def __init__(self, laser, interval=0.5, fastInterval=0.05, piggyback=False):
+        self.laser = laser
+        self.interval = interval
+        self.fastInterval = fastInterval
+        self.piggyback = piggyback
+
+        self.status = None          # last statusByte seen
+        self.updated = None         # time.monotonic() of the last status
+        self._log = logging.getLogger()
+        self._subscribers = []
+        self._changed = threading.Condition()
+        self._waiters = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.piggyback:
+            self.laser.statusHook = self._update
+        if self.interval is not None and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='statusWatcher %s' % self.laser.host,
+                                            daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self.laser.statusHook == self._update:
+            self.laser.statusHook = None
+        self._stop.set()
+        with self._changed:
+            self._changed.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def poll(self):
+        '''
+        Read *STB? now.
+        return: the statusByte
+        '''
+        status = self.laser.cmd_STB_q()
+        self._update(status)
+        return status
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except Exception as exc:
+                self._log.warning('%s: status poll failed: %r' % (self.laser.host, exc))
+            self._stop.wait(self.fastInterval if self._waiters else self.interval)
+
+    def _update(self, status):
+        status = statusByte(status)
+        with self._changed:
+            old, self.status = self.status, status
+            self.updated = time.monotonic()
+            self._changed.notify_all()
+        if status != old:
+            for callback in list(self._subscribers):
+                callback(old, status)
+
+    def subscribe(self, callback):
+        '''
+        Call callback(old, new) on every change of the status byte; old is
+        None for the first status seen.
+        '''
+        self._subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        self._subscribers.remove(callback)
+
+    def wait(self, condition, timeout=None):
+        '''
+        Block until condition(status) is true.
+        Without a watcher thread the status is polled here.
+        return: the status that satisfied the condition
+        '''
+        deadline = None if timeout is None else time.monotonic() + timeout
+        polling = self._thread is None
+        with self._changed:
+            self._waiters += 1
+        try:
+            while True:
+                if polling:
+                    self.poll()
+                with self._changed:
+                    if self.status is not None and condition(self.status):
+                        return self.status
+                    if self._stop.is_set() and not polling:
+                        raise RuntimeError('status watcher stopped')
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise TimeoutError('status %r did not reach the condition within %g s'
+                                           % (self.status, timeout))
+                    step = self.fastInterval if polling else None
+                    if remaining is not None:
+                        step = remaining if step is None else min(step, remaining)
+                    self._changed.wait(step)
+        finally:
+            with self._changed:
+                self._waiters -= 1
+
+    def waitSet(self, flags, timeout=None):
+        '''
+        Wait until all of <flags> are set, e.g. statusByte.EMITTING.
+        '''
+        return self.wait(lambda status: status & flags == flags, timeout)
+
+    def waitClear(self, flags, timeout=None):
+        '''
+        Wait until none of <flags> is set, e.g. statusByte.BUSY.
+        '''
+        return self.wait(lambda status: not status & flags, timeout)
+
+    async def waitAsync(self, condition, timeout=None):
+        '''
+        wait() for asyncio code, run on the default executor.
+        '''
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.wait, condition, timeout)
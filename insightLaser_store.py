@@ -0,0 +1,33 @@
+# =========================================================================================================
+# JSON record store shared by the Insight laser helpers (CalibrationCache, AlignmentCache, scanCheckpoint)
+# The records are a dict that several threads (fleet workers) update; they are optionally kept in a JSON
+# file, which is rewritten through a temporary file so a crash never leaves it truncated.
+# =========================================================================================================
+
+import json
+import os
+import threading
+
+
+class recordStore:
+    '''
+    path: optional JSON file the records are loaded from and saved to
+    Subclasses hold _lock around every read and write of _records.
+    '''
+
+    def __init__(self, path=None):
+        self.path = path
+        self._records = {}
+        self._lock = threading.RLock()  # fleets update the records from several threads
+        if path is not None and os.path.exists(path):
+            with open(path) as f:
+                self._records = json.load(f)
+
+    def save(self):
+        if self.path is None:
+            return
+        with self._lock:
+            temporary = self.path + '.tmp'
+            with open(temporary, 'w') as f:
+                json.dump(self._records, f, indent=1)
+            os.replace(temporary, self.path)
@@ -0,0 +1,93 @@
+# =========================================================================================================
+# Tests of insightLaser_align against the simulator, with a stand-in digitizer: the record is a step
+# whose edge moves one sample earlier per PERIOD ns of delay, as on a scope triggered by Sweep Start.
+#
+#   python -m pytest test_insightLaser_align.py
+# =========================================================================================================
+
+import numpy
+import pytest
+
+import insightLaser_instr
+import insightLaser_sim
+from insightLaser_align import DELAYS, AlignmentCache, alignDelay, alignTriggers, findEdge
+
+
+EDGE = 700.0        # edge position with the delay at 0, samples
+PERIOD = 0.8        # ns per sample
+SAMPLES = 1000
+
+
+class standIn:
+    '''
+    acquire(laser, delay): a record with the edge where the delay the laser
+    holds puts it, counting the acquisitions.
+    '''
+
+    def __init__(self, edge=EDGE, interpolate=True):
+        self.edge = edge
+        self.interpolate = interpolate
+        self.count = 0
+        self._rng = numpy.random.default_rng(0)
+
+    def __call__(self, laser, delay='SSD'):
+        self.count += 1
+        position = self.edge - getattr(laser, DELAYS[delay][1])(refresh=True) / PERIOD
+        x = numpy.arange(SAMPLES, dtype=float)
+        if self.interpolate:
+            record = numpy.clip(x - position + 0.5, 0, 1)
+        else:
+            record = (x >= numpy.ceil(position)).astype(float)
+        return 100 * record + self._rng.normal(0, 0.5, SAMPLES)
+
+
+@pytest.fixture
+def laser():
+    sim = insightLaser_sim.laserSimulator()
+    host, port = sim.runInThread()
+    laser = insightLaser_instr.insightLaser(host)
+    laser.port = port
+    laser.connect()
+    yield laser
+    laser.close()
+    sim.stopThread()
+
+
+def test_findEdge():
+    assert findEdge([0, 0, 1, 1]) == pytest.approx(1.5)
+    assert findEdge(numpy.ones(5)) == numpy.inf
+    assert findEdge([1, 1, 0]) == -numpy.inf
+    assert findEdge([[0, 0, 1, 1], [0, 0, 1, 1]]) == pytest.approx(1.5)
+
+
+def test_converges(laser):
+    acquire = standIn()
+    value, count = alignDelay(laser, 'SSD', acquire, 200.0, tolerance=0.5)
+    assert value == pytest.approx((EDGE - 200.0) * PERIOD, abs=0.5 * PERIOD)
+    assert abs(findEdge(acquire(laser)) - 200.0) <= 0.5
+    assert count <= 8
+
+
+def test_no_bracket(laser):
+    with pytest.raises(ValueError, match='one side'):
+        alignDelay(laser, 'SSD', standIn(), 900.0, lo=0, hi=50)
+
+
+def test_not_converged(laser):
+    # whole-sample edges can never land within 0.1 sample of 200.3
+    with pytest.raises(ValueError, match='still'):
+        alignDelay(laser, 'SSD', standIn(interpolate=False), 200.3, tolerance=0.1)
+
+
+def test_cache_hit(laser, tmp_path):
+    path = str(tmp_path / 'alignment.json')
+    acquire = standIn()
+    first = alignTriggers(laser, acquire, {'SSD': 200.0, 'DVD': 300.0}, setup='A',
+                          cache=AlignmentCache(path))
+    acquire.count = 0
+    cache = AlignmentCache(path)
+    again = alignTriggers(laser, acquire, {'SSD': 200.0, 'DVD': 300.0}, setup='A', cache=cache)
+    assert again == pytest.approx(first)
+    assert acquire.count == 2
+    assert cache.lookup(laser, 'A', 'SSD') == pytest.approx(first['SSD'])
+    assert set(cache._records['%s A' % laser.host]['totals']) == {'SSD', 'DVD'}
@@ -0,0 +1,81 @@
+# =========================================================================================================
+# Tests of insightLaser_proxy against the simulator: two proxyLaser clients sharing one laser see each
+# other's settings and calibrations, and queries that change the laser's state are never merged.
+#
+#   python -m pytest test_insightLaser_proxy.py
+# =========================================================================================================
+
+import pytest
+
+import insightLaser_sim
+from insightLaser_config import SweepConfig
+from insightLaser_proxy import laserProxy, proxyLaser
+
+
+@pytest.fixture
+def sim():
+    sim = insightLaser_sim.laserSimulator()
+    sim.runInThread()
+    yield sim
+    sim.stopThread()
+
+
+@pytest.fixture
+def proxy(sim, tmp_path):
+    proxy = laserProxy(sim.host, sim.port, path=str(tmp_path / 'laser.sock'))
+    proxy.runInThread()
+    yield proxy
+    proxy.stopThread()
+
+
+@pytest.fixture
+def clients(proxy):
+    lasers = [proxyLaser(proxy.path), proxyLaser(proxy.path)]
+    for laser in lasers:
+        laser.connect()
+    yield lasers
+    for laser in lasers:
+        laser.close()
+
+
+def test_host(sim, clients):
+    assert clients[0].host == sim.host
+
+
+def test_settings_of_other_clients(clients):
+    a, b = clients
+    a.cmd_CONF_SWE_POW(2.0)
+    assert b.cmd_CONF_SWE_POW_q() == 2.0
+    b.cmd_CONF_SWE_POW(1.0)
+    assert a.getCached(':CONFigure:SWEep:POWer') == 1.0
+
+
+def test_apply_after_other_client(sim, clients):
+    a, b = clients
+    SweepConfig(power=1.0).apply(b)
+    assert SweepConfig(power=1.0).apply(b) == []
+    a.cmd_CONF_SWE_POW(1.5)
+    assert SweepConfig(power=1.0).needsCalibration(b)
+    assert SweepConfig(power=1.0).apply(b) == [('cmd_CONF_SWE_POW', (1.0,))]
+    assert float(sim.settings[':CONF:SWE:POW']) == 1.0
+    assert ':CAL:SWE' in sim.calibrated
+    assert not SweepConfig(power=1.0).needsCalibration(a)
+
+
+def test_cached_queries(sim, proxy, clients):
+    a, b = clients
+    a.cmd_CONF_SWE_POW_q()
+    count = sim.commandCount
+    assert b.cmd_CONF_SWE_POW_q() == a.cmd_CONF_SWE_POW_q()
+    assert sim.commandCount == count
+    assert proxy.counts['cached'] >= 2
+
+
+def test_volatile_queries(clients):
+    a, _ = clients
+    with a.batch():
+        before = a.drainErrors()
+        a._set(':CONFigure:SWEep:POWer', 'xyz')
+        after = a.drainErrors()
+    assert before.value == []
+    assert [e.code for e in after.value] == [-222]
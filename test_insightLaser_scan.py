@@ -0,0 +1,81 @@
+# =========================================================================================================
+# Tests of insightLaser_scan against the simulator: scan order, resuming from a checkpoint file and
+# retrying a point after a dropped connection.
+#
+#   python -m pytest test_insightLaser_scan.py
+# =========================================================================================================
+
+import json
+import os
+
+import pytest
+
+import insightLaser_instr
+import insightLaser_sim
+from insightLaser_config import FixedConfig
+from insightLaser_instr import COMMANDS
+from insightLaser_scan import orderScan, pointKey, scanExecutor, scanGrid
+
+
+BASE = FixedConfig(clockrate=10, rolloff=3)
+GRID = scanGrid(wavelength=[1540, 1550, 1560], power=[1, 2])
+
+
+def measure(laser, point):
+    return laser.cmd_CONF_FIX_WAV_q(refresh=True), laser.cmd_CONF_FIX_POW_q(refresh=True)
+
+
+@pytest.fixture
+def sim():
+    sim = insightLaser_sim.laserSimulator()
+    sim.runInThread()
+    yield sim
+    sim.stopThread()
+
+
+@pytest.fixture
+def laser(sim):
+    laser = insightLaser_instr.insightLaser(sim.host)
+    laser.port = sim.port
+    laser.connect()
+    yield laser
+    laser.close()
+
+
+def test_order():
+    ordered = orderScan(GRID, BASE)
+    assert [p['power'] for p in ordered] == [1, 1, 1, 2, 2, 2]
+    assert [p['wavelength'] for p in ordered] == [1540, 1550, 1560, 1560, 1550, 1540]
+
+
+def test_resume(laser, tmp_path):
+    path = str(tmp_path / 'scan.json')
+    first = []
+    for point, result in scanExecutor(laser, BASE, measure, checkpoint=path).run(GRID):
+        first.append(point)
+        assert result == (point['wavelength'], point['power'])
+        if len(first) == 4:
+            break
+    with open(path) as f:
+        assert json.load(f)['done'] == sorted(pointKey(p) for p in first)
+
+    scan = scanExecutor(laser, BASE, measure, checkpoint=path)
+    assert len(scan.remaining(GRID)) == 2
+    second = [point for point, _ in scan.run(GRID)]
+    assert sorted(map(pointKey, first + second)) == sorted(map(pointKey, GRID))
+    assert scan.calibrationCount == 0        # still calibrated for the power level of the first run
+    assert scanExecutor(laser, BASE, measure, checkpoint=path).remaining(GRID) == []
+
+    scan.reset()
+    assert not os.path.exists(path)
+    assert len(scanExecutor(laser, BASE, checkpoint=path).remaining(GRID)) == len(GRID)
+
+
+def test_reconnect(sim, laser, tmp_path):
+    path = str(tmp_path / 'scan.json')
+    sim.injectFault('drop', COMMANDS['cmd_INIT_FIX'].header)
+    results = list(scanExecutor(laser, BASE, measure, checkpoint=path).run(GRID))
+    assert sim.faults == []
+    assert [result for _, result in results] == [(p['wavelength'], p['power']) for p, _ in results]
+    assert len(results) == len(GRID)
+    assert scanExecutor(laser, BASE, checkpoint=path).remaining(GRID) == []